@@ -40,6 +40,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.socios.middleware.SocioActualMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -137,3 +138,7 @@ if "test" in sys.argv:
             "NAME": ":memory:",
         }
     }
+
+# Expira las membresías vencidas con un hilo en proceso al cambiar de día.
+# Alternativa: programar `python manage.py expirar_membresias` con cron.
+PAGOS_PROGRAMADOR_EXPIRACION = False
@@ -1,3 +1,4 @@
+from apps.control_acceso import views as control_acceso_views
 from apps.control_acceso import views_entrenador
 from apps.control_acceso.views_entrenador import planificador_rutina_view
 from apps.pagos import views as pagos_views
@@ -58,9 +59,26 @@ urlpatterns = [
     path('administrativo/gestionar-usuarios/', seguridad_views.gestionar_usuarios_view, name='gestionar_usuarios'),
     path('administrativo/gestion-pagos/', pagos_views.gestion_pagos_view, name='gestion_pagos'),
     path('administrativo/gestion-pagos/registrar/', pagos_views.registrar_pago_view, name='registrar_pago'),
+    path(
+        'administrativo/gestion-pagos/socios/',
+        pagos_views.buscar_socios_pago_view,
+        name='buscar_socios_pago',
+    ),
     path('administrativo/crear-plan-membresia/', pagos_views.crear_plan_membresia_view, name='crear_plan_membresia'),
     path('administrativo/eliminar-plan-membresia/<int:plan_id>/', pagos_views.eliminar_plan_membresia_view, name='eliminar_plan_membresia'),
     path('administrativo/editar-plan-membresia/<int:plan_id>/', pagos_views.editar_plan_membresia_view, name='editar_plan_membresia'),
+    # Entrada por torniquete (identificación escaneada)
+    path(
+        'administrativo/control-acceso/entrada/',
+        control_acceso_views.registrar_entrada_view,
+        name='registrar_entrada',
+    ),
+    # Eventos acumulados por un terminal sin conexión (lote JSON)
+    path(
+        'administrativo/control-acceso/eventos/',
+        control_acceso_views.ingerir_eventos_view,
+        name='ingerir_eventos_acceso',
+    ),
     # Rutas de clientes: mantener acceso administrativo y exponer ruta para entrenador
     path('administrativo/clientes/', socios_views.clientes_list_view, name='admin_clientes'),
     path('entrenador/clientes/', socios_views.clientes_list_view, name='clientes_list'),
@@ -125,6 +143,11 @@ urlpatterns = [
         views_entrenador.entrenador_plantilla_nutricion_detalle,
         name="entrenador_plantilla_nutricion",
     ),
+    path(
+        "entrenador/nutricion/plantilla/<int:plan_id>/aplicar-grupo/",
+        views_entrenador.entrenador_aplicar_plantilla_grupo,
+        name="entrenador_aplicar_plantilla_grupo",
+    ),
     path(
         "entrenador/nutricion/plantillas/crear/",
         views_entrenador.entrenador_crear_plantilla_nutricional,
@@ -212,6 +235,11 @@ urlpatterns = [
         views_entrenador.ajax_asignar_rutina,
         name="ajax_asignar_rutina",
     ),
+    path(
+        "entrenador/rutina/<int:rutina_id>/asignar-grupo/",
+        views_entrenador.ajax_asignar_rutina_grupo,
+        name="ajax_asignar_rutina_grupo",
+    ),
     # Obtener ejercicios por día
     path(
         "entrenador/rutina/<int:rutina_id>/dia/<int:dia>/ejercicios/",
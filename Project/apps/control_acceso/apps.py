@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ControlAccesoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.control_acceso'
+
+    def ready(self):
+        from apps.control_acceso import signals  # noqa: F401
@@ -0,0 +1,109 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.control_acceso.models import Asistencia
+from apps.control_acceso.servicios.asistencia_service import (
+    ValidationError,
+    registrar_entrada_por_identificacion,
+)
+from apps.pagos.models import SocioMembresia
+from apps.seguridad.servicios.medicion_latencias import resumir
+from apps.socios.models import Socio
+
+
+def _registrar_tramo(identificaciones):
+    """Un terminal: registra las entradas de su tramo una tras otra."""
+    mediciones = []
+    try:
+        for identificacion in identificaciones:
+            inicio = time.perf_counter()
+            try:
+                asistencia = registrar_entrada_por_identificacion(identificacion, "Benchmark")
+                asistencia_id = asistencia.id
+            except ValidationError:
+                asistencia_id = None
+            mediciones.append((time.perf_counter() - inicio, asistencia_id))
+    finally:
+        # Cada hilo abre su propia conexión
+        connection.close()
+    return mediciones
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide las entradas por segundo del torniquete (registrar_entrada_por_identificacion) "
+        "con varios terminales a la vez contra una base sembrada con generar_datos. "
+        "La primera ronda va con la caché de membresías vacía; las demás, con la "
+        "caché caliente. Registra entradas reales y las cierra al acabar cada ronda."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socios", type=int, default=500, help="Socios que entran en cada ronda."
+        )
+        parser.add_argument(
+            "--terminales", type=int, default=4, help="Terminales (hilos) a la vez."
+        )
+        parser.add_argument("--rondas", type=int, default=5, help="Rondas de entradas.")
+
+    def handle(self, *args, **options):
+        if min(options["socios"], options["terminales"], options["rondas"]) < 1:
+            raise CommandError("Los socios, los terminales y las rondas deben ser positivos.")
+
+        hoy = timezone.localdate()
+        identificaciones = list(
+            Socio.objects.filter(
+                membresias__Estado=SocioMembresia.ESTADO_ACTIVA,
+                membresias__FechaInicio__lte=hoy,
+                membresias__FechaFin__gte=hoy,
+            )
+            .filter(~Exists(Asistencia.objects.filter(
+                SocioMembresiaID__SocioID=OuterRef("pk"), FechaHoraSalida__isnull=True
+            )))
+            .distinct()
+            .order_by("id")
+            .values_list("Identificacion", flat=True)[:options["socios"]]
+        )
+        if not identificaciones:
+            raise CommandError(
+                "No hay socios con membresía activa y sin entrada abierta. "
+                "Siembra la base con generar_datos."
+            )
+
+        terminales = options["terminales"]
+        tramos = [identificaciones[i::terminales] for i in range(terminales)]
+        duraciones_calientes, entradas_calientes, segundos_calientes = [], 0, 0.0
+        for ronda in range(1, options["rondas"] + 1):
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=terminales) as ejecutor:
+                mediciones = [m for tramo in ejecutor.map(_registrar_tramo, tramos) for m in tramo]
+            segundos = time.perf_counter() - inicio
+
+            creadas = [asistencia_id for _, asistencia_id in mediciones if asistencia_id]
+            Asistencia.objects.filter(id__in=creadas).update(FechaHoraSalida=timezone.now())
+
+            resumen = resumir([d for d, _ in mediciones], errores=len(mediciones) - len(creadas))
+            por_segundo = len(creadas) / segundos
+            self.stdout.write(
+                f"Ronda {ronda} ({'caché fría' if ronda == 1 else 'caché caliente'}): "
+                f"{len(creadas)} entradas en {segundos:.2f} s -> {por_segundo:.1f} entradas/s, "
+                f"p50 {resumen['p50_ms']} ms, p95 {resumen['p95_ms']} ms, "
+                f"errores {resumen['errores']}"
+            )
+            if ronda > 1:
+                duraciones_calientes += [d for d, _ in mediciones]
+                entradas_calientes += len(creadas)
+                segundos_calientes += segundos
+
+        if segundos_calientes:
+            resumen = resumir(duraciones_calientes)
+            por_segundo = entradas_calientes / segundos_calientes
+            self.stdout.write(self.style.SUCCESS(
+                f"Sostenido (caché caliente): {por_segundo:.1f} entradas/s "
+                f"con {terminales} terminales, p95 {resumen['p95_ms']} ms"
+            ))
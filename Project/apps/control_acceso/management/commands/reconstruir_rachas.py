@@ -0,0 +1,106 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.control_acceso.models import RachaEntrenamiento, SesionEntrenamiento
+from apps.control_acceso.servicios.rachas_service import (
+    VENTANA_CALCULO_DIAS,
+    aplicar_dias,
+    calcular_racha_desde_dias,
+    racha_vigente,
+)
+
+TAMANO_LOTE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye desde el historial de sesiones las rachas de entrenamiento "
+        "guardadas y las verifica contra el cálculo original del panel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--solo-verificar",
+            action="store_true",
+            help="No reescribe las rachas; solo compara las guardadas con el historial.",
+        )
+
+    def handle(self, *args, **options):
+        hoy = timezone.now().date()
+        dias_por_socio = self._dias_por_socio()
+
+        if not options["solo_verificar"]:
+            total = self._reconstruir(dias_por_socio)
+            self.stdout.write(f"Rachas reconstruidas: {total}")
+
+        diferencias, fuera_de_ventana = self._verificar(dias_por_socio, hoy)
+        if fuera_de_ventana:
+            self.stdout.write(
+                f"Rachas más largas que la ventana de {VENTANA_CALCULO_DIAS} días "
+                f"(no comparables): {fuera_de_ventana}"
+            )
+        if diferencias:
+            for socio_id, guardada, esperada in diferencias[:20]:
+                self.stderr.write(
+                    f"Socio {socio_id}: guardada={guardada} esperada={esperada}"
+                )
+            raise CommandError(f"{len(diferencias)} rachas no coinciden.")
+
+        self.stdout.write(self.style.SUCCESS("Todas las rachas coinciden."))
+
+    def _dias_por_socio(self):
+        dias_por_socio = defaultdict(set)
+        sesiones = SesionEntrenamiento.objects.filter(FechaFin__isnull=False).values_list(
+            "SocioMembresiaID__SocioID_id", "FechaInicio"
+        )
+        for socio_id, fecha in sesiones.iterator(chunk_size=2000):
+            dias_por_socio[socio_id].add(fecha.date())
+        return dias_por_socio
+
+    def _reconstruir(self, dias_por_socio):
+        existentes = {r.SocioID_id: r for r in RachaEntrenamiento.objects.all()}
+        nuevas, actualizadas = [], []
+
+        for socio_id, racha in existentes.items():
+            aplicar_dias(racha, dias_por_socio.get(socio_id, ()))
+            actualizadas.append(racha)
+        for socio_id, dias in dias_por_socio.items():
+            if socio_id not in existentes:
+                nuevas.append(aplicar_dias(RachaEntrenamiento(SocioID_id=socio_id), dias))
+
+        with transaction.atomic():
+            RachaEntrenamiento.objects.bulk_create(nuevas, batch_size=TAMANO_LOTE)
+            RachaEntrenamiento.objects.bulk_update(
+                actualizadas,
+                ["RachaActual", "InicioRacha", "UltimoDiaEntreno"],
+                batch_size=TAMANO_LOTE,
+            )
+        return len(nuevas) + len(actualizadas)
+
+    def _verificar(self, dias_por_socio, hoy):
+        diferencias = []
+        fuera_de_ventana = 0
+        guardadas = {r.SocioID_id: r for r in RachaEntrenamiento.objects.all()}
+
+        for socio_id in set(guardadas) | set(dias_por_socio):
+            racha = guardadas.get(socio_id)
+            guardada = (
+                racha_vigente(racha.RachaActual, racha.UltimoDiaEntreno, hoy) if racha else 0
+            )
+            esperada = calcular_racha_desde_dias(dias_por_socio.get(socio_id, ()), hoy)
+            if guardada == esperada:
+                continue
+            # El cálculo original deja de contar a los 365 días
+            if racha and racha.InicioRacha and (
+                racha.UltimoDiaEntreno - racha.InicioRacha
+                >= timedelta(days=VENTANA_CALCULO_DIAS - 1)
+            ):
+                fuera_de_ventana += 1
+                continue
+            diferencias.append((socio_id, guardada, esperada))
+
+        return sorted(diferencias), fuera_de_ventana
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0005_plan_nutricional_templates'),
+        ('socios', '0005_registrocomidadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RachaEntrenamiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('RachaActual', models.PositiveIntegerField(default=0)),
+                ('InicioRacha', models.DateField(blank=True, null=True)),
+                ('UltimoDiaEntreno', models.DateField(blank=True, null=True)),
+                ('FechaActualizacion', models.DateTimeField(auto_now=True)),
+                ('SocioID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='racha_entrenamiento', to='socios.socio')),
+            ],
+            options={
+                'db_table': 'racha_entrenamiento',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0006_racha_entrenamiento'),
+        ('pagos', '0004_alter_sociomembresia_planid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(condition=models.Q(('FechaHoraSalida__isnull', True)), fields=['SocioMembresiaID'], name='asistencia_abierta_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionentrenamiento',
+            index=models.Index(fields=['SocioMembresiaID', 'FechaFin'], name='sesion_membresia_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionentrenamiento',
+            index=models.Index(condition=models.Q(('FechaFin__isnull', True)), fields=['SocioMembresiaID'], name='sesion_abierta_idx'),
+        ),
+    ]
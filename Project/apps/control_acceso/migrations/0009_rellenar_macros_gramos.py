@@ -0,0 +1,79 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, transaction
+
+# Tamaño de lote: cada lote se confirma por separado, así que si la migración
+# se interrumpe puede relanzarse y continúa con los alimentos aún sin rellenar.
+TAMANO_LOTE = 1000
+CAMPOS = ["ProteinaG", "CarbohidratosG", "GrasaG"]
+
+# Copia congelada del parser de nutricion_service: la migración no importa
+# código de la aplicación, que puede cambiar o desaparecer más adelante.
+PATRON_MACRO = re.compile(r"\b([PCG])\w*\s*:\s*(\d+(?:[.,]\d+)?)", re.IGNORECASE)
+COLUMNA_MACRO = {"P": "ProteinaG", "C": "CarbohidratosG", "G": "GrasaG"}
+MAXIMO_GRAMOS = Decimal("10000")
+
+
+def parsear_macros(texto):
+    columnas = dict.fromkeys(COLUMNA_MACRO.values())
+    for letra, valor in PATRON_MACRO.findall(texto or ""):
+        columna = COLUMNA_MACRO[letra.upper()]
+        if columnas[columna] is None:
+            try:
+                gramos = Decimal(valor.replace(",", ".")).quantize(Decimal("0.01"))
+            except InvalidOperation:
+                continue
+            if gramos < MAXIMO_GRAMOS:
+                columnas[columna] = gramos
+    return columnas
+
+
+def rellenar_macros_gramos(apps, schema_editor):
+    Alimento = apps.get_model("control_acceso", "Alimento")
+
+    ultimo_id = 0
+    while True:
+        with transaction.atomic():
+            lote = list(
+                Alimento.objects.filter(
+                    id__gt=ultimo_id,
+                    ProteinaG__isnull=True,
+                    CarbohidratosG__isnull=True,
+                    GrasaG__isnull=True,
+                )
+                .exclude(Macros__isnull=True)
+                .exclude(Macros="")
+                .order_by("id")
+                .only("id", "Macros")[:TAMANO_LOTE]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            rellenados = []
+            for alimento in lote:
+                columnas = parsear_macros(alimento.Macros)
+                if all(valor is None for valor in columnas.values()):
+                    continue
+                for campo, valor in columnas.items():
+                    setattr(alimento, campo, valor)
+                rellenados.append(alimento)
+
+            Alimento.objects.bulk_update(rellenados, CAMPOS)
+
+
+class Migration(migrations.Migration):
+    # Sin transacción global: cada lote se confirma por su cuenta
+    atomic = False
+
+    dependencies = [
+        ("control_acceso", "0008_alimento_macros_gramos"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            rellenar_macros_gramos,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0009_rellenar_macros_gramos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentoPlanNutricional',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Contenido', models.JSONField(default=dict)),
+                ('Version', models.PositiveIntegerField(default=0)),
+                ('Vigente', models.BooleanField(default=False)),
+                ('FechaCompilacion', models.DateTimeField(blank=True, null=True)),
+                ('PlanNutricionalID', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='documento', to='control_acceso.plannutricional')),
+            ],
+            options={
+                'db_table': 'documento_plan_nutricional',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0010_documento_plan_nutricional'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesionentrenamiento',
+            name='EjerciciosCompletados',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='sesionentrenamiento',
+            name='TotalEjercicios',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
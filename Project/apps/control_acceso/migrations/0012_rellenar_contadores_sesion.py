@@ -0,0 +1,56 @@
+from django.db import migrations, transaction
+from django.db.models import Count, Q
+
+# Tamaño de lote: cada lote se confirma por separado, así que si la migración
+# se interrumpe puede relanzarse y continúa con las sesiones aún sin contar.
+TAMANO_LOTE = 1000
+CAMPOS = ["TotalEjercicios", "EjerciciosCompletados"]
+
+
+def rellenar_contadores_sesion(apps, schema_editor):
+    SesionEntrenamiento = apps.get_model("control_acceso", "SesionEntrenamiento")
+
+    ultimo_id = 0
+    while True:
+        with transaction.atomic():
+            lote = list(
+                SesionEntrenamiento.objects.filter(id__gt=ultimo_id, TotalEjercicios=0)
+                .annotate(
+                    total=Count("ejercicios_completados"),
+                    completados=Count(
+                        "ejercicios_completados",
+                        filter=Q(ejercicios_completados__Completado=True),
+                    ),
+                )
+                .order_by("id")
+                .only("id")[:TAMANO_LOTE]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            rellenadas = []
+            for sesion in lote:
+                if not sesion.total:
+                    continue
+                sesion.TotalEjercicios = sesion.total
+                sesion.EjerciciosCompletados = sesion.completados
+                rellenadas.append(sesion)
+
+            SesionEntrenamiento.objects.bulk_update(rellenadas, CAMPOS)
+
+
+class Migration(migrations.Migration):
+    # Sin transacción global: cada lote se confirma por su cuenta
+    atomic = False
+
+    dependencies = [
+        ("control_acceso", "0011_sesion_contadores_progreso"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            rellenar_contadores_sesion,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:32
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def cerrar_entradas_duplicadas(apps, schema_editor):
+    """
+    Si una membresía tiene varias entradas sin salida (carreras del registro
+    anterior), deja abierta la más reciente y cierra las demás en el mismo
+    instante de su entrada, para poder crear la restricción única.
+    """
+    Asistencia = apps.get_model("control_acceso", "Asistencia")
+
+    abiertas = Asistencia.objects.filter(FechaHoraSalida__isnull=True).order_by(
+        "SocioMembresiaID", "-FechaHoraEntrada", "-id"
+    )
+    vistas, duplicadas = set(), []
+    for asistencia_id, membresia_id in abiertas.values_list("id", "SocioMembresiaID").iterator():
+        if membresia_id in vistas:
+            duplicadas.append(asistencia_id)
+        vistas.add(membresia_id)
+    Asistencia.objects.filter(id__in=duplicadas).update(FechaHoraSalida=F("FechaHoraEntrada"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0012_rellenar_contadores_sesion'),
+        ('pagos', '0006_indice_paginacion_membresias'),
+    ]
+
+    operations = [
+        migrations.RunPython(cerrar_entradas_duplicadas, reverse_code=migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='asistencia',
+            name='asistencia_abierta_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='asistencia',
+            constraint=models.UniqueConstraint(condition=models.Q(('FechaHoraSalida__isnull', True)), fields=('SocioMembresiaID',), name='u_asistencia_abierta'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0013_asistencia_abierta_unica'),
+        ('pagos', '0006_indice_paginacion_membresias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoAcceso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('TerminalAcceso', models.CharField(max_length=50)),
+                ('Clave', models.CharField(max_length=64)),
+                ('Tipo', models.CharField(choices=[('entrada', 'Entrada'), ('salida', 'Salida')], max_length=10)),
+                ('FechaHora', models.DateTimeField()),
+                ('FechaRecepcion', models.DateTimeField(auto_now_add=True)),
+                ('AsistenciaID', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos', to='control_acceso.asistencia')),
+                ('SocioMembresiaID', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_acceso', to='pagos.sociomembresia')),
+            ],
+            options={
+                'db_table': 'evento_acceso',
+                'indexes': [models.Index(condition=models.Q(('AsistenciaID__isnull', True), ('Tipo', 'salida')), fields=['SocioMembresiaID'], name='evento_salida_pendiente_idx')],
+                'constraints': [models.UniqueConstraint(fields=('TerminalAcceso', 'Clave'), name='u_evento_terminal_clave')],
+            },
+        ),
+    ]
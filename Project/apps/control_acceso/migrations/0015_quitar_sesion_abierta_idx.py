@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:48
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0014_evento_acceso'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='sesionentrenamiento',
+            name='sesion_abierta_idx',
+        ),
+    ]
@@ -34,6 +34,10 @@ class Alimento(models.Model):
     PorcionBase = models.CharField(max_length=50, null=True, blank=True)
     Kcal = models.PositiveIntegerField(null=True, blank=True)
     Macros = models.TextField(null=True, blank=True)
+    # Macronutrientes en gramos (por 100 g, como Kcal); Macros queda como texto libre
+    ProteinaG = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    CarbohidratosG = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    GrasaG = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
     Version = models.PositiveIntegerField(default=1)
 
     UsuarioVersionID = models.ForeignKey(
@@ -45,6 +49,15 @@ class Alimento(models.Model):
     def __str__(self):
         return self.Nombre
 
+    def texto_macros(self):
+        """``P: 12g, C: 58g, G: 7g`` a partir de las columnas; si no hay, el texto libre."""
+        valores = (("P", self.ProteinaG), ("C", self.CarbohidratosG), ("G", self.GrasaG))
+        if all(valor is None for _, valor in valores):
+            return self.Macros
+        return ", ".join(
+            f"{letra}: {valor.normalize():f}g" for letra, valor in valores if valor is not None
+        )
+
     class Meta:
         ordering = ["Nombre"]
         db_table = "alimento"
@@ -66,6 +79,63 @@ class Asistencia(models.Model):
     class Meta:
         ordering = ["-FechaHoraEntrada"]
         db_table = "asistencia"
+        constraints = [
+            # Una sola entrada sin salida por membresía (índice único parcial):
+            # la entrada por torniquete rechaza los duplicados con el insert
+            models.UniqueConstraint(
+                fields=["SocioMembresiaID"],
+                condition=models.Q(FechaHoraSalida__isnull=True),
+                name="u_asistencia_abierta",
+            ),
+        ]
+
+
+# === TABLA EventoAcceso ===
+class EventoAcceso(models.Model):
+    """
+    Evento de entrada o salida que un terminal registró sin conexión y subió
+    después en lote. ``Clave`` la genera el terminal y hace idempotente el
+    reenvío del mismo lote. Una salida sin entrada previa conocida queda sin
+    ``AsistenciaID`` hasta que llegue su entrada.
+    """
+
+    TIPO_ENTRADA = "entrada"
+    TIPO_SALIDA = "salida"
+    TIPO_CHOICES = [
+        (TIPO_ENTRADA, "Entrada"),
+        (TIPO_SALIDA, "Salida"),
+    ]
+
+    TerminalAcceso = models.CharField(max_length=50)
+    Clave = models.CharField(max_length=64)
+    Tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    FechaHora = models.DateTimeField()
+    SocioMembresiaID = models.ForeignKey(
+        "pagos.SocioMembresia", on_delete=models.CASCADE, related_name="eventos_acceso"
+    )
+    AsistenciaID = models.ForeignKey(
+        Asistencia, on_delete=models.SET_NULL, null=True, blank=True, related_name="eventos"
+    )
+    FechaRecepcion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.TerminalAcceso} {self.Clave} - {self.Tipo} {self.FechaHora}"
+
+    class Meta:
+        db_table = "evento_acceso"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["TerminalAcceso", "Clave"], name="u_evento_terminal_clave"
+            ),
+        ]
+        indexes = [
+            # Salidas pendientes de emparejar (índice parcial)
+            models.Index(
+                fields=["SocioMembresiaID"],
+                condition=models.Q(Tipo="salida", AsistenciaID__isnull=True),
+                name="evento_salida_pendiente_idx",
+            ),
+        ]
 
 
 # === TABLA RutinaSemanal ===
@@ -188,6 +258,11 @@ class SesionEntrenamiento(models.Model):
     EsEntrenamientoLibre = models.BooleanField(default=False)
     NotasSesion = models.TextField(null=True, blank=True, help_text="Notas sobre qué se hizo en la sesión")
 
+    # Progreso desnormalizado: filas de EjercicioSesionCompletado de la
+    # sesión y cuántas están completadas (se actualizan con F())
+    TotalEjercicios = models.PositiveIntegerField(default=0)
+    EjerciciosCompletados = models.PositiveIntegerField(default=0)
+
     def __str__(self):
         if self.EsEntrenamientoLibre:
             return f"Sesión Libre {self.id} - {self.FechaInicio.strftime('%d/%m/%Y')}"
@@ -196,6 +271,10 @@ class SesionEntrenamiento(models.Model):
     class Meta:
         db_table = "sesion_entrenamiento"
         ordering = ["-FechaInicio"]
+        indexes = [
+            # Sesión activa (FechaFin IS NULL) y sesiones terminadas de una membresía
+            models.Index(fields=["SocioMembresiaID", "FechaFin"], name="sesion_membresia_fin_idx"),
+        ]
 
 
 # === TABLA EjercicioSesionCompletado ===
@@ -229,3 +308,71 @@ class CompletionTracking(models.Model):
         db_table = "completion_tracking"
         unique_together = [["SocioMembresiaID", "RutinaID", "DiaSemana", "Semana"]]
         ordering = ["-FechaCompletado"]
+
+
+# === TABLA RachaEntrenamiento ===
+class RachaEntrenamiento(models.Model):
+    """
+    Racha de entrenamiento de un socio, mantenida de forma incremental al
+    cerrar cada sesión para que el panel no recorra todo el historial.
+    """
+
+    SocioID = models.OneToOneField(
+        "socios.Socio", on_delete=models.CASCADE, related_name="racha_entrenamiento"
+    )
+    RachaActual = models.PositiveIntegerField(default=0)
+    InicioRacha = models.DateField(null=True, blank=True)
+    UltimoDiaEntreno = models.DateField(null=True, blank=True)
+    FechaActualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Racha {self.SocioID_id} - {self.RachaActual} días"
+
+    class Meta:
+        db_table = "racha_entrenamiento"
+
+
+# === TABLA DocumentoPlanNutricional ===
+class DocumentoPlanNutricional(models.Model):
+    """
+    Semana de un plan nutricional compilada en un solo JSON (comidas, aporte
+    de cada alimento y totales por día) para que las vistas no recorran
+    DiaComida -> ComidaAlimento -> Alimento en cada petición.
+
+    Se marca como no vigente al cambiar el plan o un alimento que usa y se
+    recompila en la siguiente lectura. ``Version`` sube en cada compilación y
+    en cada invalidación, así que una compilación que empezó antes de un
+    cambio no puede guardarse encima (ver obtener_documento).
+    """
+
+    PlanNutricionalID = models.OneToOneField(
+        PlanNutricional, on_delete=models.CASCADE, related_name="documento"
+    )
+    Contenido = models.JSONField(default=dict)
+    Version = models.PositiveIntegerField(default=0)
+    Vigente = models.BooleanField(default=False)
+    FechaCompilacion = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Documento plan {self.PlanNutricionalID_id} v{self.Version}"
+
+    def etiqueta(self):
+        """Identifica esta compilación; sirve como clave de caché o ETag."""
+        return f"plan-nutricional-{self.PlanNutricionalID_id}-v{self.Version}"
+
+    @classmethod
+    def invalidar(cls, planes):
+        """Marca para recompilar los documentos de ``planes`` (ids o instancias)."""
+        cls.objects.filter(PlanNutricionalID__in=planes).update(
+            Vigente=False, Version=models.F("Version") + 1
+        )
+
+    @classmethod
+    def invalidar_por_alimentos(cls, alimentos):
+        """Marca para recompilar los documentos de los planes que usan ``alimentos``."""
+        cls.objects.filter(
+            PlanNutricionalID__dias_comida__alimentos__AlimentoID__in=alimentos
+        ).update(Vigente=False, Version=models.F("Version") + 1)
+
+    class Meta:
+        db_table = "documento_plan_nutricional"
@@ -1,8 +1,15 @@
-from django.db import transaction
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 
 from apps.control_acceso.models import Asistencia
 from apps.pagos.models import SocioMembresia
+from apps.socios.models import Socio
+
+# Segundos que se recuerda la membresía activa de cada identificación
+# escaneada en el torniquete (caché en memoria del proceso)
+MEMBRESIA_ACTIVA_CACHE_SEGUNDOS = 30
 
 
 class ValidationError(ValueError):
@@ -47,13 +54,87 @@ def registrar_entrada(socio_membresia_id, terminal_acceso=None):
     if entrada_abierta:
         raise ValidationError("Ya existe una entrada activa sin registrar salida.")
 
-    with transaction.atomic():
-        asistencia = Asistencia.objects.create(
-            SocioMembresiaID=socio_membresia,
-            FechaHoraEntrada=timezone.now(),
-            TerminalAcceso=terminal_acceso or "",
+    try:
+        with transaction.atomic():
+            asistencia = Asistencia.objects.create(
+                SocioMembresiaID=socio_membresia,
+                FechaHoraEntrada=timezone.now(),
+                TerminalAcceso=terminal_acceso or "",
+            )
+            return asistencia
+    except IntegrityError:
+        raise ValidationError("Ya existe una entrada activa sin registrar salida.")
+
+
+def membresia_activa_por_identificacion(identificacion):
+    """
+    ID de la membresía activa hoy del socio con esa identificación (la que
+    vence más tarde), en una consulta. Se cachea MEMBRESIA_ACTIVA_CACHE_SEGUNDOS
+    segundos y nunca más allá del último día de la membresía.
+
+    Raises:
+        ValidationError: Si no hay socio con esa identificación o no tiene
+            una membresía activa
+    """
+    hoy = timezone.localdate()
+    clave = f"asistencia:membresia_activa:{identificacion}"
+    cacheada = cache.get(clave)
+    if cacheada is not None and cacheada[1] >= hoy:
+        return cacheada[0]
+
+    activas = SocioMembresia.objects.filter(
+        SocioID=OuterRef("pk"),
+        Estado=SocioMembresia.ESTADO_ACTIVA,
+        FechaInicio__lte=hoy,
+        FechaFin__gte=hoy,
+    ).order_by("-FechaFin", "-id")
+    fila = (
+        Socio.objects.filter(Identificacion=identificacion)
+        .annotate(
+            membresia_id=Subquery(activas.values("id")[:1]),
+            fecha_fin=Subquery(activas.values("FechaFin")[:1]),
         )
-        return asistencia
+        .values_list("membresia_id", "fecha_fin")
+        .first()
+    )
+    if fila is None:
+        raise ValidationError("No existe un socio con esa identificación.")
+    if fila[0] is None:
+        raise ValidationError(
+            "La membresía no está activa. No se puede registrar la entrada."
+        )
+    cache.set(clave, fila, MEMBRESIA_ACTIVA_CACHE_SEGUNDOS)
+    return fila[0]
+
+
+def registrar_entrada_por_identificacion(identificacion, terminal_acceso=None):
+    """
+    Registra la entrada por torniquete a partir de la identificación escaneada.
+
+    Resuelve la membresía activa (desde la caché si está) e inserta la
+    asistencia en una transacción: como mucho dos sentencias. Los duplicados
+    los rechaza la restricción única de entradas abiertas, sin consultarlas antes.
+
+    Returns:
+        Objeto Asistencia creado
+
+    Raises:
+        ValidationError: Si el socio no existe, no tiene membresía activa o ya
+            tiene una entrada sin salida
+    """
+    terminal_acceso = (terminal_acceso or "").strip()
+    if len(terminal_acceso) > Asistencia._meta.get_field("TerminalAcceso").max_length:
+        raise ValidationError("El identificador del terminal es demasiado largo.")
+
+    try:
+        with transaction.atomic():
+            return Asistencia.objects.create(
+                SocioMembresiaID_id=membresia_activa_por_identificacion(identificacion),
+                FechaHoraEntrada=timezone.now(),
+                TerminalAcceso=terminal_acceso,
+            )
+    except IntegrityError:
+        raise ValidationError("Ya existe una entrada activa sin registrar salida.")
 
 
 def registrar_salida(asistencia_id):
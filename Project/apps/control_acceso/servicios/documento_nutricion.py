@@ -0,0 +1,127 @@
+"""
+Documento compilado de la semana de un plan nutricional
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.control_acceso.models import ComidaAlimento, DiaComida, DocumentoPlanNutricional
+from apps.control_acceso.servicios.nutricion_service import APORTES, anotar_aportes
+
+# Recompilaciones seguidas si el plan cambia mientras se compila
+INTENTOS_COMPILACION = 3
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+def _totales(elementos):
+    return {nombre: round(sum(e["totales"][nombre] for e in elementos), 1) for nombre in APORTES}
+
+
+def _item(item):
+    """Un ComidaAlimento anotado con sus aportes, listo para JSON."""
+    alimento = item.AlimentoID
+    if item.Porcion:
+        cantidad_texto = f"{int(item.Porcion)}g"
+    elif item.Cantidad:
+        cantidad_texto = f"{item.Cantidad} un."
+    else:
+        cantidad_texto = ""
+    kcal = int(item.kcal)
+    proteina, carbohidratos, grasa = (
+        round(item.proteina, 1), round(item.carbohidratos, 1), round(item.grasa, 1)
+    )
+    return {
+        "id": item.id,
+        "alimento_id": alimento.id,
+        "nombre": alimento.Nombre,
+        "nombre_display": (
+            f"{alimento.Nombre} ({cantidad_texto})" if cantidad_texto else alimento.Nombre
+        ),
+        "porcion": str(item.Porcion) if item.Porcion is not None else None,
+        "porcion_texto": f"{item.Porcion.normalize():f} g" if item.Porcion else "",
+        "cantidad": item.Cantidad,
+        "macros": alimento.texto_macros(),
+        "macros_texto": f"{kcal} kcal | P: {proteina}g, C: {carbohidratos}g, G: {grasa}g",
+        "totales": {
+            "kcal": kcal, "proteina": proteina, "carbohidratos": carbohidratos, "grasa": grasa,
+        },
+    }
+
+
+def compilar_documento(plan):
+    """
+    Contenido del documento de ``plan``: los 7 días con sus comidas, cada
+    alimento con su aporte (calculado en la base de datos) y los totales
+    por comida y por día. Dos consultas.
+    """
+    items_por_comida = {}
+    for item in anotar_aportes(
+        ComidaAlimento.objects.filter(DiaComidaID__PlanNutricionalID=plan)
+        .select_related("AlimentoID")
+        .order_by("id")
+    ):
+        items_por_comida.setdefault(item.DiaComidaID_id, []).append(_item(item))
+
+    dias = [
+        {"indice": indice, "nombre": nombre, "comidas": []}
+        for indice, nombre in enumerate(DIAS_SEMANA)
+    ]
+    for comida in DiaComida.objects.filter(PlanNutricionalID=plan).order_by("DiaSemana", "id"):
+        alimentos = items_por_comida.get(comida.id, [])
+        dias[comida.DiaSemana]["comidas"].append({
+            "id": comida.id,
+            "tipo": comida.TipoComida or "Comida",
+            "alimentos": alimentos,
+            "totales": _totales(alimentos),
+        })
+    for dia in dias:
+        dia["totales"] = _totales(dia["comidas"])
+    return {"dias": dias}
+
+
+def _documento_de(plan) -> DocumentoPlanNutricional:
+    """Fila del documento de ``plan``; la crea vacía (no vigente) si no existe."""
+    try:
+        return plan.documento
+    except DocumentoPlanNutricional.DoesNotExist:
+        pass
+    try:
+        with transaction.atomic():
+            return DocumentoPlanNutricional.objects.create(PlanNutricionalID=plan)
+    except IntegrityError:
+        # Otra lectura la creó a la vez
+        return DocumentoPlanNutricional.objects.get(PlanNutricionalID=plan)
+
+
+def obtener_documento(plan) -> DocumentoPlanNutricional:
+    """
+    Documento vigente de ``plan``; lo (re)compila si no existe o se invalidó.
+
+    Con el documento vigente y ``select_related("documento")`` en la
+    consulta del plan no hace ninguna consulta más.
+
+    La compilación se guarda con un UPDATE condicionado a la ``Version``
+    leída: si entretanto otra lectura lo recompiló o el plan cambió (invalidar
+    también sube la versión), no se pisa nada y se vuelve a leer. Si el plan
+    sigue cambiando tras INTENTOS_COMPILACION, se devuelve lo compilado sin
+    guardarlo.
+    """
+    documento = _documento_de(plan)
+    for _ in range(INTENTOS_COMPILACION):
+        if documento.Vigente:
+            break
+        leida = documento.Version
+        contenido = compilar_documento(plan)
+        fecha = timezone.now()
+        guardado = DocumentoPlanNutricional.objects.filter(pk=documento.pk, Version=leida).update(
+            Contenido=contenido, Version=leida + 1, Vigente=True, FechaCompilacion=fecha
+        )
+        if guardado:
+            documento.Contenido, documento.Version = contenido, leida + 1
+            documento.Vigente, documento.FechaCompilacion = True, fecha
+            break
+        documento = DocumentoPlanNutricional.objects.get(pk=documento.pk)
+    if not documento.Vigente:
+        documento.Contenido = contenido
+    plan.documento = documento
+    return documento
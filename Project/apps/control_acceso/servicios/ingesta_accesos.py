@@ -0,0 +1,299 @@
+"""
+Ingesta en lote de los eventos de entrada y salida que los terminales de
+acceso guardaron mientras estaban sin conexión
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.control_acceso.models import Asistencia, EventoAcceso
+from apps.control_acceso.servicios.asistencia_service import ValidationError
+from apps.pagos.models import SocioMembresia
+
+MAXIMO_EVENTOS_LOTE = 5000
+# Valores por consulta IN y filas por INSERT
+TAMANO_LOTE_INGESTA = 2000
+# Margen para terminales con el reloj adelantado
+TOLERANCIA_RELOJ = timedelta(minutes=5)
+# Estados de membresía con los que se aceptan eventos pasados
+ESTADOS_INGESTA = (SocioMembresia.ESTADO_ACTIVA, SocioMembresia.ESTADO_EXPIRADA)
+
+
+def _en_lotes(valores):
+    valores = list(valores)
+    for inicio in range(0, len(valores), TAMANO_LOTE_INGESTA):
+        yield valores[inicio:inicio + TAMANO_LOTE_INGESTA]
+
+
+def _validar_evento(evento, ahora):
+    """(clave, tipo, identificacion, fecha_hora) de un evento del lote."""
+    if not isinstance(evento, dict):
+        raise ValidationError("El evento debe ser un objeto.")
+
+    clave = str(evento.get("clave") or "").strip()
+    if not clave or len(clave) > EventoAcceso._meta.get_field("Clave").max_length:
+        raise ValidationError("La clave del evento es obligatoria (máximo 64 caracteres).")
+
+    tipo = evento.get("tipo")
+    if tipo not in (EventoAcceso.TIPO_ENTRADA, EventoAcceso.TIPO_SALIDA):
+        raise ValidationError("El tipo del evento debe ser 'entrada' o 'salida'.")
+
+    identificacion = str(evento.get("identificacion") or "").strip()
+    if not identificacion:
+        raise ValidationError("Falta la identificación del socio.")
+
+    try:
+        fecha_hora = parse_datetime(str(evento.get("fecha_hora") or ""))
+    except ValueError:
+        fecha_hora = None
+    if fecha_hora is None:
+        raise ValidationError("La fecha y hora del evento no es válida.")
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    if fecha_hora > ahora + TOLERANCIA_RELOJ:
+        raise ValidationError("La fecha y hora del evento está en el futuro.")
+
+    return clave, tipo, identificacion, fecha_hora
+
+
+def _membresias_por_identificacion(identificaciones):
+    """
+    Membresías de cada identificación, de la que vence más tarde a la primera.
+
+    Las morosas no cuentan, igual que en el registro en línea. Las expiradas
+    sí: actualizar_estados_membresias solo marca las que ya pasaron su
+    FechaFin, y un evento de cuando aún la cubrían es válido.
+    """
+    membresias = {}
+    for lote in _en_lotes(identificaciones):
+        for identificacion, membresia_id, inicio, fin in (
+            SocioMembresia.objects.filter(
+                SocioID__Identificacion__in=lote,
+                Estado__in=ESTADOS_INGESTA,
+            )
+            .order_by("-FechaFin", "-id")
+            .values_list("SocioID__Identificacion", "id", "FechaInicio", "FechaFin")
+        ):
+            membresias.setdefault(identificacion, []).append((membresia_id, inicio, fin))
+    return membresias
+
+
+def _membresia_vigente(membresias, fecha):
+    # Lo que se registra ya ocurrió: basta con que las fechas la cubrieran
+    for membresia_id, inicio, fin in membresias:
+        if inicio <= fecha <= fin:
+            return membresia_id
+    return None
+
+
+def _emparejar(nuevos, terminal):
+    """
+    Recorre los eventos nuevos por orden de hora y los empareja con las
+    entradas abiertas y las salidas pendientes de su membresía:
+
+    - una salida cierra la entrada abierta anterior a ella; si no la hay,
+      queda pendiente hasta que llegue su entrada;
+    - una entrada toma la primera salida pendiente posterior (y anterior a la
+      entrada abierta, si la hay) y crea la asistencia ya cerrada; si no, abre
+      una asistencia, salvo que ya haya una abierta: entonces busca su salida
+      más adelante en el lote (antes de la abierta) y, si no la hay, se
+      rechaza y no se guarda, para que el terminal pueda reenviarla más tarde.
+
+    Returns:
+        (asistencias nuevas, asistencias existentes cerradas, salidas
+        pendientes emparejadas, entradas rechazadas)
+    """
+    membresia_ids = {evento.SocioMembresiaID_id for evento in nuevos}
+    abiertas, pendientes = {}, {}
+    for lote in _en_lotes(membresia_ids):
+        for asistencia in Asistencia.objects.filter(
+            SocioMembresiaID__in=lote, FechaHoraSalida__isnull=True
+        ).order_by():
+            abiertas[asistencia.SocioMembresiaID_id] = asistencia
+        for salida in EventoAcceso.objects.filter(
+            SocioMembresiaID__in=lote,
+            Tipo=EventoAcceso.TIPO_SALIDA,
+            AsistenciaID__isnull=True,
+        ).order_by("FechaHora", "id"):
+            pendientes.setdefault(salida.SocioMembresiaID_id, []).append(salida)
+
+    # Salidas del lote que una entrada puede tomar antes de llegar a ellas
+    salidas_del_lote, tomadas = {}, set()
+    for evento in nuevos:
+        if evento.Tipo == EventoAcceso.TIPO_SALIDA:
+            salidas_del_lote.setdefault(evento.SocioMembresiaID_id, []).append(evento)
+
+    creadas, cerradas, emparejadas, rechazadas = [], [], [], []
+    # A igual hora, la entrada va antes que la salida
+    for evento in sorted(
+        nuevos, key=lambda e: (e.FechaHora, e.Tipo != EventoAcceso.TIPO_ENTRADA)
+    ):
+        membresia_id = evento.SocioMembresiaID_id
+        abierta = abiertas.get(membresia_id)
+
+        if evento.Tipo == EventoAcceso.TIPO_SALIDA:
+            if id(evento) in tomadas:
+                continue
+            if abierta is not None and abierta.FechaHoraEntrada <= evento.FechaHora:
+                abierta.FechaHoraSalida = evento.FechaHora
+                evento.AsistenciaID = abierta
+                del abiertas[membresia_id]
+                if abierta.pk:
+                    cerradas.append(abierta)
+            else:
+                pendientes.setdefault(membresia_id, []).append(evento)
+            continue
+
+        limite = abierta.FechaHoraEntrada if abierta is not None else None
+        salida = min(
+            (
+                s for s in pendientes.get(membresia_id, [])
+                if s.FechaHora >= evento.FechaHora and (limite is None or s.FechaHora <= limite)
+            ),
+            key=lambda s: s.FechaHora,
+            default=None,
+        )
+        if salida is not None:
+            pendientes[membresia_id].remove(salida)
+        elif abierta is not None:
+            # Una visita anterior a la abierta: su salida aún no se ha recorrido
+            salida = min(
+                (
+                    s for s in salidas_del_lote.get(membresia_id, [])
+                    if id(s) not in tomadas and evento.FechaHora <= s.FechaHora <= limite
+                ),
+                key=lambda s: s.FechaHora,
+                default=None,
+            )
+            if salida is None:
+                rechazadas.append(evento)
+                continue
+            tomadas.add(id(salida))
+
+        asistencia = Asistencia(
+            SocioMembresiaID_id=membresia_id,
+            FechaHoraEntrada=evento.FechaHora,
+            FechaHoraSalida=salida.FechaHora if salida else None,
+            TerminalAcceso=terminal,
+        )
+        creadas.append(asistencia)
+        evento.AsistenciaID = asistencia
+        if salida is None:
+            abiertas[membresia_id] = asistencia
+        else:
+            salida.AsistenciaID = asistencia
+            if salida.pk:
+                emparejadas.append(salida)
+
+    return creadas, cerradas, emparejadas, rechazadas
+
+
+def ingerir_eventos(terminal, eventos):
+    """
+    Registra el lote de eventos que un terminal acumuló sin conexión.
+
+    Los eventos pueden llegar desordenados y repetidos: cada uno trae la hora
+    del terminal y una clave, y las claves ya recibidas de ese terminal (o
+    repetidas en el lote) se ignoran, así que reenviar un lote no duplica
+    nada. Las asistencias se escriben en bloque en una transacción, con un
+    número de consultas que no depende del tamaño del lote (hasta
+    TAMANO_LOTE_INGESTA filas).
+
+    Args:
+        terminal: identificador del terminal (TerminalAcceso)
+        eventos: lista de dicts con clave, tipo ('entrada' o 'salida'),
+            identificacion del socio y fecha_hora (ISO 8601)
+
+    Returns:
+        dict con 'registrados', 'duplicados', 'pendientes' (salidas que aún
+        esperan su entrada), 'rechazados' (entradas con otra ya abierta, que
+        no se guardan y se pueden reenviar) y 'errores' (lista de (posición
+        desde 1, mensaje))
+
+    Raises:
+        ValidationError: Si el terminal o el lote no son válidos, o si otro
+            envío tocó las mismas asistencias a la vez (se puede reintentar)
+    """
+    terminal = (terminal or "").strip()
+    if not terminal or len(terminal) > EventoAcceso._meta.get_field("TerminalAcceso").max_length:
+        raise ValidationError(
+            "El identificador del terminal es obligatorio (máximo 50 caracteres)."
+        )
+    if not isinstance(eventos, list):
+        raise ValidationError("Los eventos deben enviarse como una lista.")
+    if len(eventos) > MAXIMO_EVENTOS_LOTE:
+        raise ValidationError(f"El lote no puede tener más de {MAXIMO_EVENTOS_LOTE} eventos.")
+
+    ahora = timezone.now()
+    errores, validos, duplicados = [], {}, 0
+    for posicion, evento in enumerate(eventos, start=1):
+        try:
+            clave, tipo, identificacion, fecha_hora = _validar_evento(evento, ahora)
+        except ValidationError as e:
+            errores.append((posicion, str(e)))
+            continue
+        if clave in validos:
+            duplicados += 1
+            continue
+        validos[clave] = (posicion, tipo, identificacion, fecha_hora)
+
+    try:
+        with transaction.atomic():
+            for lote in _en_lotes(validos):
+                for clave in EventoAcceso.objects.filter(
+                    TerminalAcceso=terminal, Clave__in=lote
+                ).values_list("Clave", flat=True):
+                    del validos[clave]
+                    duplicados += 1
+
+            membresias = _membresias_por_identificacion(
+                {identificacion for _, _, identificacion, _ in validos.values()}
+            )
+            nuevos = []
+            for clave, (posicion, tipo, identificacion, fecha_hora) in validos.items():
+                membresia_id = _membresia_vigente(
+                    membresias.get(identificacion, []), timezone.localdate(fecha_hora)
+                )
+                if membresia_id is None:
+                    errores.append((
+                        posicion, "El socio no tenía una membresía vigente en la fecha del evento."
+                    ))
+                    continue
+                nuevos.append(EventoAcceso(
+                    TerminalAcceso=terminal,
+                    Clave=clave,
+                    Tipo=tipo,
+                    FechaHora=fecha_hora,
+                    SocioMembresiaID_id=membresia_id,
+                ))
+
+            creadas, cerradas, emparejadas, rechazadas = _emparejar(nuevos, terminal)
+            # Sin pk aún, los eventos se distinguen por identidad
+            descartados = {id(evento) for evento in rechazadas}
+            nuevos = [evento for evento in nuevos if id(evento) not in descartados]
+            # Primero se cierran las abiertas: la restricción admite una sola
+            # entrada abierta por membresía
+            Asistencia.objects.bulk_update(
+                cerradas, ["FechaHoraSalida"], batch_size=TAMANO_LOTE_INGESTA
+            )
+            Asistencia.objects.bulk_create(creadas, batch_size=TAMANO_LOTE_INGESTA)
+            EventoAcceso.objects.bulk_create(nuevos, batch_size=TAMANO_LOTE_INGESTA)
+            EventoAcceso.objects.bulk_update(
+                emparejadas, ["AsistenciaID"], batch_size=TAMANO_LOTE_INGESTA
+            )
+    except IntegrityError:
+        raise ValidationError(
+            "Otro envío registró eventos de los mismos socios a la vez. Reintenta el lote."
+        )
+
+    return {
+        "registrados": len(nuevos),
+        "duplicados": duplicados,
+        "pendientes": sum(
+            1 for e in nuevos if e.Tipo == EventoAcceso.TIPO_SALIDA and e.AsistenciaID is None
+        ),
+        "rechazados": len(rechazadas),
+        "errores": sorted(errores),
+    }
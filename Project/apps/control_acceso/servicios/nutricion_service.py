@@ -1,17 +1,41 @@
 from __future__ import annotations
 
+import re
+from collections import defaultdict
 from copy import deepcopy
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from itertools import zip_longest
 from typing import Dict, List
 
 from django.db import transaction
+from django.db.models import F, FloatField, Prefetch, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 
 from apps.control_acceso.models import (
     Alimento,
     ComidaAlimento,
     DiaComida,
+    DocumentoPlanNutricional,
     PlanNutricional,
 )
+from apps.socios.models import Socio
+
+
+# Filas por INSERT al copiar comidas en bloque
+TAMANO_LOTE_COPIA = 2000
+
+# "P: 12g, C: 58g, G: 7g" (también "Proteína: 12 g", "C: 12,5g", ...)
+_PATRON_MACRO = re.compile(r"\b([PCG])\w*\s*:\s*(\d+(?:[.,]\d+)?)", re.IGNORECASE)
+_COLUMNA_MACRO = {"P": "ProteinaG", "C": "CarbohidratosG", "G": "GrasaG"}
+MAXIMO_GRAMOS = Decimal("10000")
+
+# Aporte de cada alimento de una comida: valor por 100 g escalado por la porción
+APORTES = {
+    "kcal": "Kcal",
+    "proteina": "ProteinaG",
+    "carbohidratos": "CarbohidratosG",
+    "grasa": "GrasaG",
+}
 
 
 def _meal(tipo: str, items: List[Dict]) -> Dict:
@@ -117,6 +141,42 @@ PLANTILLAS_NUTRICION = {
 }
 
 
+def parsear_macros(texto: str | None) -> Dict[str, Decimal | None]:
+    """Columnas ProteinaG/CarbohidratosG/GrasaG a partir del texto libre de Macros."""
+    columnas = dict.fromkeys(_COLUMNA_MACRO.values())
+    for letra, valor in _PATRON_MACRO.findall(texto or ""):
+        columna = _COLUMNA_MACRO[letra.upper()]
+        if columnas[columna] is None:
+            try:
+                gramos = Decimal(valor.replace(",", ".")).quantize(Decimal("0.01"))
+            except InvalidOperation:
+                continue
+            # Fuera de rango para la columna (6 dígitos, 2 decimales): se deja vacío
+            if gramos < MAXIMO_GRAMOS:
+                columnas[columna] = gramos
+    return columnas
+
+
+def _aporte(campo: str):
+    porcion = Coalesce(Cast("Porcion", FloatField()), Value(100.0))
+    valor = Coalesce(Cast(F(f"AlimentoID__{campo}"), FloatField()), Value(0.0))
+    return valor * porcion / Value(100.0)
+
+
+def anotar_aportes(items):
+    """
+    Anota ``kcal``, ``proteina``, ``carbohidratos`` y ``grasa`` en un
+    queryset de ComidaAlimento.
+    """
+    return items.annotate(**{nombre: _aporte(campo) for nombre, campo in APORTES.items()})
+
+
+def totales_aportes(items) -> Dict[str, float]:
+    """Suma de los aportes de un queryset de ComidaAlimento en una sola consulta."""
+    totales = items.aggregate(**{nombre: Sum(_aporte(campo)) for nombre, campo in APORTES.items()})
+    return {nombre: valor or 0.0 for nombre, valor in totales.items()}
+
+
 def get_nutrition_templates():
     """Return metadata describing the available nutrition templates."""
     return [
@@ -140,28 +200,185 @@ def _obtener_meals_para_dia(plantilla: Dict) -> List[Dict]:
     return meals
 
 
-def _sincronizar_alimento(datos: Dict) -> Alimento:
-    alimento, _ = Alimento.objects.get_or_create(
-        Nombre=datos["nombre"],
-        defaults={
-            "PorcionBase": datos["porcion_base"],
-            "Kcal": datos["kcal"],
-            "Macros": datos["macros"],
-        },
+_CAMPOS_ALIMENTO = (("porcion_base", "PorcionBase"), ("kcal", "Kcal"), ("macros", "Macros"))
+
+
+def _sincronizar_alimentos(items: List[Dict]) -> Dict[str, int]:
+    """
+    Upsert en bloque de los alimentos de una plantilla.
+
+    Crea los que no existen y actualiza los que cambiaron con un SELECT, un
+    ``bulk_create`` y un ``bulk_update``. ``Alimento.Nombre`` no es único, así
+    que no se puede usar ON CONFLICT: si hay repetidos se usa el de menor id.
+
+    Returns:
+        dict nombre -> id del alimento
+    """
+    datos_por_nombre = {item["nombre"]: item for item in items}
+    existentes = {}
+    for alimento in Alimento.objects.filter(Nombre__in=datos_por_nombre).order_by("-id"):
+        existentes[alimento.Nombre] = alimento
+
+    nuevos, cambiados = [], []
+    for nombre, datos in datos_por_nombre.items():
+        alimento = existentes.get(nombre)
+        if alimento is None:
+            nuevos.append(Alimento(
+                Nombre=nombre,
+                PorcionBase=datos["porcion_base"],
+                Kcal=datos["kcal"],
+                Macros=datos["macros"],
+                **parsear_macros(datos["macros"]),
+            ))
+            continue
+        actualizado = False
+        for clave, campo in _CAMPOS_ALIMENTO:
+            if datos[clave] and getattr(alimento, campo) != datos[clave]:
+                setattr(alimento, campo, datos[clave])
+                actualizado = True
+        if actualizado:
+            for campo, valor in parsear_macros(alimento.Macros).items():
+                setattr(alimento, campo, valor)
+            cambiados.append(alimento)
+
+    if nuevos:
+        Alimento.objects.bulk_create(nuevos)
+    if cambiados:
+        Alimento.objects.bulk_update(
+            cambiados, [campo for _, campo in _CAMPOS_ALIMENTO] + list(_COLUMNA_MACRO.values())
+        )
+        DocumentoPlanNutricional.invalidar_por_alimentos([alimento.id for alimento in cambiados])
+    return {alimento.Nombre: alimento.id for alimento in [*existentes.values(), *nuevos]}
+
+
+def _escribir_semana(planes: List[PlanNutricional], semana: List[tuple]) -> None:
+    """
+    Inserta las comidas de ``semana`` (tuplas ``(dia, tipo, [(alimento_id,
+    porcion, cantidad), ...])``) en cada plan de ``planes`` con un
+    ``bulk_create`` para los DiaComida y otro para los ComidaAlimento
+    (partidos en lotes de TAMANO_LOTE_COPIA filas).
+    """
+    dias = DiaComida.objects.bulk_create(
+        [
+            DiaComida(PlanNutricionalID=plan, DiaSemana=dia, TipoComida=tipo)
+            for plan in planes
+            for dia, tipo, _ in semana
+        ],
+        batch_size=TAMANO_LOTE_COPIA,
+    )
+    ComidaAlimento.objects.bulk_create(
+        [
+            ComidaAlimento(
+                DiaComidaID=dia_comida,
+                AlimentoID_id=alimento_id,
+                Porcion=porcion,
+                Cantidad=cantidad,
+            )
+            for dia_comida, (_, _, items) in zip(dias, semana * len(planes))
+            for alimento_id, porcion, cantidad in items
+        ],
+        batch_size=TAMANO_LOTE_COPIA,
     )
-    actualizado = False
-    if datos["porcion_base"] and alimento.PorcionBase != datos["porcion_base"]:
-        alimento.PorcionBase = datos["porcion_base"]
-        actualizado = True
-    if datos["kcal"] and alimento.Kcal != datos["kcal"]:
-        alimento.Kcal = datos["kcal"]
-        actualizado = True
-    if datos["macros"] and alimento.Macros != datos["macros"]:
-        alimento.Macros = datos["macros"]
-        actualizado = True
-    if actualizado:
-        alimento.save()
-    return alimento
+
+
+def _diferenciar_alimentos(dia_comida, actuales, deseados, nuevos, cambiados, sobrantes) -> None:
+    """
+    Empareja los ComidaAlimento ``actuales`` de una comida con los
+    ``deseados`` por alimento y en orden de id, y reparte lo que hay que
+    escribir en ``nuevos``, ``cambiados`` y ``sobrantes`` (ids).
+    """
+    por_alimento = defaultdict(list)
+    for item in actuales:
+        por_alimento[item.AlimentoID_id].append(item)
+    for alimento_id, porcion, cantidad in deseados:
+        pendientes = por_alimento.get(alimento_id)
+        if not pendientes:
+            nuevos.append(ComidaAlimento(
+                DiaComidaID=dia_comida,
+                AlimentoID_id=alimento_id,
+                Porcion=porcion,
+                Cantidad=cantidad,
+            ))
+            continue
+        item = pendientes.pop(0)
+        if (item.Porcion, item.Cantidad) != (porcion, cantidad):
+            item.Porcion, item.Cantidad = porcion, cantidad
+            cambiados.append(item)
+    sobrantes.extend(item.id for pendientes in por_alimento.values() for item in pendientes)
+
+
+def _borrar_por_id(modelo, ids: List[int]) -> None:
+    for inicio in range(0, len(ids), TAMANO_LOTE_COPIA):
+        modelo.objects.filter(id__in=ids[inicio:inicio + TAMANO_LOTE_COPIA]).delete()
+
+
+def _sincronizar_semana(planes: List[PlanNutricional], semana: List[tuple]) -> None:
+    """
+    Deja las comidas de cada plan de ``planes`` como indica ``semana`` (mismo
+    formato que ``_escribir_semana``) escribiendo solo la diferencia.
+
+    Las comidas se emparejan por (día, tipo) en orden de id y sus alimentos
+    por alimento: lo emparejado conserva su id, y con él el registro de
+    comidas del socio; se actualizan las porciones y cantidades que cambiaron
+    y el resto se inserta o se borra en bloque. Las comidas y alimentos
+    nuevos quedan después de los existentes. Solo los planes que cambian
+    invalidan su documento compilado.
+    """
+    deseadas = defaultdict(list)
+    for dia, tipo, items in semana:
+        deseadas[(dia, tipo)].append(items)
+
+    items_por_comida = defaultdict(list)
+    for item in ComidaAlimento.objects.filter(
+        DiaComidaID__PlanNutricionalID__in=planes
+    ).order_by("id"):
+        items_por_comida[item.DiaComidaID_id].append(item)
+    actuales = defaultdict(lambda: defaultdict(list))
+    for dia_comida in DiaComida.objects.filter(PlanNutricionalID__in=planes).order_by("id"):
+        clave = (dia_comida.DiaSemana, dia_comida.TipoComida)
+        actuales[dia_comida.PlanNutricionalID_id][clave].append(dia_comida)
+
+    comidas_nuevas, items_nuevos, items_cambiados = [], [], []
+    comidas_sobrantes, items_sobrantes = [], []
+    planes_cambiados = []
+    for plan in planes:
+        comidas_plan = actuales.pop(plan.id, {})
+        escrituras = (
+            len(comidas_nuevas), len(items_nuevos), len(items_cambiados), len(items_sobrantes)
+        )
+        for (dia, tipo), lista in deseadas.items():
+            existentes = comidas_plan.pop((dia, tipo), [])
+            for dia_comida, items in zip_longest(existentes, lista):
+                if items is None:
+                    comidas_sobrantes.append(dia_comida.id)
+                    continue
+                if dia_comida is None:
+                    dia_comida = DiaComida(PlanNutricionalID=plan, DiaSemana=dia, TipoComida=tipo)
+                    comidas_nuevas.append(dia_comida)
+                _diferenciar_alimentos(
+                    dia_comida, items_por_comida.get(dia_comida.id, []),
+                    items, items_nuevos, items_cambiados, items_sobrantes,
+                )
+        # Lo que queda son comidas de (día, tipo) que ya no están en la semana
+        sobrantes = [dia_comida.id for lista in comidas_plan.values() for dia_comida in lista]
+        comidas_sobrantes.extend(sobrantes)
+        if sobrantes or escrituras != (
+            len(comidas_nuevas), len(items_nuevos), len(items_cambiados), len(items_sobrantes)
+        ):
+            planes_cambiados.append(plan.id)
+
+    if comidas_nuevas:
+        DiaComida.objects.bulk_create(comidas_nuevas, batch_size=TAMANO_LOTE_COPIA)
+    if items_nuevos:
+        ComidaAlimento.objects.bulk_create(items_nuevos, batch_size=TAMANO_LOTE_COPIA)
+    if items_cambiados:
+        ComidaAlimento.objects.bulk_update(
+            items_cambiados, ["Porcion", "Cantidad"], batch_size=TAMANO_LOTE_COPIA
+        )
+    _borrar_por_id(ComidaAlimento, items_sobrantes)
+    _borrar_por_id(DiaComida, comidas_sobrantes)
+    if planes_cambiados:
+        DocumentoPlanNutricional.invalidar(planes_cambiados)
 
 
 @transaction.atomic
@@ -171,7 +388,7 @@ def asignar_plan_desde_plantilla(socio, plantilla_slug: str, objetivo_personaliz
     if not plantilla:
         raise ValueError("La plantilla solicitada no existe.")
 
-    plan, _ = PlanNutricional.objects.get_or_create(
+    plan, creado = PlanNutricional.objects.get_or_create(
         SocioID=socio,
         EsPlantilla=False,
         defaults={"Nombre": plantilla["nombre"]},
@@ -181,61 +398,115 @@ def asignar_plan_desde_plantilla(socio, plantilla_slug: str, objetivo_personaliz
     plan.Nombre = plan.Nombre or plantilla["nombre"]
     plan.save()
 
-    # Limpiar comidas existentes para reescribir el plan completo
-    plan.dias_comida.all().delete()
-
-    for dia in range(7):
-        for meal in _obtener_meals_para_dia(plantilla):
-            dia_comida = DiaComida.objects.create(
-                PlanNutricionalID=plan,
-                DiaSemana=dia,
-                TipoComida=meal["tipo"],
-            )
-            for item in meal["items"]:
-                alimento = _sincronizar_alimento(item)
-                ComidaAlimento.objects.create(
-                    DiaComidaID=dia_comida,
-                    AlimentoID=alimento,
-                    Porcion=item["porcion"],
-                )
+    # Las comidas son iguales todos los días: se resuelven una vez y se
+    # repiten en memoria para la semana
+    meals = _obtener_meals_para_dia(plantilla)
+    alimentos = _sincronizar_alimentos([item for meal in meals for item in meal["items"]])
+    comidas_dia = [
+        (
+            meal["tipo"],
+            [(alimentos[item["nombre"]], item["porcion"], None) for item in meal["items"]],
+        )
+        for meal in meals
+    ]
+    semana = [(dia, tipo, items) for dia in range(7) for tipo, items in comidas_dia]
+    if creado:
+        _escribir_semana([plan], semana)
+    else:
+        # Solo se escribe lo que cambió: las comidas que siguen igual
+        # conservan su id y el registro de comidas del socio
+        _sincronizar_semana([plan], semana)
 
     return plan
 
 
-@transaction.atomic
-def aplicar_plan_desde_template_db(
-    template_plan: PlanNutricional, socio, objetivo_personalizado: int | None = None
-) -> PlanNutricional:
-    """Clona un plan plantilla almacenado en BD hacia el socio indicado."""
+def _validar_plantilla_db(template_plan: PlanNutricional) -> None:
     if not template_plan.EsPlantilla:
         raise ValueError("El plan proporcionado no es una plantilla.")
     if template_plan.SocioID_id:
         raise ValueError("Las plantillas no deben estar asociadas a un socio.")
 
-    plan, _ = PlanNutricional.objects.get_or_create(
-        SocioID=socio,
-        EsPlantilla=False,
-        defaults={"Nombre": template_plan.Nombre},
-    )
-    plan.Nombre = template_plan.Nombre or plan.Nombre
-    plan.ObjetivoCaloricoDiario = objetivo_personalizado or template_plan.ObjetivoCaloricoDiario
-    plan.EsPlantilla = False
-    plan.save()
 
-    plan.dias_comida.all().delete()
+@transaction.atomic
+def aplicar_plantilla_a_socios(
+    template_plan: PlanNutricional, socio_ids, objetivo_personalizado: int | None = None
+) -> List[Dict]:
+    """
+    Clona un plan plantilla almacenado en BD hacia varios socios a la vez.
+
+    La plantilla se lee una sola vez (comidas y alimentos prefetcheados) y
+    las copias se escriben en bloque: los planes nuevos con un
+    ``bulk_create`` y sus comidas con ``_escribir_semana``; los existentes
+    con un ``bulk_update`` y sus comidas con ``_sincronizar_semana``, que
+    solo toca lo que difiere de la plantilla. Todo o nada, en una transacción.
 
-    for dia in template_plan.dias_comida.all():
-        copia_dia = DiaComida.objects.create(
-            PlanNutricionalID=plan,
-            DiaSemana=dia.DiaSemana,
-            TipoComida=dia.TipoComida,
+    Returns:
+        lista con un dict por socio pedido: ``socio_id``, ``ok``, y
+        ``plan_id`` y ``creado`` si se aplicó o ``error`` si no
+    """
+    _validar_plantilla_db(template_plan)
+
+    semana = [
+        (dia.DiaSemana, dia.TipoComida, [
+            (item.AlimentoID_id, item.Porcion, item.Cantidad) for item in dia.alimentos.all()
+        ])
+        for dia in template_plan.dias_comida.order_by("DiaSemana", "id").prefetch_related(
+            Prefetch("alimentos", queryset=ComidaAlimento.objects.order_by("id"))
         )
-        for item in dia.alimentos.all():
-            ComidaAlimento.objects.create(
-                DiaComidaID=copia_dia,
-                AlimentoID=item.AlimentoID,
-                Porcion=item.Porcion,
-                Cantidad=item.Cantidad,
+    ]
+    objetivo = objetivo_personalizado or template_plan.ObjetivoCaloricoDiario
+
+    socio_ids = list(dict.fromkeys(int(socio_id) for socio_id in socio_ids))
+    existentes = set(Socio.objects.filter(id__in=socio_ids).values_list("id", flat=True))
+
+    planes = {}
+    for plan in PlanNutricional.objects.filter(
+        SocioID__in=existentes, EsPlantilla=False
+    ).order_by("-id"):
+        planes[plan.SocioID_id] = plan
+    for plan in planes.values():
+        plan.Nombre = template_plan.Nombre or plan.Nombre
+        plan.ObjetivoCaloricoDiario = objetivo
+    PlanNutricional.objects.bulk_update(
+        planes.values(), ["Nombre", "ObjetivoCaloricoDiario"], batch_size=TAMANO_LOTE_COPIA
+    )
+    nuevos = PlanNutricional.objects.bulk_create(
+        [
+            PlanNutricional(
+                SocioID_id=socio_id,
+                Nombre=template_plan.Nombre,
+                ObjetivoCaloricoDiario=objetivo,
+                EsPlantilla=False,
             )
+            for socio_id in socio_ids
+            if socio_id in existentes and socio_id not in planes
+        ],
+        batch_size=TAMANO_LOTE_COPIA,
+    )
+    _sincronizar_semana(list(planes.values()), semana)
+    _escribir_semana(nuevos, semana)
 
-    return plan
+    creados = {plan.SocioID_id: plan for plan in nuevos}
+    resultados = []
+    for socio_id in socio_ids:
+        plan = planes.get(socio_id) or creados.get(socio_id)
+        if plan is None:
+            resultados.append({"socio_id": socio_id, "ok": False, "error": "El socio no existe."})
+        else:
+            resultados.append({
+                "socio_id": socio_id,
+                "ok": True,
+                "plan_id": plan.id,
+                "creado": socio_id in creados,
+            })
+    return resultados
+
+
+def aplicar_plan_desde_template_db(
+    template_plan: PlanNutricional, socio, objetivo_personalizado: int | None = None
+) -> PlanNutricional:
+    """Clona un plan plantilla almacenado en BD hacia el socio indicado."""
+    resultado, = aplicar_plantilla_a_socios(template_plan, [socio.id], objetivo_personalizado)
+    if not resultado["ok"]:
+        raise ValueError(resultado["error"])
+    return PlanNutricional.objects.get(id=resultado["plan_id"])
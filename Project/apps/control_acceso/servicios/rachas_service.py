@@ -0,0 +1,299 @@
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from apps.control_acceso.models import RachaEntrenamiento, SesionEntrenamiento
+from apps.socios.models import Socio
+
+# Días de la semana que no cuentan como fallo (sábado y domingo)
+DIAS_FIN_DE_SEMANA = (5, 6)
+
+# Ventana del cálculo original: la racha se contaba hacia atrás hasta 365 días
+VENTANA_CALCULO_DIAS = 365
+
+MENSAJE_SIN_RACHA = "Comienza tu racha entrenando hoy"
+
+# Ranking de rachas del panel del entrenador: compartido entre entrenadores
+TOP_RACHAS_CACHE_SEGUNDOS = 60
+
+
+def _dias_laborables_entre(inicio, fin):
+    """
+    Cuenta los días entre semana estrictamente entre ``inicio`` y ``fin``
+    (sin incluir ninguno de los dos) sin recorrerlos uno a uno.
+    """
+    dias = (fin - inicio).days - 1
+    if dias <= 0:
+        return 0
+
+    semanas, resto = divmod(dias, 7)
+    laborables = semanas * 5
+    primer_dia = (inicio.weekday() + 1) % 7
+    for i in range(resto):
+        if (primer_dia + i) % 7 not in DIAS_FIN_DE_SEMANA:
+            laborables += 1
+    return laborables
+
+
+def _avanzar_racha(racha_actual, inicio_racha, ultimo_dia, dia):
+    """
+    Añade un día de entrenamiento posterior a ``ultimo_dia``. La racha sigue
+    si entre ambos días falta como mucho un día entre semana (los fines de
+    semana no penalizan); si no, empieza de nuevo.
+    """
+    if ultimo_dia is None or _dias_laborables_entre(ultimo_dia, dia) > 1:
+        return 1, dia, dia
+    return racha_actual + 1, inicio_racha, dia
+
+
+def _dias_con_sesion_completada(socio_id):
+    fechas = SesionEntrenamiento.objects.filter(
+        SocioMembresiaID__SocioID_id=socio_id, FechaFin__isnull=False
+    ).values_list("FechaInicio", flat=True)
+    return {fecha.date() for fecha in fechas}
+
+
+def aplicar_dias(racha, dias):
+    """Recalcula ``racha`` (sin guardar) a partir de un conjunto de días."""
+    racha.RachaActual, racha.InicioRacha, racha.UltimoDiaEntreno = 0, None, None
+    for dia in sorted(dias):
+        (
+            racha.RachaActual,
+            racha.InicioRacha,
+            racha.UltimoDiaEntreno,
+        ) = _avanzar_racha(
+            racha.RachaActual, racha.InicioRacha, racha.UltimoDiaEntreno, dia
+        )
+    return racha
+
+
+def fecha_de_sesion(sesion):
+    """Día que cuenta para la racha: la fecha (UTC) de inicio de la sesión."""
+    return sesion.FechaInicio.astimezone(dt_timezone.utc).date()
+
+
+def reconstruir_racha(socio_id):
+    """
+    Recalcula desde el historial de sesiones la racha de un socio.
+
+    Returns:
+        RachaEntrenamiento guardada
+    """
+    racha, _ = RachaEntrenamiento.objects.get_or_create(SocioID_id=socio_id)
+    aplicar_dias(racha, _dias_con_sesion_completada(socio_id))
+    racha.save()
+    return racha
+
+
+def registrar_dia_entrenamiento(socio_id, dia):
+    """
+    Actualiza la racha cuando se cierra una sesión del día ``dia``.
+
+    Solo toca el registro del socio. Si el registro aún no existía o llega
+    un día anterior al último registrado, se reconstruye desde el historial.
+
+    Returns:
+        RachaEntrenamiento actualizada
+    """
+    with transaction.atomic():
+        _, creada = RachaEntrenamiento.objects.get_or_create(SocioID_id=socio_id)
+        racha = RachaEntrenamiento.objects.select_for_update().get(
+            SocioID_id=socio_id
+        )
+
+        ultimo_dia = racha.UltimoDiaEntreno
+        if creada or (ultimo_dia is not None and dia < ultimo_dia):
+            aplicar_dias(racha, _dias_con_sesion_completada(socio_id))
+        elif dia == ultimo_dia:
+            return racha
+        else:
+            (
+                racha.RachaActual,
+                racha.InicioRacha,
+                racha.UltimoDiaEntreno,
+            ) = _avanzar_racha(racha.RachaActual, racha.InicioRacha, ultimo_dia, dia)
+
+        racha.save()
+        return racha
+
+
+def racha_vigente(racha_actual, ultimo_dia, hoy):
+    """
+    Días de racha que se muestran hoy: la racha guardada si sigue viva
+    (entrenó hoy, ayer o solo hay fin de semana de por medio), si no 0.
+    """
+    if ultimo_dia is None or ultimo_dia > hoy:
+        return 0
+    if (hoy - ultimo_dia).days <= 1 or _dias_laborables_entre(ultimo_dia, hoy) == 0:
+        return racha_actual
+    return 0
+
+
+def resumen_racha(racha, hoy=None):
+    """
+    Datos de racha para el panel del socio, calculados en O(1) desde el
+    registro guardado.
+
+    Returns:
+        dict con racha_dias, racha_en_peligro y mensaje_racha
+    """
+    hoy = hoy or timezone.now().date()
+    ultimo_dia = racha.UltimoDiaEntreno if racha else None
+    racha_dias = racha_vigente(racha.RachaActual, ultimo_dia, hoy) if racha else 0
+
+    resumen = {
+        "racha_dias": racha_dias,
+        "racha_en_peligro": False,
+        "mensaje_racha": MENSAJE_SIN_RACHA,
+    }
+    if not racha_dias:
+        return resumen
+
+    dias_texto = "día" if racha_dias == 1 else "días"
+    if ultimo_dia == hoy:
+        resumen["mensaje_racha"] = f"¡Genial! Llevas {racha_dias} {dias_texto} seguidos"
+    elif ultimo_dia == hoy - timedelta(days=1):
+        if hoy.weekday() in DIAS_FIN_DE_SEMANA:
+            resumen["mensaje_racha"] = (
+                "🌴 Es fin de semana, está bien si descansas :) "
+                f"No perderás tu racha de {racha_dias} días"
+            )
+        else:
+            resumen["racha_en_peligro"] = True
+            resumen["mensaje_racha"] = (
+                f"⚠️ ¡Si hoy no entrenas perderás tu racha de {racha_dias} días!"
+            )
+    else:
+        resumen["racha_en_peligro"] = True
+        resumen["mensaje_racha"] = (
+            f"⚠️ Tu racha de {racha_dias} días sigue tras el fin de semana. "
+            "Retoma hoy para mantenerla."
+        )
+    return resumen
+
+
+def obtener_resumen_racha(socio_id, hoy=None):
+    """
+    Resumen de racha de un socio. Si todavía no tiene registro (socios previos
+    a la tabla de rachas) se construye una vez desde el historial.
+    """
+    racha = RachaEntrenamiento.objects.filter(SocioID_id=socio_id).first()
+    if racha is None:
+        racha = reconstruir_racha(socio_id)
+    return resumen_racha(racha, hoy)
+
+
+def calcular_racha_desde_dias(dias, hoy):
+    """
+    Cálculo original del panel: recorre hacia atrás desde hoy (hasta 365
+    días) con un día de gracia entre semana. Se conserva como referencia
+    para verificar las rachas guardadas.
+    """
+    dias = set(dias)
+    if not dias:
+        return 0
+
+    ultimo_dia = max(dias)
+    ayer = hoy - timedelta(days=1)
+    if hoy in dias:
+        fecha_actual = hoy
+    elif ayer in dias:
+        fecha_actual = ayer
+    elif ultimo_dia < ayer and all(
+        (ultimo_dia + timedelta(days=i)).weekday() in DIAS_FIN_DE_SEMANA
+        for i in range(1, (hoy - ultimo_dia).days)
+    ):
+        fecha_actual = ultimo_dia
+    else:
+        return 0
+
+    racha_dias = 1
+    dias_sin_entrenar = 0
+    for i in range(1, VENTANA_CALCULO_DIAS):
+        fecha_anterior = fecha_actual - timedelta(days=i)
+        if fecha_anterior in dias:
+            racha_dias += 1
+            dias_sin_entrenar = 0
+        elif fecha_anterior.weekday() not in DIAS_FIN_DE_SEMANA:
+            dias_sin_entrenar += 1
+            if dias_sin_entrenar > 1:
+                break
+    return racha_dias
+
+
+# Huecos e islas: dentro de una racha de días seguidos, ``dia - nº de fila``
+# es constante. PostgreSQL resta enteros a fechas; SQLite usa julianday.
+_GRUPO_ISLA_SQL = {
+    "postgresql": (
+        "dia - CAST(ROW_NUMBER() OVER (PARTITION BY socio_id ORDER BY dia) AS integer)"
+    ),
+    "sqlite": "julianday(dia) - ROW_NUMBER() OVER (PARTITION BY socio_id ORDER BY dia)",
+}
+
+
+def _consultar_top_rachas(hoy, limite):
+    dias = (
+        SesionEntrenamiento.objects.order_by()
+        .annotate(
+            socio_id=F("SocioMembresiaID__SocioID"),
+            dia=TruncDate("FechaInicio", tzinfo=dt_timezone.utc),
+        )
+        .values("socio_id", "dia")
+        .distinct()
+    )
+    dias_sql, dias_params = dias.query.sql_with_params()
+    grupo_sql = _GRUPO_ISLA_SQL.get(connection.vendor, _GRUPO_ISLA_SQL["sqlite"])
+
+    sql = f"""
+        WITH dias AS ({dias_sql}),
+        islas AS (
+            SELECT socio_id, dia,
+                   MAX(dia) OVER (PARTITION BY socio_id) AS ultima,
+                   {grupo_sql} AS grupo
+            FROM dias
+        )
+        SELECT socio_id, COUNT(*) AS racha, MAX(ultima) AS ultima
+        FROM islas
+        WHERE dia <= %s
+        GROUP BY socio_id, grupo
+        HAVING MAX(dia) = %s
+        ORDER BY racha DESC, ultima DESC, socio_id
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*dias_params, hoy, hoy, limite))
+        return cursor.fetchall()
+
+
+def obtener_top_rachas(hoy=None, limite=5):
+    """
+    Socios con más días seguidos entrenando hasta hoy, para el panel del
+    entrenador. Se calcula en una sola consulta y se cachea unos segundos.
+
+    Returns:
+        lista de dicts con socio, streak y last_date
+    """
+    hoy = hoy or timezone.localdate()
+    clave = f"entrenador:top_rachas:{hoy.isoformat()}:{limite}"
+    top = cache.get(clave)
+    if top is not None:
+        return top
+
+    filas = _consultar_top_rachas(hoy, limite)
+    socios = Socio.objects.in_bulk([socio_id for socio_id, _, _ in filas])
+    top = [
+        {
+            "socio": socios[socio_id],
+            "streak": racha,
+            # SQLite devuelve las fechas calculadas como texto
+            "last_date": date.fromisoformat(ultima) if isinstance(ultima, str) else ultima,
+        }
+        for socio_id, racha, ultima in filas
+        if socio_id in socios
+    ]
+    cache.set(clave, top, TOP_RACHAS_CACHE_SEGUNDOS)
+    return top
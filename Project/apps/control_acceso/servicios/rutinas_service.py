@@ -3,6 +3,14 @@ from django.db import IntegrityError, transaction
 from apps.control_acceso.models import DiaRutinaEjercicio, Ejercicio, RutinaSemanal
 from apps.socios.models import Socio
 
+# Filas por INSERT al clonar plantillas (por debajo del límite de parámetros
+# de PostgreSQL incluso para DiaRutinaEjercicio)
+TAMANO_LOTE_CLONADO = 2000
+# Campos de DiaRutinaEjercicio que se copian de la plantilla
+CAMPOS_CLONADOS = (
+    "EjercicioID_id", "DiaSemana", "Series", "Repeticiones", "Tempo", "PesoObjetivo",
+)
+
 
 class ValidationError(ValueError):
     pass
@@ -130,6 +138,151 @@ def asignar_ejercicio_a_rutina(
         )
 
 
+def asignar_ejercicios_bulk(rutina_id, items):
+    """
+    Asigna varios ejercicios a una rutina de una vez: valida todos los items
+    en memoria, resuelve los ejercicios con una sola consulta ``IN`` y los
+    inserta con un único ``bulk_create``. Un item inválido no impide que se
+    guarden los demás.
+
+    Args:
+        rutina_id: ID de la rutina
+        items: lista de dicts con las claves de ``asignar_ejercicio_a_rutina``
+            (ejercicio_id, dia_semana, series, repeticiones, tempo,
+            peso_objetivo)
+
+    Returns:
+        dict con 'creados' (DiaRutinaEjercicio insertados, en el orden de
+        ``items``) y 'errores' (lista de (posición desde 1, mensaje) con los
+        mismos mensajes que ``asignar_ejercicio_a_rutina``)
+
+    Raises:
+        ValidationError: Si la rutina no existe
+    """
+    try:
+        rutina = RutinaSemanal.objects.get(id=rutina_id)
+    except RutinaSemanal.DoesNotExist:
+        raise ValidationError("La rutina especificada no existe.")
+
+    ids_ejercicios = set()
+    for item in items:
+        try:
+            ids_ejercicios.add(int(item.get("ejercicio_id")))
+        except (TypeError, ValueError):
+            pass
+    ejercicios = Ejercicio.objects.in_bulk(ids_ejercicios) if ids_ejercicios else {}
+    asignados = set(
+        DiaRutinaEjercicio.objects.filter(RutinaID=rutina)
+        .order_by()
+        .values_list("EjercicioID_id", "DiaSemana")
+    )
+
+    nuevos, errores = [], []
+    for posicion, item in enumerate(items, start=1):
+        dia_semana = item.get("dia_semana")
+        series = item.get("series")
+        repeticiones = item.get("repeticiones")
+        peso_objetivo = item.get("peso_objetivo")
+        try:
+            try:
+                ejercicio = ejercicios[int(item.get("ejercicio_id"))]
+            except (KeyError, TypeError, ValueError):
+                raise ValidationError("El ejercicio especificado no existe.")
+            validar_dia_semana(dia_semana)
+            validar_valores_positivos(series, repeticiones, peso_objetivo)
+            if (ejercicio.id, dia_semana) in asignados:
+                raise ValidationError(
+                    f"Ya existe este ejercicio asignado en el día {dia_semana} de esta rutina."
+                )
+        except ValidationError as e:
+            errores.append((posicion, str(e)))
+            continue
+        asignados.add((ejercicio.id, dia_semana))
+        nuevos.append(
+            DiaRutinaEjercicio(
+                RutinaID=rutina,
+                EjercicioID=ejercicio,
+                DiaSemana=dia_semana,
+                Series=series,
+                Repeticiones=repeticiones,
+                Tempo=item.get("tempo") or "",
+                PesoObjetivo=peso_objetivo,
+            )
+        )
+
+    if nuevos:
+        try:
+            with transaction.atomic():
+                DiaRutinaEjercicio.objects.bulk_create(nuevos)
+        except IntegrityError:
+            # Otra petición asignó los mismos ejercicios mientras validábamos
+            raise ValidationError("Algunos ejercicios ya estaban asignados a esta rutina.")
+    return {"creados": nuevos, "errores": errores}
+
+
+def clonar_rutina_a_socios(plantilla, socio_ids):
+    """
+    Copia una rutina del banco y todos sus ejercicios a varios socios.
+
+    La plantilla sigue en el banco. Las copias se escriben por conjuntos en
+    una transacción: un ``bulk_create`` para las rutinas y otro para sus
+    DiaRutinaEjercicio, ya apuntando a los ids nuevos (en lotes de
+    TAMANO_LOTE_CLONADO filas).
+
+    Args:
+        plantilla: RutinaSemanal con EsPlantilla=True
+        socio_ids: IDs de los socios (los repetidos se ignoran)
+
+    Returns:
+        lista con un dict por socio pedido: ``socio_id``, ``ok``, y
+        ``rutina_id`` si se copió o ``error`` si no
+
+    Raises:
+        ValidationError: Si la rutina no es una plantilla del banco
+    """
+    if not plantilla.EsPlantilla:
+        raise ValidationError("La rutina especificada no es una plantilla del banco.")
+
+    socio_ids = list(dict.fromkeys(int(socio_id) for socio_id in socio_ids))
+    existentes = set(Socio.objects.filter(id__in=socio_ids).values_list("id", flat=True))
+    ejercicios = list(
+        DiaRutinaEjercicio.objects.filter(RutinaID=plantilla)
+        .order_by("DiaSemana", "id")
+        .values(*CAMPOS_CLONADOS)
+    )
+
+    with transaction.atomic():
+        rutinas = RutinaSemanal.objects.bulk_create(
+            [
+                RutinaSemanal(
+                    SocioID_id=socio_id,
+                    Nombre=plantilla.Nombre,
+                    DiasEntrenamiento=plantilla.DiasEntrenamiento,
+                    EsPlantilla=False,
+                )
+                for socio_id in socio_ids
+                if socio_id in existentes
+            ],
+            batch_size=TAMANO_LOTE_CLONADO,
+        )
+        DiaRutinaEjercicio.objects.bulk_create(
+            (
+                DiaRutinaEjercicio(RutinaID_id=rutina.id, **ejercicio)
+                for rutina in rutinas
+                for ejercicio in ejercicios
+            ),
+            batch_size=TAMANO_LOTE_CLONADO,
+        )
+
+    creadas = {rutina.SocioID_id: rutina.id for rutina in rutinas}
+    return [
+        {"socio_id": socio_id, "ok": True, "rutina_id": creadas[socio_id]}
+        if socio_id in creadas
+        else {"socio_id": socio_id, "ok": False, "error": "El socio no existe."}
+        for socio_id in socio_ids
+    ]
+
+
 def obtener_ejercicios_por_dia(rutina_id, dia_semana):
     """
     Obtiene todos los ejercicios asignados a un día específico de una rutina.
@@ -0,0 +1,157 @@
+"""
+Progreso de las sesiones de entrenamiento: contadores desnormalizados en
+SesionEntrenamiento (TotalEjercicios y EjerciciosCompletados) que se
+mantienen con UPDATE atómicos en vez de contar las filas en cada clic
+"""
+from django.db import connection, transaction
+
+from apps.control_acceso.models import (
+    DiaRutinaEjercicio,
+    EjercicioSesionCompletado,
+    SesionEntrenamiento,
+)
+
+
+def crear_sesion(rutina, membresia, dia_semana, fecha_inicio, entrenamiento_libre=False):
+    """
+    Crea la sesión y una fila de EjercicioSesionCompletado por cada ejercicio
+    de la rutina para ``dia_semana`` (ninguna en entrenamiento libre), con un
+    solo insert para todas. Tres consultas como máximo; dentro de otra
+    transacción no abre un savepoint propio (si algo falla, falla la de fuera).
+    """
+    ejercicios = []
+    if not entrenamiento_libre and rutina:
+        ejercicios = list(
+            DiaRutinaEjercicio.objects.filter(RutinaID=rutina, DiaSemana=dia_semana)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    sesion = SesionEntrenamiento(
+        RutinaID=rutina,
+        SocioMembresiaID=membresia,
+        FechaInicio=fecha_inicio,
+        DiaSemana=dia_semana,
+        EsEntrenamientoLibre=entrenamiento_libre,
+        TotalEjercicios=len(ejercicios),
+    )
+    with transaction.atomic(savepoint=False):
+        sesion.save()
+        if not ejercicios:
+            return sesion
+        EjercicioSesionCompletado.objects.bulk_create(
+            EjercicioSesionCompletado(SesionID=sesion, DiaRutinaEjercicioID_id=ejercicio_id)
+            for ejercicio_id in ejercicios
+        )
+    return sesion
+
+
+def _columna(modelo, campo):
+    return connection.ops.quote_name(modelo._meta.get_field(campo).column)
+
+
+def _actualizar_devolviendo(sql, params):
+    # El ORM no expone UPDATE ... RETURNING; PostgreSQL y SQLite (3.35+) sí
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone()
+
+
+def alternar_ejercicio(sesion, dia_rutina_ejercicio_id):
+    """
+    Marca o desmarca un ejercicio de la sesión y ajusta su contador.
+
+    Los valores nuevos se calculan en la base de datos (``NOT Completado`` y
+    ``EjerciciosCompletados ± 1``), así que dos clics seguidos no pueden
+    pisarse ni descuadrar el contador. En PostgreSQL es una sola sentencia
+    (un CTE con el primer UPDATE); SQLite no admite UPDATE dentro de un CTE
+    y hace los dos ``UPDATE ... RETURNING`` en una transacción.
+
+    Returns:
+        tupla (completado, completados, total), o None si el ejercicio no es
+        de la sesión
+    """
+    tabla_fila = connection.ops.quote_name(EjercicioSesionCompletado._meta.db_table)
+    completado = _columna(EjercicioSesionCompletado, "Completado")
+    tabla_sesion = connection.ops.quote_name(SesionEntrenamiento._meta.db_table)
+    completados = _columna(SesionEntrenamiento, "EjerciciosCompletados")
+    total = _columna(SesionEntrenamiento, "TotalEjercicios")
+
+    filtro_fila = (
+        f"WHERE {_columna(EjercicioSesionCompletado, 'SesionID')} = %s "
+        f"AND {_columna(EjercicioSesionCompletado, 'DiaRutinaEjercicioID')} = %s"
+    )
+    filtro_sesion = f"WHERE {_columna(SesionEntrenamiento, 'id')} = %s"
+
+    if connection.vendor == "postgresql":
+        fila = _actualizar_devolviendo(
+            f"WITH fila AS (UPDATE {tabla_fila} SET {completado} = NOT {completado} "
+            f"{filtro_fila} RETURNING {completado}) "
+            f"UPDATE {tabla_sesion} SET {completados} = {completados} + "
+            f"(SELECT CASE WHEN {completado} THEN 1 ELSE -1 END FROM fila) "
+            f"{filtro_sesion} AND EXISTS (SELECT 1 FROM fila) "
+            f"RETURNING (SELECT {completado} FROM fila), {completados}, {total}",
+            (sesion.id, dia_rutina_ejercicio_id, sesion.id),
+        )
+        if fila is None:
+            return None
+        marcado = bool(fila[0])
+        sesion.EjerciciosCompletados, sesion.TotalEjercicios = fila[1:]
+        return marcado, sesion.EjerciciosCompletados, sesion.TotalEjercicios
+
+    with transaction.atomic(savepoint=False):
+        fila = _actualizar_devolviendo(
+            f"UPDATE {tabla_fila} SET {completado} = NOT {completado} "
+            f"{filtro_fila} RETURNING {completado}",
+            (sesion.id, dia_rutina_ejercicio_id),
+        )
+        if fila is None:
+            return None
+        marcado = bool(fila[0])
+
+        contadores = _actualizar_devolviendo(
+            f"UPDATE {tabla_sesion} SET {completados} = {completados} + %s "
+            f"{filtro_sesion} RETURNING {completados}, {total}",
+            (1 if marcado else -1, sesion.id),
+        )
+    sesion.EjerciciosCompletados, sesion.TotalEjercicios = contadores
+    return marcado, sesion.EjerciciosCompletados, sesion.TotalEjercicios
+
+
+def terminar_sesion(sesion, fecha_fin, notas=None):
+    """
+    Cierra la sesión con un UPDATE condicionado a que siga abierta.
+
+    Solo escribe FechaFin, DuracionMinutos y (si vienen) las notas: los
+    contadores son los de la base de datos y se devuelven con RETURNING, así
+    que un clic que entre mientras se cierra no se pierde y la comprobación
+    de "todo completado" usa lo último que se guardó.
+
+    Returns:
+        tupla (completados, total), o None si otra petición ya la cerró
+    """
+    duracion = int((fecha_fin - sesion.FechaInicio).total_seconds() / 60)
+    asignaciones = [
+        (_columna(SesionEntrenamiento, "FechaFin"),
+         connection.ops.adapt_datetimefield_value(fecha_fin)),
+        (_columna(SesionEntrenamiento, "DuracionMinutos"), duracion),
+    ]
+    if notas:
+        asignaciones.append((_columna(SesionEntrenamiento, "NotasSesion"), notas))
+
+    contadores = _actualizar_devolviendo(
+        f"UPDATE {connection.ops.quote_name(SesionEntrenamiento._meta.db_table)} "
+        f"SET {', '.join(f'{columna} = %s' for columna, _ in asignaciones)} "
+        f"WHERE {_columna(SesionEntrenamiento, 'id')} = %s "
+        f"AND {_columna(SesionEntrenamiento, 'FechaFin')} IS NULL "
+        f"RETURNING {_columna(SesionEntrenamiento, 'EjerciciosCompletados')}, "
+        f"{_columna(SesionEntrenamiento, 'TotalEjercicios')}",
+        [valor for _, valor in asignaciones] + [sesion.id],
+    )
+    if contadores is None:
+        return None
+    sesion.FechaFin, sesion.DuracionMinutos = fecha_fin, duracion
+    if notas:
+        sesion.NotasSesion = notas
+    sesion.EjerciciosCompletados, sesion.TotalEjercicios = contadores
+    return contadores
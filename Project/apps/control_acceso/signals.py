@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.control_acceso.models import Alimento, DocumentoPlanNutricional
+
+
+@receiver([post_save, pre_delete], sender=Alimento)
+def invalidar_documentos_por_alimento(sender, instance, **kwargs):
+    """Los documentos compilados copian nombre, kcal y macros de cada alimento."""
+    if not kwargs.get("created"):
+        DocumentoPlanNutricional.invalidar_por_alimentos([instance.id])
@@ -0,0 +1,155 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.control_acceso.models import (
+    Alimento,
+    ComidaAlimento,
+    DiaComida,
+    DocumentoPlanNutricional,
+    PlanNutricional,
+)
+from apps.control_acceso.servicios import documento_nutricion
+from apps.control_acceso.servicios.documento_nutricion import obtener_documento
+from apps.control_acceso.servicios.nutricion_service import asignar_plan_desde_plantilla
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.models import Socio
+
+
+class DocumentoPlanNutricionalTests(TestCase):
+    def setUp(self):
+        self.socio = Socio.objects.create(Identificacion="1", NombreCompleto="Socio Documento")
+        self.plan = PlanNutricional.objects.create(SocioID=self.socio)
+        self.arroz = Alimento.objects.create(
+            Nombre="Arroz", Kcal=200, ProteinaG=Decimal("4"), CarbohidratosG=Decimal("40"),
+            GrasaG=Decimal("1"),
+        )
+        self.almuerzo = DiaComida.objects.create(
+            PlanNutricionalID=self.plan, DiaSemana=2, TipoComida="Almuerzo"
+        )
+        DiaComida.objects.create(PlanNutricionalID=self.plan, DiaSemana=2, TipoComida=None)
+        self.item = ComidaAlimento.objects.create(
+            DiaComidaID=self.almuerzo, AlimentoID=self.arroz, Porcion=Decimal("150")
+        )
+        ComidaAlimento.objects.create(DiaComidaID=self.almuerzo, AlimentoID=self.arroz, Cantidad=2)
+
+    def _plan(self):
+        return PlanNutricional.objects.select_related("documento").get(id=self.plan.id)
+
+    def test_contenido_con_aportes_y_totales(self):
+        dias = obtener_documento(self.plan).Contenido["dias"]
+
+        self.assertEqual([dia["nombre"] for dia in dias][:3], ["Lunes", "Martes", "Miércoles"])
+        almuerzo, sin_tipo = dias[2]["comidas"]
+        self.assertEqual((almuerzo["id"], sin_tipo["tipo"]), (self.almuerzo.id, "Comida"))
+        porcion, unidades = almuerzo["alimentos"]
+        self.assertEqual(porcion["id"], self.item.id)
+        self.assertEqual(porcion["nombre_display"], "Arroz (150g)")
+        self.assertEqual((porcion["porcion"], porcion["porcion_texto"]), ("150.00", "150 g"))
+        self.assertEqual(porcion["macros_texto"], "300 kcal | P: 6.0g, C: 60.0g, G: 1.5g")
+        self.assertEqual(porcion["macros"], "P: 4g, C: 40g, G: 1g")
+        # Sin porción cuenta como 100 g
+        self.assertEqual(unidades["nombre_display"], "Arroz (2 un.)")
+        self.assertEqual(
+            dias[2]["totales"],
+            {"kcal": 500, "proteina": 10.0, "carbohidratos": 100.0, "grasa": 2.5},
+        )
+        self.assertEqual(dias[0], {"indice": 0, "nombre": "Lunes", "comidas": [], "totales": {
+            "kcal": 0, "proteina": 0, "carbohidratos": 0, "grasa": 0,
+        }})
+
+    def test_se_compila_una_vez_y_se_lee_sin_consultas(self):
+        plan = self._plan()
+        # La fila vacía (INSERT y su savepoint), dos lecturas y el UPDATE
+        with self.assertNumQueries(6):
+            documento = obtener_documento(plan)
+        self.assertEqual(documento.Version, 1)
+
+        plan = self._plan()
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_documento(plan).etiqueta(), documento.etiqueta())
+
+    def test_cambios_del_plan_o_de_un_alimento_invalidan(self):
+        obtener_documento(self.plan)
+
+        self.arroz.Kcal = 100
+        self.arroz.save()
+        documento = obtener_documento(self._plan())
+        # Sube al invalidar y al recompilar
+        self.assertEqual(documento.Version, 3)
+        self.assertEqual(documento.Contenido["dias"][2]["totales"]["kcal"], 250)
+
+        # Un alimento que el plan no usa no lo toca
+        Alimento.objects.create(Nombre="Agua").save()
+        self.assertTrue(self._plan().documento.Vigente)
+
+        otro = Socio.objects.create(Identificacion="2", NombreCompleto="Otro")
+        plan = asignar_plan_desde_plantilla(otro, "equilibrado")
+        version = obtener_documento(plan).Version
+        asignar_plan_desde_plantilla(otro, "equilibrado")
+        self.assertTrue(DocumentoPlanNutricional.objects.get(PlanNutricionalID=plan).Vigente)
+        asignar_plan_desde_plantilla(otro, "deficit_suave")
+        plan = PlanNutricional.objects.select_related("documento").get(id=plan.id)
+        self.assertEqual(obtener_documento(plan).Version, version + 2)
+
+    def test_un_cambio_durante_la_compilacion_no_se_pisa(self):
+        compilar = documento_nutricion.compilar_documento
+
+        def compilar_y_editar(plan):
+            # El entrenador cambia la porción entre la compilación y el guardado
+            contenido = compilar(plan)
+            if espia.call_count == 1:
+                ComidaAlimento.objects.filter(id=self.item.id).update(Porcion=Decimal("50"))
+                DocumentoPlanNutricional.invalidar([plan.id])
+            return contenido
+
+        with mock.patch.object(
+            documento_nutricion, "compilar_documento", side_effect=compilar_y_editar
+        ) as espia:
+            documento = obtener_documento(self._plan())
+
+        self.assertEqual(espia.call_count, 2)
+        guardado = DocumentoPlanNutricional.objects.get(PlanNutricionalID=self.plan)
+        self.assertTrue(guardado.Vigente)
+        self.assertEqual((guardado.Version, documento.Version), (2, 2))
+        porcion = guardado.Contenido["dias"][2]["comidas"][0]["alimentos"][0]
+        self.assertEqual(porcion["porcion_texto"], "50 g")
+        self.assertEqual(documento.Contenido, guardado.Contenido)
+
+    def test_dos_lecturas_crean_el_documento_a_la_vez(self):
+        plan = self._plan()  # Aún sin documento
+        # Otra lectura crea la fila antes de que esta llegue al INSERT
+        DocumentoPlanNutricional.objects.create(PlanNutricionalID=self.plan)
+
+        documento = obtener_documento(plan)
+
+        self.assertEqual((documento.Version, documento.Vigente), (1, True))
+        self.assertEqual(
+            DocumentoPlanNutricional.objects.filter(PlanNutricionalID=self.plan).count(), 1
+        )
+
+    def test_vistas_del_entrenador_invalidan_y_leen_el_documento(self):
+        rol = Rol.objects.create(NombreRol="Entrenador")
+        usuario = Usuario.objects.create(
+            NombreUsuario="coach", Email="coach@test.com",
+            PasswordHash=make_password("clave12345"), RolID=rol,
+        )
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "entrenador"
+        session.save()
+        obtener_documento(self.plan)
+
+        self.client.post(
+            reverse("entrenador_nutricion_actualizar_alimento", args=[self.item.id]),
+            {"porcion": "50"},
+        )
+        self.assertFalse(self._plan().documento.Vigente)
+
+        respuesta = self.client.get(reverse("entrenador_plan_nutricion", args=[self.socio.id]))
+        self.assertContains(respuesta, "50 g · 100 kcal")
+        self.assertEqual(self._plan().documento.Version, 3)
@@ -0,0 +1,231 @@
+import json
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.control_acceso.models import Asistencia, EventoAcceso
+from apps.control_acceso.servicios.asistencia_service import ValidationError
+from apps.control_acceso.servicios.ingesta_accesos import ingerir_eventos
+from apps.pagos.models import SocioMembresia
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.models import Socio
+
+
+class IngestaAccesosTest(TestCase):
+    def setUp(self):
+        hoy = timezone.localdate()
+        self.manana = (
+            timezone.make_aware(datetime.combine(hoy, datetime.min.time())) + timedelta(hours=7)
+        )
+        self.socio = Socio.objects.create(
+            Identificacion="1234567890", NombreCompleto="Juan Pérez"
+        )
+        self.membresia = SocioMembresia.objects.create(
+            SocioID=self.socio,
+            FechaInicio=hoy - timedelta(days=5),
+            FechaFin=hoy + timedelta(days=25),
+        )
+
+    def _evento(self, clave, tipo, minutos, identificacion="1234567890"):
+        return {
+            "clave": clave,
+            "tipo": tipo,
+            "identificacion": identificacion,
+            "fecha_hora": (self.manana + timedelta(minutes=minutos)).isoformat(),
+        }
+
+    def test_empareja_eventos_desordenados(self):
+        resumen = ingerir_eventos("Torniquete 1", [
+            self._evento("s2", "salida", 300),
+            self._evento("e1", "entrada", 0),
+            self._evento("e2", "entrada", 240),
+            self._evento("s1", "salida", 60),
+        ])
+
+        self.assertEqual(
+            (resumen["registrados"], resumen["pendientes"], resumen["rechazados"]), (4, 0, 0)
+        )
+        asistencias = list(Asistencia.objects.order_by("FechaHoraEntrada"))
+        self.assertEqual(
+            [(a.FechaHoraEntrada, a.FechaHoraSalida) for a in asistencias],
+            [
+                (self.manana, self.manana + timedelta(minutes=60)),
+                (self.manana + timedelta(minutes=240), self.manana + timedelta(minutes=300)),
+            ],
+        )
+        self.assertFalse(EventoAcceso.objects.filter(AsistenciaID__isnull=True).exists())
+
+    def test_reenviar_el_lote_no_duplica(self):
+        lote = [self._evento("e1", "entrada", 0), self._evento("e1", "entrada", 0)]
+
+        primero = ingerir_eventos("Torniquete 1", lote)
+        segundo = ingerir_eventos("Torniquete 1", lote)
+        # La misma clave desde otro terminal es otro evento
+        otro_terminal = ingerir_eventos("Torniquete 2", [self._evento("e1", "entrada", 30)])
+
+        self.assertEqual((primero["registrados"], primero["duplicados"]), (1, 1))
+        self.assertEqual((segundo["registrados"], segundo["duplicados"]), (0, 2))
+        self.assertEqual((otro_terminal["registrados"], otro_terminal["rechazados"]), (0, 1))
+        self.assertEqual(Asistencia.objects.count(), 1)
+        self.assertEqual(EventoAcceso.objects.count(), 1)
+
+    def test_entrada_rechazada_se_puede_reenviar(self):
+        ingerir_eventos("Torniquete 1", [self._evento("e1", "entrada", 0)])
+        rechazada = ingerir_eventos("Torniquete 2", [self._evento("e2", "entrada", 120)])
+        self.assertEqual(rechazada["rechazados"], 1)
+        self.assertFalse(EventoAcceso.objects.filter(Clave="e2").exists())
+
+        # Cuando llega la salida de la primera, el reenvío ya entra
+        ingerir_eventos("Torniquete 1", [self._evento("s1", "salida", 60)])
+        reenvio = ingerir_eventos("Torniquete 2", [self._evento("e2", "entrada", 120)])
+
+        self.assertEqual((reenvio["registrados"], reenvio["rechazados"]), (1, 0))
+        self.assertEqual(
+            Asistencia.objects.get(FechaHoraSalida__isnull=True).FechaHoraEntrada,
+            self.manana + timedelta(minutes=120),
+        )
+
+    def test_estado_de_la_membresia(self):
+        # Una membresía que expiró después del evento lo sigue cubriendo
+        SocioMembresia.objects.filter(pk=self.membresia.pk).update(
+            Estado=SocioMembresia.ESTADO_EXPIRADA
+        )
+        expirada = ingerir_eventos("Torniquete 1", [self._evento("e1", "entrada", 0)])
+        # Con la membresía morosa no se admite, como en el registro en línea
+        SocioMembresia.objects.filter(pk=self.membresia.pk).update(
+            Estado=SocioMembresia.ESTADO_MOROSA
+        )
+        morosa = ingerir_eventos("Torniquete 1", [self._evento("s1", "salida", 60)])
+
+        self.assertEqual(expirada["registrados"], 1)
+        self.assertEqual(morosa["registrados"], 0)
+        self.assertEqual(len(morosa["errores"]), 1)
+
+    def test_salida_pendiente_se_empareja_con_la_entrada_de_otro_lote(self):
+        primero = ingerir_eventos("Torniquete 1", [self._evento("s1", "salida", 90)])
+        self.assertEqual(primero["pendientes"], 1)
+        self.assertFalse(Asistencia.objects.exists())
+
+        ingerir_eventos("Torniquete 2", [self._evento("e1", "entrada", 0)])
+
+        asistencia = Asistencia.objects.get()
+        self.assertEqual(asistencia.FechaHoraSalida, self.manana + timedelta(minutes=90))
+        self.assertEqual(EventoAcceso.objects.filter(AsistenciaID=asistencia).count(), 2)
+
+    def test_cierra_la_entrada_abierta_registrada_en_linea(self):
+        abierta = Asistencia.objects.create(
+            SocioMembresiaID=self.membresia, FechaHoraEntrada=self.manana
+        )
+
+        ingerir_eventos("Torniquete 1", [
+            self._evento("e2", "entrada", 120),
+            self._evento("s1", "salida", 60),
+        ])
+
+        abierta.refresh_from_db()
+        self.assertEqual(abierta.FechaHoraSalida, self.manana + timedelta(minutes=60))
+        self.assertEqual(Asistencia.objects.filter(FechaHoraSalida__isnull=True).count(), 1)
+
+    def test_visita_anterior_a_una_entrada_abierta_en_linea(self):
+        # Entró en línea hace poco; el terminal envía después una visita
+        # anterior, con la entrada y la salida en el mismo lote
+        abierta = Asistencia.objects.create(
+            SocioMembresiaID=self.membresia, FechaHoraEntrada=self.manana + timedelta(minutes=300)
+        )
+
+        resumen = ingerir_eventos("Torniquete 1", [
+            self._evento("e1", "entrada", 0),
+            self._evento("s1", "salida", 60),
+        ])
+
+        self.assertEqual(
+            (resumen["registrados"], resumen["pendientes"], resumen["rechazados"]), (2, 0, 0)
+        )
+        visita = Asistencia.objects.exclude(pk=abierta.pk).get()
+        self.assertEqual(
+            (visita.FechaHoraEntrada, visita.FechaHoraSalida),
+            (self.manana, self.manana + timedelta(minutes=60)),
+        )
+        abierta.refresh_from_db()
+        self.assertIsNone(abierta.FechaHoraSalida)
+        self.assertFalse(EventoAcceso.objects.filter(AsistenciaID__isnull=True).exists())
+
+    def test_errores_por_evento(self):
+        resumen = ingerir_eventos("Torniquete 1", [
+            self._evento("e1", "entrada", 0),
+            self._evento("", "entrada", 0),
+            self._evento("x1", "otro", 0),
+            self._evento("d1", "entrada", 0, identificacion="000"),
+            {
+                "clave": "f1", "tipo": "entrada", "identificacion": "1234567890",
+                "fecha_hora": "ayer",
+            },
+            self._evento("f2", "entrada", 60 * 24 * 2),
+        ])
+
+        self.assertEqual(resumen["registrados"], 1)
+        self.assertEqual([posicion for posicion, _ in resumen["errores"]], [2, 3, 4, 5, 6])
+        with self.assertRaisesMessage(ValidationError, "terminal"):
+            ingerir_eventos("", [])
+        with self.assertRaisesMessage(ValidationError, "lista"):
+            ingerir_eventos("Torniquete 1", None)
+
+    def test_consultas_no_crecen_con_el_lote(self):
+        hoy = timezone.localdate()
+        socios = Socio.objects.bulk_create(
+            Socio(Identificacion=f"S{n}", NombreCompleto=f"Socio {n}") for n in range(40)
+        )
+        SocioMembresia.objects.bulk_create(
+            SocioMembresia(SocioID=s, FechaInicio=hoy, FechaFin=hoy + timedelta(days=30))
+            for s in socios
+        )
+
+        def lote(cantidad, desde):
+            return [
+                self._evento(f"{tipo}-{n}", tipo, minutos, identificacion=f"S{n}")
+                for n in range(desde, desde + cantidad)
+                for tipo, minutos in (("salida", 60), ("entrada", 0))
+            ]
+
+        # Duplicados, membresías, abiertas, pendientes y los dos inserts en
+        # bloque, más el savepoint
+        with self.assertNumQueries(8):
+            ingerir_eventos("Torniquete 1", lote(2, 0))
+        with self.assertNumQueries(8):
+            resumen = ingerir_eventos("Torniquete 1", lote(30, 2))
+
+        self.assertEqual(resumen["registrados"], 60)
+        self.assertEqual(Asistencia.objects.filter(FechaHoraSalida__isnull=False).count(), 32)
+
+    def test_vista_recibe_el_lote_en_json(self):
+        rol = Rol.objects.create(NombreRol="Administrativo")
+        usuario = Usuario.objects.create(
+            NombreUsuario="recepcion", Email="recepcion@test.com",
+            PasswordHash=make_password("clave12345"), RolID=rol,
+        )
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "entrenador"
+        session.save()
+        url = reverse("ingerir_eventos_acceso")
+        cuerpo = json.dumps({
+            "terminal": "Torniquete 1",
+            "eventos": [self._evento("e1", "entrada", 0), self._evento("x", "otro", 0)],
+        })
+
+        def enviar(datos):
+            return self.client.post(url, datos, content_type="application/json")
+
+        self.assertEqual(enviar(cuerpo).status_code, 403)
+        session["usuario_rol"] = "administrativo"
+        session.save()
+        respuesta = enviar(cuerpo)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["registrados"], 1)
+        self.assertEqual(respuesta.json()["errores"][0]["posicion"], 2)
+        self.assertEqual(enviar("no es json").status_code, 400)
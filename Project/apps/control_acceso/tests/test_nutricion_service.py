@@ -1,11 +1,31 @@
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+
+from django.apps import apps as django_apps
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
-from apps.control_acceso.models import PlanNutricional
+from apps.control_acceso.models import Alimento, ComidaAlimento, DiaComida, PlanNutricional
 from apps.control_acceso.servicios.nutricion_service import (
     PLANTILLAS_NUTRICION,
+    aplicar_plan_desde_template_db,
+    aplicar_plantilla_a_socios,
     asignar_plan_desde_plantilla,
+    parsear_macros,
+    totales_aportes,
 )
-from apps.socios.models import Socio
+from apps.pagos.models import PlanMembresia, SocioMembresia
+from apps.socios.models import RegistroComidaDiaria, Socio
+
+from .utilidades import crear_socios, filas, iniciar_sesion_entrenador
+
+rellenar_macros_gramos = import_module(
+    "apps.control_acceso.migrations.0009_rellenar_macros_gramos"
+).rellenar_macros_gramos
 
 
 class NutricionServiceTests(TestCase):
@@ -36,3 +56,259 @@ class NutricionServiceTests(TestCase):
     def test_error_al_usar_plantilla_inexistente(self):
         with self.assertRaises(ValueError):
             asignar_plan_desde_plantilla(self.socio, "no-existe")
+
+    def test_asignar_plan_en_sentencias_fijas(self):
+        # Antes: 203 sentencias la primera vez y 176 al reasignar. Ahora la
+        # semana se escribe con dos INSERT y los alimentos con uno.
+        with self.assertNumQueries(11):
+            asignar_plan_desde_plantilla(self.socio, "equilibrado")
+        with self.assertNumQueries(16):
+            asignar_plan_desde_plantilla(self.socio, "hiperproteico")
+        # Reasignar la misma plantilla no escribe ninguna comida
+        with CaptureQueriesContext(connection) as consultas:
+            asignar_plan_desde_plantilla(self.socio, "hiperproteico")
+        escrituras = [
+            q["sql"] for q in consultas.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE")) and "comida" in q["sql"]
+        ]
+        self.assertEqual(escrituras, [])
+
+    def test_reasignar_conserva_comidas_y_registros(self):
+        plan = asignar_plan_desde_plantilla(self.socio, "equilibrado")
+        comidas = dict(plan.dias_comida.values_list("id", "TipoComida"))
+        items = set(
+            ComidaAlimento.objects.filter(DiaComidaID__in=comidas).values_list("id", flat=True)
+        )
+        registro = RegistroComidaDiaria.objects.create(
+            SocioID=self.socio,
+            DiaComidaID_id=min(comidas),
+            Fecha=timezone.localdate(),
+            Completado=True,
+        )
+
+        # Mismas comidas con porciones al 90 %: solo cambian porciones
+        asignar_plan_desde_plantilla(self.socio, "deficit_suave")
+
+        self.assertEqual(dict(plan.dias_comida.values_list("id", "TipoComida")), comidas)
+        actuales = ComidaAlimento.objects.filter(DiaComidaID__in=comidas)
+        self.assertEqual(set(actuales.values_list("id", flat=True)), items)
+        self.assertEqual(
+            set(
+                actuales.filter(AlimentoID__Nombre="Arroz integral")
+                .values_list("Porcion", flat=True)
+            ),
+            {Decimal("135.00")},
+        )
+        self.assertTrue(RegistroComidaDiaria.objects.filter(id=registro.id).exists())
+
+        # Otra plantilla: el desayuno registrado sigue existiendo y se conserva
+        asignar_plan_desde_plantilla(self.socio, "hiperproteico")
+        semana = PLANTILLAS_NUTRICION["hiperproteico"]["base"]
+        self.assertEqual(plan.dias_comida.count(), 7 * len(semana))
+        self.assertEqual(
+            ComidaAlimento.objects.filter(DiaComidaID__PlanNutricionalID=plan).count(),
+            7 * sum(len(comida["items"]) for comida in semana),
+        )
+        self.assertTrue(RegistroComidaDiaria.objects.filter(id=registro.id).exists())
+
+    def test_alimentos_se_reutilizan_y_actualizan(self):
+        viejo = Alimento.objects.create(Nombre="Arroz integral", Kcal=999)
+        repetido = Alimento.objects.create(Nombre="Arroz integral", Kcal=1)
+
+        plan = asignar_plan_desde_plantilla(self.socio, "equilibrado")
+        asignar_plan_desde_plantilla(self.socio, "deficit_suave")
+
+        viejo.refresh_from_db()
+        repetido.refresh_from_db()
+        self.assertEqual(viejo.Kcal, 220)
+        self.assertEqual(
+            (viejo.ProteinaG, viejo.CarbohidratosG, viejo.GrasaG),
+            (Decimal("5"), Decimal("45"), Decimal("2")),
+        )
+        self.assertEqual(repetido.Kcal, 1)
+        self.assertEqual(Alimento.objects.filter(Nombre="Arroz integral").count(), 2)
+        self.assertEqual(Alimento.objects.filter(Nombre="Ensalada verde").count(), 1)
+        arroz = ComidaAlimento.objects.filter(
+            DiaComidaID__PlanNutricionalID=plan, AlimentoID__Nombre="Arroz integral"
+        )
+        self.assertEqual(set(arroz.values_list("AlimentoID", flat=True)), {viejo.id})
+        self.assertEqual(set(arroz.values_list("Porcion", flat=True)), {Decimal("135.00")})
+        self.assertEqual(arroz.values("DiaComidaID__DiaSemana").distinct().count(), 7)
+
+
+class MacrosAlimentoTests(TestCase):
+    def test_parsear_macros(self):
+        self.assertEqual(
+            parsear_macros("P: 12g, C: 58g, G: 7g"),
+            {"ProteinaG": Decimal("12"), "CarbohidratosG": Decimal("58"), "GrasaG": Decimal("7")},
+        )
+        self.assertEqual(
+            parsear_macros("Proteína: 12,5 g; Grasa: 3g"),
+            {"ProteinaG": Decimal("12.5"), "CarbohidratosG": None, "GrasaG": Decimal("3")},
+        )
+        for texto in (None, "", "Sin datos", "P: 123456g"):
+            self.assertEqual(set(parsear_macros(texto).values()), {None})
+
+    def test_backfill_rellena_solo_lo_que_falta(self):
+        texto = Alimento.objects.create(Nombre="Avena", Macros="P: 13g, C: 67g, G: 7g")
+        sin_macros = Alimento.objects.create(Nombre="Agua")
+        ilegible = Alimento.objects.create(Nombre="Misterio", Macros="ver etiqueta")
+        editado = Alimento.objects.create(Nombre="Queso", Macros="P: 1g", ProteinaG=Decimal("25"))
+
+        rellenar_macros_gramos(django_apps, None)
+        rellenar_macros_gramos(django_apps, None)
+
+        texto.refresh_from_db()
+        self.assertEqual(
+            (texto.ProteinaG, texto.CarbohidratosG, texto.GrasaG),
+            (Decimal("13"), Decimal("67"), Decimal("7")),
+        )
+        for alimento in (sin_macros, ilegible):
+            alimento.refresh_from_db()
+            self.assertIsNone(alimento.ProteinaG)
+        editado.refresh_from_db()
+        self.assertEqual(editado.ProteinaG, Decimal("25"))
+
+    def test_texto_macros_desde_columnas(self):
+        alimento = Alimento(
+            Macros="texto viejo", ProteinaG=Decimal("12.50"), CarbohidratosG=Decimal("58.00"),
+            GrasaG=None,
+        )
+        self.assertEqual(alimento.texto_macros(), "P: 12.5g, C: 58g")
+        self.assertEqual(Alimento(Macros="texto viejo").texto_macros(), "texto viejo")
+
+    def test_totales_del_dia_en_una_consulta(self):
+        socio = Socio.objects.create(Identificacion="1", NombreCompleto="Socio")
+        plan = PlanNutricional.objects.create(SocioID=socio)
+        comida = DiaComida.objects.create(
+            PlanNutricionalID=plan, DiaSemana=0, TipoComida="Almuerzo"
+        )
+        arroz = Alimento.objects.create(
+            Nombre="Arroz", Kcal=200, ProteinaG=Decimal("4"), CarbohidratosG=Decimal("40"),
+            GrasaG=Decimal("1"),
+        )
+        agua = Alimento.objects.create(Nombre="Agua")
+        ComidaAlimento.objects.create(DiaComidaID=comida, AlimentoID=arroz, Porcion=Decimal("150"))
+        ComidaAlimento.objects.create(DiaComidaID=comida, AlimentoID=arroz)
+        ComidaAlimento.objects.create(DiaComidaID=comida, AlimentoID=agua, Porcion=Decimal("500"))
+
+        with self.assertNumQueries(1):
+            totales = totales_aportes(ComidaAlimento.objects.filter(DiaComidaID=comida))
+
+        # 150 g + 100 g (sin porción cuenta como 100 g) de arroz; el agua no suma
+        self.assertEqual(
+            totales, {"kcal": 500.0, "proteina": 10.0, "carbohidratos": 100.0, "grasa": 2.5}
+        )
+        self.assertEqual(
+            totales_aportes(ComidaAlimento.objects.none()),
+            {"kcal": 0.0, "proteina": 0.0, "carbohidratos": 0.0, "grasa": 0.0},
+        )
+
+
+class AplicarPlantillaGrupoTests(TestCase):
+    def setUp(self):
+        self.plantilla = PlanNutricional.objects.create(
+            Nombre="Volumen", ObjetivoCaloricoDiario=2800, EsPlantilla=True
+        )
+        arroz = Alimento.objects.create(Nombre="Arroz", Kcal=130)
+        huevo = Alimento.objects.create(Nombre="Huevo", Kcal=70)
+        comidas = (("Desayuno", [(huevo, 2)]), ("Almuerzo", [(arroz, 150), (huevo, 1)]))
+        for dia in range(7):
+            for tipo, items in comidas:
+                dia_comida = DiaComida.objects.create(
+                    PlanNutricionalID=self.plantilla, DiaSemana=dia, TipoComida=tipo
+                )
+                for alimento, porcion in items:
+                    ComidaAlimento.objects.create(
+                        DiaComidaID=dia_comida, AlimentoID=alimento, Porcion=porcion, Cantidad=1
+                    )
+
+    def _copia(self, plan):
+        return filas(
+            ComidaAlimento.objects.filter(DiaComidaID__PlanNutricionalID=plan),
+            "DiaComidaID__DiaSemana", "DiaComidaID__TipoComida",
+            "AlimentoID", "Porcion", "Cantidad",
+        )
+
+    def test_clona_la_plantilla_a_cada_socio(self):
+        con_plan, sin_plan = crear_socios(2)
+        anterior = PlanNutricional.objects.create(SocioID=con_plan, Nombre="Viejo")
+        DiaComida.objects.create(PlanNutricionalID=anterior, DiaSemana=0, TipoComida="Cena")
+
+        resultados = aplicar_plantilla_a_socios(
+            self.plantilla,
+            [con_plan.id, sin_plan.id, 999999, con_plan.id],
+            objetivo_personalizado=3000,
+        )
+
+        self.assertEqual(
+            [(r["socio_id"], r["ok"], r.get("creado")) for r in resultados],
+            [(con_plan.id, True, False), (sin_plan.id, True, True), (999999, False, None)],
+        )
+        self.assertEqual(resultados[0]["plan_id"], anterior.id)
+        modelo = self._copia(self.plantilla)
+        for socio in (con_plan, sin_plan):
+            plan = PlanNutricional.objects.get(SocioID=socio, EsPlantilla=False)
+            self.assertEqual((plan.Nombre, plan.ObjetivoCaloricoDiario), ("Volumen", 3000))
+            self.assertEqual(self._copia(plan), modelo)
+        # La plantilla sigue en el banco sin cambios
+        self.assertEqual(self.plantilla.dias_comida.count(), 14)
+
+    def test_sentencias_no_dependen_del_numero_de_socios(self):
+        pocos = [s.id for s in crear_socios(3)]
+        # Sin pasar de un lote (SQLite limita los parámetros por INSERT)
+        muchos = [s.id for s in crear_socios(10, desde=3)]
+
+        with CaptureQueriesContext(connection) as consultas_pocos:
+            aplicar_plantilla_a_socios(self.plantilla, pocos)
+        with CaptureQueriesContext(connection) as consultas_muchos:
+            aplicar_plantilla_a_socios(self.plantilla, muchos)
+
+        self.assertEqual(len(consultas_pocos), len(consultas_muchos))
+        self.assertEqual(PlanNutricional.objects.filter(EsPlantilla=False).count(), 13)
+
+    def test_plantilla_no_valida(self):
+        (socio,) = crear_socios(1)
+        plan_socio = PlanNutricional.objects.create(SocioID=socio)
+
+        with self.assertRaises(ValueError):
+            aplicar_plantilla_a_socios(plan_socio, [socio.id])
+
+    def test_aplicar_a_un_socio_devuelve_el_plan(self):
+        (socio,) = crear_socios(1)
+
+        plan = aplicar_plan_desde_template_db(self.plantilla, socio)
+
+        self.assertEqual(plan.SocioID, socio)
+        self.assertEqual(plan.ObjetivoCaloricoDiario, 2800)
+        self.assertEqual(self._copia(plan), self._copia(self.plantilla))
+
+    def test_endpoint_por_plan_de_membresia(self):
+        activo, vencido, otro_plan = crear_socios(3)
+        hoy = timezone.localdate()
+        mensual = PlanMembresia.objects.create(Nombre="Mensual", Precio=100, DuracionDias=30)
+        anual = PlanMembresia.objects.create(Nombre="Anual", Precio=900, DuracionDias=365)
+        for socio, plan, fin in (
+            (activo, mensual, hoy),
+            (vencido, mensual, hoy - timedelta(days=1)),
+            (otro_plan, anual, hoy),
+        ):
+            SocioMembresia.objects.create(
+                SocioID=socio, PlanID=plan, FechaInicio=hoy - timedelta(days=20), FechaFin=fin
+            )
+        iniciar_sesion_entrenador(self.client)
+        url = reverse("entrenador_aplicar_plantilla_grupo", args=[self.plantilla.id])
+
+        respuesta = self.client.post(
+            url, {"plan_membresia": mensual.id, "socio_ids": [otro_plan.id]}
+        )
+
+        self.assertEqual(respuesta.json()["aplicados"], 2)
+        self.assertEqual(
+            set(
+                PlanNutricional.objects.filter(EsPlantilla=False)
+                .values_list("SocioID", flat=True)
+            ),
+            {activo.id, otro_plan.id},
+        )
+        self.assertEqual(self.client.post(url, {}).status_code, 400)
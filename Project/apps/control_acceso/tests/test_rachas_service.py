@@ -0,0 +1,158 @@
+import random
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.control_acceso.models import RachaEntrenamiento, SesionEntrenamiento
+from apps.control_acceso.servicios.rachas_service import (
+    aplicar_dias,
+    calcular_racha_desde_dias,
+    obtener_top_rachas,
+    racha_vigente,
+    registrar_dia_entrenamiento,
+    resumen_racha,
+)
+from apps.pagos.models import PlanMembresia, SocioMembresia
+from apps.socios.models import Socio
+
+# Un lunes cualquiera
+LUNES = date(2025, 3, 3)
+
+
+class RachaIncrementalTest(SimpleTestCase):
+    def test_coincide_con_el_calculo_original(self):
+        azar = random.Random(1234)
+        for _ in range(300):
+            inicio = LUNES - timedelta(days=azar.randint(0, 6))
+            dias = {
+                inicio + timedelta(days=i)
+                for i in range(60)
+                if azar.random() < 0.6
+            }
+            racha = aplicar_dias(RachaEntrenamiento(), dias)
+            for desfase in range(0, 6):
+                hoy = max(dias or {inicio}) + timedelta(days=desfase)
+                self.assertEqual(
+                    racha_vigente(racha.RachaActual, racha.UltimoDiaEntreno, hoy),
+                    calcular_racha_desde_dias(dias, hoy),
+                    (sorted(dias), hoy),
+                )
+
+    def test_fin_de_semana_no_rompe_la_racha(self):
+        viernes = LUNES + timedelta(days=4)
+        racha = aplicar_dias(RachaEntrenamiento(), {LUNES + timedelta(days=3), viernes})
+
+        resumen = resumen_racha(racha, hoy=viernes + timedelta(days=3))
+
+        self.assertEqual(resumen["racha_dias"], 2)
+        self.assertTrue(resumen["racha_en_peligro"])
+
+    def test_sin_registro_muestra_mensaje_inicial(self):
+        resumen = resumen_racha(None, hoy=LUNES)
+
+        self.assertEqual(resumen["racha_dias"], 0)
+        self.assertEqual(resumen["mensaje_racha"], "Comienza tu racha entrenando hoy")
+
+
+class RegistroRachaTest(TestCase):
+    def setUp(self):
+        self.socio = Socio.objects.create(
+            Identificacion="5555", NombreCompleto="Racha", Email="racha@test.com"
+        )
+        plan = PlanMembresia.objects.create(Nombre="Mensual", Precio=1, DuracionDias=30)
+        self.membresia = SocioMembresia.objects.create(
+            SocioID=self.socio,
+            PlanID=plan,
+            FechaInicio=LUNES,
+            FechaFin=LUNES + timedelta(days=30),
+        )
+
+    def _sesion(self, dia):
+        inicio = datetime.combine(dia, time(12), tzinfo=dt_timezone.utc)
+        SesionEntrenamiento.objects.create(
+            SocioMembresiaID=self.membresia,
+            FechaInicio=inicio,
+            FechaFin=inicio + timedelta(hours=1),
+            DiaSemana=dia.weekday(),
+        )
+
+    def test_registro_incremental_y_reconstruccion(self):
+        # Historial previo a la tabla de rachas: el primer registro lo reconstruye
+        self._sesion(LUNES)
+        self._sesion(LUNES + timedelta(days=1))
+        racha = registrar_dia_entrenamiento(self.socio.id, LUNES + timedelta(days=1))
+        self.assertEqual(racha.RachaActual, 2)
+
+        jueves = LUNES + timedelta(days=3)
+        self._sesion(jueves)
+        racha = registrar_dia_entrenamiento(self.socio.id, jueves)
+        self.assertEqual((racha.RachaActual, racha.InicioRacha), (3, LUNES))
+
+        # Un día anterior al último obliga a reconstruir
+        self._sesion(LUNES + timedelta(days=2))
+        racha = registrar_dia_entrenamiento(self.socio.id, LUNES + timedelta(days=2))
+        self.assertEqual((racha.RachaActual, racha.UltimoDiaEntreno), (4, jueves))
+
+    def test_comando_reconstruye_y_verifica(self):
+        self._sesion(LUNES)
+        RachaEntrenamiento.objects.create(SocioID=self.socio, RachaActual=99)
+        salida = StringIO()
+
+        call_command("reconstruir_rachas", stdout=salida)
+
+        racha = RachaEntrenamiento.objects.get(SocioID=self.socio)
+        self.assertEqual((racha.RachaActual, racha.UltimoDiaEntreno), (1, LUNES))
+        self.assertIn("Todas las rachas coinciden", salida.getvalue())
+
+
+class TopRachasTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.plan = PlanMembresia.objects.create(
+            Nombre="Mensual", Precio=1, DuracionDias=30
+        )
+
+    def _socio_con_dias(self, n, dias):
+        socio = Socio.objects.create(
+            Identificacion=str(n), NombreCompleto=f"Socio {n}", Email=f"s{n}@test.com"
+        )
+        membresia = SocioMembresia.objects.create(
+            SocioID=socio, PlanID=self.plan, FechaInicio=LUNES, FechaFin=LUNES
+        )
+        for dia in dias:
+            # Dos sesiones el mismo día cuentan una sola vez
+            for hora in (8, 18):
+                SesionEntrenamiento.objects.create(
+                    SocioMembresiaID=membresia,
+                    FechaInicio=datetime.combine(dia, time(hora), tzinfo=dt_timezone.utc),
+                    DiaSemana=dia.weekday(),
+                )
+        return socio
+
+    def test_top_rachas_en_una_consulta_y_cacheado(self):
+        hoy = LUNES + timedelta(days=20)
+        azar = random.Random(7)
+        esperado = []
+        for n in range(12):
+            dias = {hoy - timedelta(days=i) for i in range(30) if azar.random() < 0.7}
+            socio = self._socio_con_dias(n, dias)
+            racha = 0
+            while hoy - timedelta(days=racha) in dias:
+                racha += 1
+            if racha:
+                esperado.append((racha, max(dias), -socio.id, socio))
+        esperado.sort(reverse=True)
+
+        with self.assertNumQueries(2):
+            top = obtener_top_rachas(hoy=hoy, limite=5)
+        with self.assertNumQueries(0):
+            obtener_top_rachas(hoy=hoy, limite=5)
+
+        self.assertEqual(
+            [(t["socio"], t["streak"], t["last_date"]) for t in top],
+            [(s, racha, ultima) for racha, ultima, _, s in esperado[:5]],
+        )
@@ -0,0 +1,208 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.control_acceso.models import DiaRutinaEjercicio, Ejercicio, RutinaSemanal
+from apps.control_acceso.servicios.rutinas_service import (
+    ValidationError,
+    asignar_ejercicios_bulk,
+    clonar_rutina_a_socios,
+)
+from apps.pagos.models import PlanMembresia, SocioMembresia
+
+from .utilidades import crear_socios, filas, iniciar_sesion_entrenador
+
+
+class AsignarEjerciciosBulkTests(TestCase):
+    def setUp(self):
+        self.rutina = RutinaSemanal.objects.create(
+            Nombre="Fuerza", DiasEntrenamiento="LMV", EsPlantilla=True
+        )
+        self.ejercicios = [
+            Ejercicio.objects.create(Nombre=f"Ejercicio {n}", GrupoMuscular="Pecho")
+            for n in range(30)
+        ]
+
+    def test_una_semana_completa_en_consultas_fijas(self):
+        items = [
+            {"ejercicio_id": ejercicio.id, "dia_semana": n % 7, "series": 3, "repeticiones": 10}
+            for n, ejercicio in enumerate(self.ejercicios)
+        ]
+
+        # rutina, ejercicios (IN), asignaciones existentes y un único insert
+        # (más el savepoint que lo envuelve)
+        with self.assertNumQueries(6):
+            resultado = asignar_ejercicios_bulk(self.rutina.id, items)
+
+        self.assertEqual(resultado["errores"], [])
+        self.assertEqual(len(resultado["creados"]), 30)
+        self.assertEqual(DiaRutinaEjercicio.objects.filter(RutinaID=self.rutina).count(), 30)
+
+    def test_informe_de_errores_por_item(self):
+        press, remo = self.ejercicios[:2]
+        DiaRutinaEjercicio.objects.create(RutinaID=self.rutina, EjercicioID=remo, DiaSemana=2)
+
+        resultado = asignar_ejercicios_bulk(self.rutina.id, [
+            {"ejercicio_id": press.id, "dia_semana": 0, "peso_objetivo": 40},
+            {"ejercicio_id": 99999, "dia_semana": 0},
+            {"ejercicio_id": press.id, "dia_semana": 7},
+            {"ejercicio_id": press.id, "dia_semana": 1, "series": 0},
+            {"ejercicio_id": press.id, "dia_semana": 0},
+            {"ejercicio_id": remo.id, "dia_semana": 2},
+            {"ejercicio_id": str(remo.id), "dia_semana": 3, "tempo": "3-0-1-0"},
+        ])
+
+        self.assertEqual(resultado["errores"], [
+            (2, "El ejercicio especificado no existe."),
+            (3, "El día de la semana debe ser un número entre 0 (lunes) y 6 (domingo)."),
+            (4, "Las series deben ser un número positivo."),
+            (5, "Ya existe este ejercicio asignado en el día 0 de esta rutina."),
+            (6, "Ya existe este ejercicio asignado en el día 2 de esta rutina."),
+        ])
+        self.assertEqual(
+            [(a.EjercicioID_id, a.DiaSemana, a.Tempo) for a in resultado["creados"]],
+            [(press.id, 0, ""), (remo.id, 3, "3-0-1-0")],
+        )
+        self.assertEqual(DiaRutinaEjercicio.objects.filter(RutinaID=self.rutina).count(), 3)
+
+    def test_rutina_inexistente(self):
+        with self.assertRaisesMessage(ValidationError, "La rutina especificada no existe."):
+            asignar_ejercicios_bulk(99999, [])
+
+    def test_vista_crear_rutina_guarda_los_ejercicios_arrastrados(self):
+        iniciar_sesion_entrenador(self.client)
+        press = self.ejercicios[0]
+
+        respuesta = self.client.post(reverse("crear_rutina_entrenador"), {
+            "nombre_rutina": "Empuje",
+            "dias_entrenamiento": "LX",
+            "guardar_en_banco": "1",
+            "ejercicios_temp": (
+                f'[{{"ejercicio_id": {press.id}, "dia": 0, "series": 4, "reps": 8, "peso": "50"}},'
+                f' {{"ejercicio_id": {press.id}, "dia": "x"}},'
+                f' {{"ejercicio_id": {press.id}, "dia": 0}}]'
+            ),
+        }, follow=True)
+
+        rutina = RutinaSemanal.objects.get(Nombre="Empuje")
+        asignacion = DiaRutinaEjercicio.objects.get(RutinaID=rutina)
+        self.assertEqual(
+            (asignacion.Series, asignacion.Repeticiones, asignacion.PesoObjetivo), (4, 8, 50)
+        )
+        mensajes = [str(m) for m in respuesta.context["messages"]]
+        self.assertIn("Se agregaron 1 ejercicio(s) a la rutina.", mensajes)
+        self.assertIn(
+            "No se pudo agregar ejercicio temporal: item #3: "
+            "Ya existe este ejercicio asignado en el día 0 de esta rutina.",
+            mensajes,
+        )
+        self.assertTrue(any(
+            m.startswith("No se pudo agregar ejercicio temporal: item #2:") for m in mensajes
+        ))
+
+
+class ClonarRutinaTests(TestCase):
+    def setUp(self):
+        self.plantilla = RutinaSemanal.objects.create(
+            Nombre="Full body", DiasEntrenamiento="LXV", EsPlantilla=True
+        )
+        for n in range(3):
+            ejercicio = Ejercicio.objects.create(Nombre=f"Ejercicio {n}", GrupoMuscular="Pierna")
+            DiaRutinaEjercicio.objects.create(
+                RutinaID=self.plantilla, EjercicioID=ejercicio, DiaSemana=n * 2,
+                Series=3, Repeticiones=12, Tempo="2-0-1-0", PesoObjetivo=20 + n,
+            )
+
+    def _copia(self, rutina_id):
+        return filas(
+            DiaRutinaEjercicio.objects.filter(RutinaID_id=rutina_id),
+            "EjercicioID", "DiaSemana", "Series", "Repeticiones", "Tempo", "PesoObjetivo",
+        )
+
+    def test_copia_rutina_y_ejercicios_y_la_plantilla_sigue_en_el_banco(self):
+        uno, dos = crear_socios(2)
+
+        resultados = clonar_rutina_a_socios(self.plantilla, [uno.id, dos.id, uno.id, 99999])
+
+        self.assertEqual([r["socio_id"] for r in resultados], [uno.id, dos.id, 99999])
+        self.assertEqual(
+            resultados[2], {"socio_id": 99999, "ok": False, "error": "El socio no existe."}
+        )
+        esperado = self._copia(self.plantilla.id)
+        for socio, resultado in zip((uno, dos), resultados):
+            rutina = RutinaSemanal.objects.get(id=resultado["rutina_id"])
+            self.assertEqual(
+                (rutina.SocioID_id, rutina.Nombre, rutina.DiasEntrenamiento, rutina.EsPlantilla),
+                (socio.id, "Full body", "LXV", False),
+            )
+            self.assertEqual(self._copia(rutina.id), esperado)
+        self.plantilla.refresh_from_db()
+        self.assertIsNone(self.plantilla.SocioID_id)
+        self.assertTrue(self.plantilla.EsPlantilla)
+
+    def test_consultas_no_dependen_de_los_socios(self):
+        def medir(socios):
+            with CaptureQueriesContext(connection) as consultas:
+                clonar_rutina_a_socios(self.plantilla, [s.id for s in socios])
+            return len(consultas)
+
+        self.assertEqual(medir(crear_socios(2)), medir(crear_socios(40, desde=2)))
+
+    def test_solo_plantillas_del_banco(self):
+        socio, = crear_socios(1)
+        rutina = RutinaSemanal.objects.create(
+            SocioID=socio, Nombre="Propia", DiasEntrenamiento="L"
+        )
+
+        with self.assertRaisesMessage(ValidationError, "no es una plantilla del banco"):
+            clonar_rutina_a_socios(rutina, [socio.id])
+
+    def test_vistas_asignan_copias(self):
+        iniciar_sesion_entrenador(self.client)
+        socios = crear_socios(3)
+
+        respuesta = self.client.post(
+            reverse("ajax_asignar_rutina", args=[self.plantilla.id]), {"socio_id": socios[0].id}
+        )
+        grupo = self.client.post(
+            reverse("ajax_asignar_rutina_grupo", args=[self.plantilla.id]),
+            {"socio_ids": [socios[1].id, socios[2].id]},
+        )
+
+        self.assertNotEqual(respuesta.json()["rutina_id"], self.plantilla.id)
+        self.assertEqual(grupo.json()["asignados"], 2)
+        self.assertEqual(RutinaSemanal.objects.filter(SocioID__in=socios).count(), 3)
+        self.assertTrue(
+            RutinaSemanal.objects.filter(id=self.plantilla.id, SocioID__isnull=True).exists()
+        )
+
+    def test_grupo_por_plan_de_membresia(self):
+        iniciar_sesion_entrenador(self.client)
+        hoy = timezone.localdate()
+        mensual = PlanMembresia.objects.create(Nombre="Mensual", Precio=100, DuracionDias=30)
+        activo, vencido, renovado = crear_socios(3)
+        for socio, estado, fin in (
+            (activo, SocioMembresia.ESTADO_ACTIVA, hoy),
+            (vencido, SocioMembresia.ESTADO_EXPIRADA, hoy - timedelta(days=1)),
+            (renovado, SocioMembresia.ESTADO_ACTIVA, hoy),
+            (renovado, SocioMembresia.ESTADO_ACTIVA, hoy + timedelta(days=30)),
+        ):
+            SocioMembresia.objects.create(
+                SocioID=socio, PlanID=mensual, FechaInicio=hoy - timedelta(days=10),
+                FechaFin=fin, Estado=estado,
+            )
+
+        grupo = self.client.post(
+            reverse("ajax_asignar_rutina_grupo", args=[self.plantilla.id]),
+            {"plan_membresia": mensual.id},
+        )
+
+        self.assertEqual(grupo.json()["asignados"], 2)
+        copias = RutinaSemanal.objects.filter(EsPlantilla=False)
+        self.assertEqual(
+            sorted(copias.values_list("SocioID", flat=True)), [activo.id, renovado.id]
+        )
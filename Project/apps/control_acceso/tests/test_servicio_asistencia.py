@@ -1,6 +1,9 @@
 from datetime import timedelta
 
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
 from django.utils import timezone
 
 from apps.control_acceso.models import Asistencia
@@ -8,9 +11,11 @@ from apps.control_acceso.servicios.asistencia_service import (
     ValidationError,
     obtener_asistencia_activa,
     registrar_entrada,
+    registrar_entrada_por_identificacion,
     registrar_salida,
 )
 from apps.pagos.models import PlanMembresia, SocioMembresia
+from apps.seguridad.models import Rol, Usuario
 from apps.socios.models import Socio
 
 
@@ -141,3 +146,68 @@ class AsistenciaServicioTest(TestCase):
         asistencia_cerrada = obtener_asistencia_activa(self.membresia_activa.id)
 
         self.assertIsNone(asistencia_cerrada)
+
+
+class EntradaPorIdentificacionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        hoy = timezone.localdate()
+        self.socio = Socio.objects.create(Identificacion="1234567890", NombreCompleto="Juan Pérez")
+        SocioMembresia.objects.create(
+            SocioID=self.socio, FechaInicio=hoy - timedelta(days=60),
+            FechaFin=hoy - timedelta(days=30), Estado=SocioMembresia.ESTADO_EXPIRADA,
+        )
+        self.membresia = SocioMembresia.objects.create(
+            SocioID=self.socio,
+            FechaInicio=hoy - timedelta(days=5),
+            FechaFin=hoy + timedelta(days=25),
+        )
+
+    def test_entrada_con_la_membresia_activa_y_cache(self):
+        # Sin caché: resolver la membresía + el insert (y su savepoint)
+        with self.assertNumQueries(4):
+            asistencia = registrar_entrada_por_identificacion("1234567890", " Torniquete 1 ")
+        registrar_salida(asistencia.id)
+        # Con caché: solo el insert
+        with self.assertNumQueries(3):
+            segunda = registrar_entrada_por_identificacion("1234567890")
+
+        self.assertEqual(asistencia.SocioMembresiaID_id, self.membresia.id)
+        self.assertEqual(asistencia.TerminalAcceso, "Torniquete 1")
+        self.assertEqual(segunda.SocioMembresiaID_id, self.membresia.id)
+
+    def test_rechaza_duplicados_sin_membresia_y_desconocidos(self):
+        registrar_entrada_por_identificacion("1234567890")
+
+        with self.assertRaisesMessage(ValidationError, "entrada activa"):
+            registrar_entrada_por_identificacion("1234567890")
+        with self.assertRaisesMessage(ValidationError, "No existe un socio"):
+            registrar_entrada_por_identificacion("000")
+        Socio.objects.create(Identificacion="555", NombreCompleto="Sin membresía")
+        with self.assertRaisesMessage(ValidationError, "no está activa"):
+            registrar_entrada_por_identificacion("555")
+        self.assertEqual(Asistencia.objects.count(), 1)
+
+    def test_vista_solo_para_administrativos(self):
+        rol = Rol.objects.create(NombreRol="Administrativo")
+        usuario = Usuario.objects.create(
+            NombreUsuario="recepcion", Email="recepcion@test.com",
+            PasswordHash=make_password("clave12345"), RolID=rol,
+        )
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "entrenador"
+        session.save()
+        url = reverse("registrar_entrada")
+        datos = {"identificacion": "1234567890", "terminal": "Torniquete 2"}
+
+        self.assertEqual(self.client.post(url, datos).status_code, 403)
+        session["usuario_rol"] = "administrativo"
+        session.save()
+        respuesta = self.client.post(url, datos)
+        duplicada = self.client.post(url, datos)
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["asistencia_id"], Asistencia.objects.get().id)
+        self.assertEqual(duplicada.status_code, 400)
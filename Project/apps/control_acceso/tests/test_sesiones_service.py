@@ -0,0 +1,126 @@
+import json
+from datetime import date, datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.control_acceso.models import (
+    CompletionTracking,
+    DiaRutinaEjercicio,
+    Ejercicio,
+    EjercicioSesionCompletado,
+    RutinaSemanal,
+    SesionEntrenamiento,
+)
+from apps.control_acceso.servicios.sesiones_service import (
+    alternar_ejercicio,
+    crear_sesion,
+    terminar_sesion,
+)
+from apps.pagos.models import SocioMembresia
+from apps.seguridad.servicios.registro_usuario import crear_usuario_para_socio
+from apps.socios.models import Socio
+
+
+class SesionesServiceTests(TestCase):
+    def setUp(self):
+        self.socio = Socio.objects.create(
+            Identificacion="1", NombreCompleto="Socio Sesión", Email="sesion@test.com"
+        )
+        self.membresia = SocioMembresia.objects.create(
+            SocioID=self.socio, FechaInicio=date(2025, 1, 1), FechaFin=date(2099, 1, 1)
+        )
+        self.rutina = RutinaSemanal.objects.create(
+            SocioID=self.socio, Nombre="Fuerza", DiasEntrenamiento="LMXJVSD"
+        )
+        self.hoy = datetime.now().weekday()
+        self.asignaciones = [
+            DiaRutinaEjercicio.objects.create(
+                RutinaID=self.rutina,
+                EjercicioID=Ejercicio.objects.create(
+                    Nombre=f"Ejercicio {n}", GrupoMuscular="Pierna"
+                ),
+                DiaSemana=self.hoy,
+            )
+            for n in range(3)
+        ]
+
+    def test_crear_sesion_con_un_insert_para_los_ejercicios(self):
+        with self.assertNumQueries(3):  # ejercicios, sesión, ejercicios (sin savepoint)
+            sesion = crear_sesion(self.rutina, self.membresia, self.hoy, timezone.now())
+
+        self.assertEqual(sesion.TotalEjercicios, 3)
+        self.assertEqual(sesion.ejercicios_completados.filter(Completado=False).count(), 3)
+        libre = crear_sesion(
+            None, self.membresia, self.hoy, timezone.now(), entrenamiento_libre=True
+        )
+        self.assertEqual((libre.TotalEjercicios, libre.ejercicios_completados.count()), (0, 0))
+
+    def test_alternar_actualiza_fila_y_contador(self):
+        sesion = crear_sesion(self.rutina, self.membresia, self.hoy, timezone.now())
+        primero, segundo, _ = self.asignaciones
+
+        # Un solo UPDATE con CTE en PostgreSQL; fila y sesión por separado en SQLite
+        with self.assertNumQueries(1 if connection.vendor == "postgresql" else 2):
+            self.assertEqual(alternar_ejercicio(sesion, primero.id), (True, 1, 3))
+        self.assertEqual(alternar_ejercicio(sesion, segundo.id), (True, 2, 3))
+        # Un doble toque vuelve al estado anterior sin descuadrar el contador
+        self.assertEqual(alternar_ejercicio(sesion, segundo.id), (False, 1, 3))
+        self.assertIsNone(alternar_ejercicio(sesion, 99999))
+
+        sesion.refresh_from_db()
+        self.assertEqual(
+            sesion.EjerciciosCompletados,
+            EjercicioSesionCompletado.objects.filter(SesionID=sesion, Completado=True).count(),
+        )
+
+    def test_terminar_no_pisa_los_clics_concurrentes(self):
+        sesion = crear_sesion(self.rutina, self.membresia, self.hoy, timezone.now())
+        # Otra petición marca dos ejercicios con la sesión ya leída
+        otra = SesionEntrenamiento.objects.get(pk=sesion.pk)
+        alternar_ejercicio(otra, self.asignaciones[0].id)
+        alternar_ejercicio(otra, self.asignaciones[1].id)
+
+        with self.assertNumQueries(1):
+            contadores = terminar_sesion(sesion, timezone.now(), "Piernas")
+
+        self.assertEqual(contadores, (2, 3))
+        sesion.refresh_from_db()
+        self.assertEqual(
+            (sesion.EjerciciosCompletados, sesion.NotasSesion), (2, "Piernas")
+        )
+        self.assertIsNotNone(sesion.FechaFin)
+        # Cerrarla otra vez no la toca
+        self.assertIsNone(terminar_sesion(otra, timezone.now()))
+
+    def test_vistas_usan_los_contadores(self):
+        usuario = crear_usuario_para_socio(self.socio, "ClaveSegura123")
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "socio"
+        session.save()
+
+        self.client.post(reverse("iniciar_sesion"), {"rutina_id": self.rutina.id})
+        sesion = SesionEntrenamiento.objects.get()
+        self.assertEqual(sesion.TotalEjercicios, 3)
+
+        def toggle(asignacion):
+            return self.client.post(
+                reverse("toggle_ejercicio"),
+                json.dumps({"ejercicio_id": asignacion.id}),
+                content_type="application/json",
+            ).json()
+
+        self.assertEqual(toggle(self.asignaciones[0])["progreso"], "1/3")
+        self.assertEqual(toggle(self.asignaciones[1])["progreso"], "2/3")
+        ultima = toggle(self.asignaciones[2])
+
+        self.assertTrue(ultima["todos_completados"])
+        self.assertTrue(ultima["sesion_finalizada"])
+        sesion.refresh_from_db()
+        self.assertIsNotNone(sesion.FechaFin)
+        self.assertEqual(sesion.EjerciciosCompletados, 3)
+        self.assertTrue(CompletionTracking.objects.filter(RutinaID=self.rutina).exists())
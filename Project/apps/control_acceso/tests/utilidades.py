@@ -0,0 +1,33 @@
+"""
+Ayudas compartidas por los tests de asignación en grupo de rutinas y planes
+nutricionales: socios de prueba, sesión de entrenador y filas copiadas.
+"""
+from django.contrib.auth.hashers import make_password
+
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.models import Socio
+
+
+def crear_socios(cantidad, desde=0):
+    return [
+        Socio.objects.create(Identificacion=f"{n:010d}", NombreCompleto=f"Socio {n}")
+        for n in range(desde, desde + cantidad)
+    ]
+
+
+def iniciar_sesion_entrenador(client):
+    rol = Rol.objects.create(NombreRol="Entrenador")
+    usuario = Usuario.objects.create(
+        NombreUsuario="coach", Email="coach@test.com",
+        PasswordHash=make_password("clave12345"), RolID=rol,
+    )
+    session = client.session
+    session["usuario_id"] = usuario.id
+    session["usuario_email"] = usuario.Email
+    session["usuario_rol"] = "entrenador"
+    session.save()
+
+
+def filas(queryset, *campos):
+    """Valores de ``campos`` de cada fila, ordenados: para comparar una copia con su origen."""
+    return sorted(queryset.values_list(*campos))
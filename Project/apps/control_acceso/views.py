@@ -1 +1,71 @@
-from django.shortcuts import render
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+
+from apps.control_acceso.servicios.asistencia_service import (
+    ValidationError,
+    registrar_entrada_por_identificacion,
+)
+from apps.control_acceso.servicios.ingesta_accesos import ingerir_eventos
+from apps.seguridad.decoradores import login_requerido
+
+
+@login_requerido
+@require_POST
+def registrar_entrada_view(request):
+    """Entrada por torniquete (JSON): ``identificacion`` escaneada y ``terminal``."""
+    rol = request.session.get("usuario_rol", "").lower()
+    if rol != "administrativo":
+        return JsonResponse(
+            {"ok": False, "error": "No tienes permisos para esta acción."}, status=403
+        )
+
+    identificacion = request.POST.get("identificacion", "").strip()
+    if not identificacion:
+        return JsonResponse({"ok": False, "error": "Falta la identificación."}, status=400)
+
+    try:
+        asistencia = registrar_entrada_por_identificacion(
+            identificacion, request.POST.get("terminal")
+        )
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    return JsonResponse({
+        "ok": True,
+        "asistencia_id": asistencia.id,
+        "entrada": asistencia.FechaHoraEntrada.isoformat(),
+    })
+
+
+@login_requerido
+@require_POST
+def ingerir_eventos_view(request):
+    """
+    Lote de eventos que un terminal guardó sin conexión (cuerpo JSON):
+    ``{"terminal": ..., "eventos": [{"clave", "tipo", "identificacion", "fecha_hora"}]}``.
+    Reenviar el mismo lote es seguro: las claves ya recibidas se ignoran.
+    """
+    rol = request.session.get("usuario_rol", "").lower()
+    if rol != "administrativo":
+        return JsonResponse(
+            {"ok": False, "error": "No tienes permisos para esta acción."}, status=403
+        )
+
+    try:
+        cuerpo = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({"ok": False, "error": "Formato inválido"}, status=400)
+    if not isinstance(cuerpo, dict):
+        return JsonResponse({"ok": False, "error": "Formato inválido"}, status=400)
+
+    try:
+        resumen = ingerir_eventos(cuerpo.get("terminal"), cuerpo.get("eventos"))
+    except ValidationError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+
+    resumen["errores"] = [
+        {"posicion": posicion, "error": mensaje} for posicion, mensaje in resumen["errores"]
+    ]
+    return JsonResponse({"ok": True, **resumen})
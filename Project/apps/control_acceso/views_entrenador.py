@@ -19,25 +19,34 @@ from apps.control_acceso.models import (
     DiaComida,
     ComidaAlimento,
     Alimento,
+    DocumentoPlanNutricional,
 )
 
+from apps.pagos.models import PlanMembresia
+from apps.pagos.servicios.pagos_service import socios_activos_del_plan
 from apps.socios.models import Socio
 from apps.control_acceso.models import SesionEntrenamiento
 from apps.seguridad.servicios.FormularioSocio_Membresia import SocioForm
 from apps.seguridad.models import Usuario
 from django.views.decorators.csrf import ensure_csrf_cookie
 
+from apps.control_acceso.servicios.rachas_service import obtener_top_rachas
 from apps.control_acceso.servicios.rutinas_service import (
     crear_rutina_semanal,
     asignar_ejercicio_a_rutina,
+    asignar_ejercicios_bulk,
+    clonar_rutina_a_socios,
     obtener_ejercicios_por_dia,
     ValidationError,
 )
 
+from apps.control_acceso.servicios.documento_nutricion import obtener_documento
 from apps.control_acceso.servicios.nutricion_service import (
     asignar_plan_desde_plantilla,
     get_nutrition_templates,
     aplicar_plan_desde_template_db,
+    aplicar_plantilla_a_socios,
+    parsear_macros,
 )
 
 
@@ -210,46 +219,8 @@ def entrenador_panel(request):
         "socios_sin_rutina": socios_sin_rutina,
         "socios_sin_rutina_list": socios_sin_rutina_list,
     }
-    # --- Calcular rachas actuales (top N) basadas en SesionEntrenamiento por día ---
-    import datetime
-    from django.utils import timezone as dj_timezone
-
-    hoy = dj_timezone.localdate()
-    # obtener ids de socios que tienen sesiones
-    socio_ids_with_sessions = (
-        SesionEntrenamiento.objects.values_list("SocioMembresiaID__SocioID", flat=True).distinct()
-    )
-    socios_with_sessions = Socio.objects.filter(id__in=socio_ids_with_sessions)
-
-    def compute_current_streak(socio):
-        # obtener fechas (date) de sesiones para el socio
-        fechas = list(
-            SesionEntrenamiento.objects.filter(SocioMembresiaID__SocioID=socio)
-            .values_list("FechaInicio", flat=True)
-        )
-        fechas_converted = set([f.date() for f in fechas if f is not None])
-        if not fechas_converted:
-            return 0, None
-
-        streak = 0
-        dia = hoy
-        while dia in fechas_converted:
-            streak += 1
-            dia = dia - datetime.timedelta(days=1)
-
-        ultima = max(fechas_converted)
-        return streak, ultima
-
-    streaks = []
-    for s in socios_with_sessions:
-        st, last = compute_current_streak(s)
-        if st > 0:
-            streaks.append({"socio": s, "streak": st, "last_date": last})
-
-    # ordenar y cortar top 5
-    top_n = 5
-    top_rachas = sorted(streaks, key=lambda x: (x["streak"], x["last_date"]), reverse=True)[:top_n]
-    context["top_rachas"] = top_rachas
+    # --- Rachas actuales (top 5), calculadas en una consulta y cacheadas ---
+    context["top_rachas"] = obtener_top_rachas(limite=5)
     # Agregar nombre del entrenador al contexto si está disponible en sesión
     entrenador_nombre = None
     usuario_id = request.session.get("usuario_id")
@@ -401,6 +372,7 @@ def entrenador_nutricion_view(request):
         "dia_actual_nombre": dia_actual_nombre,
         "plantillas_db": plantillas_db,
         "alimentos_catalogo": alimentos_catalogo,
+        "planes_membresia": PlanMembresia.objects.order_by("Nombre"),
     }
     return render(request, "Entrenador/NutricionList.html", context)
 
@@ -415,56 +387,17 @@ def entrenador_plan_nutricion_detalle(request, socio_id):
     socio = get_object_or_404(Socio, id=socio_id)
     plan = (
         PlanNutricional.objects.filter(SocioID=socio, EsPlantilla=False)
-        .prefetch_related("dias_comida__alimentos__AlimentoID")
+        .select_related("documento")
         .first()
     )
     if not plan:
         messages.info(request, "Este socio aún no tiene un plan nutricional asignado.")
         return redirect("entrenador_nutricion")
 
-    dias_semana = [
-        {"indice": 0, "nombre": "Lunes", "comidas": []},
-        {"indice": 1, "nombre": "Martes", "comidas": []},
-        {"indice": 2, "nombre": "Miércoles", "comidas": []},
-        {"indice": 3, "nombre": "Jueves", "comidas": []},
-        {"indice": 4, "nombre": "Viernes", "comidas": []},
-        {"indice": 5, "nombre": "Sábado", "comidas": []},
-        {"indice": 6, "nombre": "Domingo", "comidas": []},
-    ]
-
-    for dia_comida in plan.dias_comida.all().order_by("DiaSemana", "id"):
-        dia_info = dias_semana[dia_comida.DiaSemana]
-        alimentos = []
-        for alimento_rel in dia_comida.alimentos.all():
-            alimento = alimento_rel.AlimentoID
-            porcion = alimento_rel.Porcion
-            porcion_display = f"{porcion.normalize()} g" if porcion else ""
-            calorias = 0
-            if alimento.Kcal:
-                ratio = float(porcion or 100) / 100.0
-                calorias = int(float(alimento.Kcal) * ratio)
-            alimentos.append(
-                {
-                    "obj": alimento_rel,
-                    "nombre": alimento.Nombre,
-                    "porcion": porcion_display,
-                    "porcion_valor": porcion,
-                    "calorias": calorias,
-                    "macros": alimento.Macros,
-                }
-            )
-        dia_info["comidas"].append(
-            {
-                "obj": dia_comida,
-                "tipo": dia_comida.TipoComida or "Comida",
-                "alimentos": alimentos,
-            }
-        )
-
     context = {
         "socio": socio,
         "plan": plan,
-        "dias": dias_semana,
+        "dias": obtener_documento(plan).Contenido["dias"],
         "alimentos_catalogo": Alimento.objects.all().order_by("Nombre"),
         "es_template": False,
     }
@@ -479,55 +412,16 @@ def entrenador_plantilla_nutricion_detalle(request, plan_id):
         return redirect("login")
 
     plan = get_object_or_404(
-        PlanNutricional,
+        PlanNutricional.objects.select_related("documento"),
         id=plan_id,
         EsPlantilla=True,
         SocioID__isnull=True,
     )
 
-    dias_semana = [
-        {"indice": 0, "nombre": "Lunes", "comidas": []},
-        {"indice": 1, "nombre": "Martes", "comidas": []},
-        {"indice": 2, "nombre": "Miércoles", "comidas": []},
-        {"indice": 3, "nombre": "Jueves", "comidas": []},
-        {"indice": 4, "nombre": "Viernes", "comidas": []},
-        {"indice": 5, "nombre": "Sábado", "comidas": []},
-        {"indice": 6, "nombre": "Domingo", "comidas": []},
-    ]
-
-    for dia_comida in plan.dias_comida.all().order_by("DiaSemana", "id"):
-        dia_info = dias_semana[dia_comida.DiaSemana]
-        alimentos = []
-        for alimento_rel in dia_comida.alimentos.all():
-            alimento = alimento_rel.AlimentoID
-            porcion = alimento_rel.Porcion
-            porcion_display = f"{porcion.normalize()} g" if porcion else ""
-            calorias = 0
-            if alimento.Kcal:
-                ratio = float(porcion or 100) / 100.0
-                calorias = int(float(alimento.Kcal) * ratio)
-            alimentos.append(
-                {
-                    "obj": alimento_rel,
-                    "nombre": alimento.Nombre,
-                    "porcion": porcion_display,
-                    "porcion_valor": porcion,
-                    "calorias": calorias,
-                    "macros": alimento.Macros,
-                }
-            )
-        dia_info["comidas"].append(
-            {
-                "obj": dia_comida,
-                "tipo": dia_comida.TipoComida or "Comida",
-                "alimentos": alimentos,
-            }
-        )
-
     context = {
         "socio": None,
         "plan": plan,
-        "dias": dias_semana,
+        "dias": obtener_documento(plan).Contenido["dias"],
         "alimentos_catalogo": Alimento.objects.all().order_by("Nombre"),
         "es_template": True,
     }
@@ -560,6 +454,61 @@ def entrenador_crear_plantilla_nutricional(request):
     return redirect("entrenador_plantilla_nutricion", plan_id=plan.id)
 
 
+def _sin_permiso_grupo(request):
+    """Respuesta 403 (JSON) si quien pide una asignación en grupo no es del staff."""
+    rol = request.session.get("usuario_rol", "").lower()
+    if rol not in ("entrenador", "administrativo"):
+        return JsonResponse(
+            {"ok": False, "error": "No tienes permisos para esta acción."}, status=403
+        )
+    return None
+
+
+def _socios_seleccionados(request):
+    """IDs de ``socio_ids`` más los socios activos hoy del plan ``plan_membresia``."""
+    socio_ids = [v for v in request.POST.getlist("socio_ids") if v.isdigit()]
+    plan_membresia = request.POST.get("plan_membresia", "")
+    if plan_membresia.isdigit():
+        socio_ids += socios_activos_del_plan(plan_membresia)
+    return socio_ids
+
+
+@login_requerido
+@require_POST
+def entrenador_aplicar_plantilla_grupo(request, plan_id):
+    """Aplicar una plantilla guardada a varios socios a la vez (JSON).
+
+    Los socios se eligen con ``socio_ids`` (uno o varios) y/o con
+    ``plan_membresia``: todos los que tienen hoy una membresía activa de ese plan.
+    """
+    sin_permiso = _sin_permiso_grupo(request)
+    if sin_permiso:
+        return sin_permiso
+
+    plantilla = get_object_or_404(
+        PlanNutricional, id=plan_id, EsPlantilla=True, SocioID__isnull=True
+    )
+
+    socio_ids = _socios_seleccionados(request)
+    if not socio_ids:
+        return JsonResponse({"ok": False, "error": "No hay socios seleccionados."}, status=400)
+
+    objetivo_raw = request.POST.get("objetivo_calorico")
+    try:
+        objetivo = int(objetivo_raw) if objetivo_raw else None
+    except (TypeError, ValueError):
+        return JsonResponse(
+            {"ok": False, "error": "El objetivo calórico debe ser un número válido."}, status=400
+        )
+
+    resultados = aplicar_plantilla_a_socios(plantilla, socio_ids, objetivo)
+    return JsonResponse({
+        "ok": True,
+        "aplicados": sum(1 for r in resultados if r["ok"]),
+        "resultados": resultados,
+    })
+
+
 @login_requerido
 def entrenador_crear_plan_manual(request, socio_id):
     rol = request.session.get("usuario_rol", "").lower()
@@ -630,6 +579,7 @@ def entrenador_nutricion_agregar_comida(request, plan_id):
         DiaSemana=max(0, min(6, dia)),
         TipoComida=tipo,
     )
+    DocumentoPlanNutricional.invalidar([plan.id])
     messages.success(request, "Comida agregada.")
     return _redirect_plan(plan)
 
@@ -645,6 +595,7 @@ def entrenador_nutricion_eliminar_comida(request, dia_id):
         return _redirect_plan(plan)
 
     dia.delete()
+    DocumentoPlanNutricional.invalidar([plan.id])
     messages.success(request, "Comida eliminada.")
     return _redirect_plan(plan)
 
@@ -676,6 +627,7 @@ def entrenador_nutricion_agregar_alimento(request, dia_id):
         AlimentoID=alimento,
         Porcion=porcion,
     )
+    DocumentoPlanNutricional.invalidar([plan.id])
     messages.success(request, "Alimento agregado.")
     return _redirect_plan(plan)
 
@@ -732,6 +684,7 @@ def entrenador_nutricion_crear_alimento(request):
         PorcionBase=porcion_base,
         Kcal=kcal,
         Macros=macros,
+        **parsear_macros(macros),
     )
     messages.success(request, "Alimento personalizado creado y disponible en el catálogo.")
     return redirect(redirect_target)
@@ -757,6 +710,7 @@ def entrenador_nutricion_actualizar_alimento(request, item_id):
             messages.error(request, "Porción inválida.")
             return _redirect_plan(plan)
     item.save()
+    DocumentoPlanNutricional.invalidar([plan.id])
     messages.success(request, "Alimento actualizado.")
     return _redirect_plan(plan)
 
@@ -772,6 +726,7 @@ def entrenador_nutricion_eliminar_alimento(request, item_id):
         return _redirect_plan(plan)
 
     item.delete()
+    DocumentoPlanNutricional.invalidar([plan.id])
     messages.success(request, "Alimento eliminado.")
     return _redirect_plan(plan)
 
@@ -822,24 +777,41 @@ def crear_rutina_entrenador_view(request):
             except Exception:
                 ejercicios_temp = []
 
+            # Se normaliza cada item y se asignan todos juntos (una consulta
+            # para los ejercicios y un único insert)
+            items, posiciones = [], []
             for idx, item in enumerate(ejercicios_temp, start=1):
                 ejercicio_id = item.get("ejercicio_id") or item.get("id")
-                dia_raw = item.get("dia") if item.get("dia") is not None else item.get("DiaSemana")
+                dia_raw = item.get("dia")
+                if dia_raw is None:
+                    dia_raw = item.get("DiaSemana")
+                series = item.get("series")
+                reps = item.get("reps") or item.get("repeticiones")
+                peso = item.get("peso")
                 try:
-                    asignar_ejercicio_a_rutina(
-                        rutina_id=rutina.id,
-                        ejercicio_id=ejercicio_id,
-                        dia_semana=int(dia_raw),
-                        series=int(item.get("series")) if item.get("series") is not None else None,
-                        repeticiones=int(item.get("reps") or item.get("repeticiones")) if (item.get("reps") or item.get("repeticiones")) else None,
-                        tempo=item.get("tempo") or item.get("Tempo") or "",
-                        peso_objetivo=float(item.get("peso")) if item.get("peso") is not None and item.get("peso") != "" else None,
-                    )
-                    added += 1
-                except ValidationError as ve:
-                    failed.append(f"item #{idx}: {ve}")
+                    items.append({
+                        "ejercicio_id": ejercicio_id,
+                        "dia_semana": int(dia_raw),
+                        "series": int(series) if series is not None else None,
+                        "repeticiones": int(reps) if reps else None,
+                        "tempo": item.get("tempo") or item.get("Tempo") or "",
+                        "peso_objetivo": float(peso) if peso not in (None, "") else None,
+                    })
+                    posiciones.append(idx)
                 except Exception as e:
-                    failed.append(f"item #{idx}: {str(e)}")
+                    failed.append((idx, str(e)))
+
+            if items:
+                try:
+                    resultado = asignar_ejercicios_bulk(rutina.id, items)
+                    added = len(resultado["creados"])
+                    failed += [
+                        (posiciones[posicion - 1], error)
+                        for posicion, error in resultado["errores"]
+                    ]
+                except ValidationError as ve:
+                    failed += [(idx, str(ve)) for idx in posiciones]
+            failed = [f"item #{idx}: {error}" for idx, error in sorted(failed)]
 
     # Informar al entrenador cuántos ejercicios temporales se agregaron (si los hubo)
         if added > 0:
@@ -1067,12 +1039,45 @@ def borrar_rutina_view(request, rutina_id):
 @login_requerido
 @require_POST
 def ajax_asignar_rutina(request, rutina_id):
-    """Asociar una rutina a un socio"""
+    """
+    Asociar una rutina a un socio (las del banco se copian: la plantilla se
+    queda en el banco)
+    """
     socio_id = request.POST.get("socio_id")
     rutina = get_object_or_404(RutinaSemanal, id=rutina_id)
     socio = get_object_or_404(Socio, id=socio_id)
 
+    if rutina.EsPlantilla:
+        resultado, = clonar_rutina_a_socios(rutina, [socio.id])
+        return JsonResponse({"ok": True, "rutina_id": resultado["rutina_id"]})
+
     rutina.SocioID = socio
     rutina.save()
 
-    return JsonResponse({"ok": True})
+    return JsonResponse({"ok": True, "rutina_id": rutina.id})
+
+
+@login_requerido
+@require_POST
+def ajax_asignar_rutina_grupo(request, rutina_id):
+    """Copiar una rutina del banco a varios socios a la vez (JSON).
+
+    Los socios se eligen con ``socio_ids`` (uno o varios) y/o con
+    ``plan_membresia``: todos los que tienen hoy una membresía activa de ese plan.
+    """
+    sin_permiso = _sin_permiso_grupo(request)
+    if sin_permiso:
+        return sin_permiso
+
+    plantilla = get_object_or_404(RutinaSemanal, id=rutina_id, EsPlantilla=True)
+
+    socio_ids = _socios_seleccionados(request)
+    if not socio_ids:
+        return JsonResponse({"ok": False, "error": "No hay socios seleccionados."}, status=400)
+
+    resultados = clonar_rutina_a_socios(plantilla, socio_ids)
+    return JsonResponse({
+        "ok": True,
+        "asignados": sum(1 for r in resultados if r["ok"]),
+        "resultados": resultados,
+    })
@@ -1,6 +1,25 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PagosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.pagos'
+
+    def ready(self):
+        if not getattr(settings, 'PAGOS_PROGRAMADOR_EXPIRACION', False):
+            return
+        # Los comandos de gestión (migrate, test, ...) no necesitan el hilo;
+        # con runserver solo lo arranca el proceso que atiende peticiones.
+        if sys.argv[0].endswith('manage.py') and len(sys.argv) > 1:
+            es_runserver = sys.argv[1] == 'runserver'
+            recarga = '--noreload' not in sys.argv
+            if not es_runserver or (recarga and os.environ.get('RUN_MAIN') != 'true'):
+                return
+
+        from apps.pagos.programador import iniciar_programador
+
+        iniciar_programador()
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.pagos.servicios.pagos_service import (
+    TAMANO_LOTE_EXPIRACION,
+    actualizar_estados_membresias,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa a Expirada las membresías vencidas. Pensado para ejecutarse una "
+        "vez al día (cron o el programador de apps.pagos); es seguro lanzarlo "
+        "varias veces o en paralelo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tamano-lote",
+            type=int,
+            default=TAMANO_LOTE_EXPIRACION,
+            help="Membresías actualizadas por transacción.",
+        )
+
+    def handle(self, *args, **options):
+        cambiadas = actualizar_estados_membresias(tamano_lote=options["tamano_lote"])
+        self.stdout.write(self.style.SUCCESS(f"Membresías expiradas: {cambiadas}"))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagos', '0004_alter_sociomembresia_planid'),
+        ('socios', '0006_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['FechaPago'], name='pago_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sociomembresia',
+            index=models.Index(fields=['SocioID', '-FechaInicio'], name='socmem_socio_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sociomembresia',
+            index=models.Index(fields=['Estado', 'FechaFin'], name='socmem_estado_fin_idx'),
+        ),
+    ]
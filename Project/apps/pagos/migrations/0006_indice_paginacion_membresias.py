@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagos', '0005_indices_consultas_frecuentes'),
+        ('socios', '0006_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sociomembresia',
+            index=models.Index(fields=['-FechaFin', '-id'], name='socmem_fin_id_idx'),
+        ),
+    ]
@@ -44,6 +44,14 @@ class SocioMembresia(models.Model):
         verbose_name_plural = "Socio Membresías"
         db_table = "socio_membresia"
         ordering = ["-FechaInicio"]
+        indexes = [
+            # Membresía más reciente de un socio
+            models.Index(fields=["SocioID", "-FechaInicio"], name="socmem_socio_inicio_idx"),
+            # Membresías por estado que vencen antes de una fecha
+            models.Index(fields=["Estado", "FechaFin"], name="socmem_estado_fin_idx"),
+            # Paginación por clave de la gestión de pagos
+            models.Index(fields=["-FechaFin", "-id"], name="socmem_fin_id_idx"),
+        ]
 
     def is_active(self):
         today = timezone.localdate()
@@ -70,6 +78,9 @@ class Pago(models.Model):
     class Meta:
         ordering = ["-FechaPago"]
         db_table = "pago"
+        indexes = [
+            models.Index(fields=["FechaPago"], name="pago_fecha_idx"),
+        ]
 
 
 # === TABLA AlertaPago ===
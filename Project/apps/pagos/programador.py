@@ -0,0 +1,63 @@
+"""
+Programador en proceso para el cambio de día de las membresías.
+
+Alternativa a programar ``manage.py expirar_membresias`` con cron: si
+``PAGOS_PROGRAMADOR_EXPIRACION = True`` en settings, PagosConfig.ready()
+arranca un hilo que expira las membresías al arrancar y después cada día
+poco después de medianoche (hora local).
+"""
+import logging
+import threading
+from datetime import datetime, time, timedelta
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Margen tras medianoche para que "hoy" ya sea el nuevo día
+MARGEN_CAMBIO_DIA = timedelta(minutes=1)
+
+_hilo = None
+_lock = threading.Lock()
+
+
+def segundos_hasta_cambio_de_dia(ahora=None):
+    ahora = timezone.localtime(ahora)
+    manana = ahora.date() + timedelta(days=1)
+    siguiente = timezone.make_aware(datetime.combine(manana, time.min)) + MARGEN_CAMBIO_DIA
+    return (siguiente - ahora).total_seconds()
+
+
+def ejecutar_expiracion():
+    from apps.pagos.servicios.pagos_service import actualizar_estados_membresias
+
+    close_old_connections()
+    try:
+        cambiadas = actualizar_estados_membresias()
+        logger.info("Membresías expiradas: %s", cambiadas)
+    except Exception:
+        logger.exception("Error expirando membresías")
+    finally:
+        close_old_connections()
+
+
+def _bucle(detener):
+    ejecutar_expiracion()
+    while not detener.wait(segundos_hasta_cambio_de_dia()):
+        ejecutar_expiracion()
+
+
+def iniciar_programador():
+    """Arranca el hilo (una sola vez por proceso). Devuelve el evento para detenerlo."""
+    global _hilo
+    with _lock:
+        if _hilo is not None:
+            return _hilo.detener
+        detener = threading.Event()
+        _hilo = threading.Thread(
+            target=_bucle, args=(detener,), name="expirar-membresias", daemon=True
+        )
+        _hilo.detener = detener
+        _hilo.start()
+        return detener
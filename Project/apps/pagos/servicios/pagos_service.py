@@ -1,14 +1,25 @@
 from datetime import timedelta, datetime
 from decimal import Decimal
 
-from django.db import transaction
-from django.db.models import Sum, Prefetch, Count, Q
+from django.db import connection, transaction
+from django.db.models import F, OuterRef, Q, Subquery, Sum, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 
 from apps.pagos.models import PlanMembresia, SocioMembresia, Pago, AlertaPago
+from apps.seguridad.servicios.estadisticas_dashboard import invalidar_cache_dashboard
 from apps.socios.models import Socio
 
 
+TAMANO_LOTE_EXPIRACION = 500
+
+# Membresías por página en la gestión de pagos
+TAMANO_PAGINA_MEMBRESIAS = 25
+
+# Socios devueltos por la búsqueda del formulario de pago
+LIMITE_BUSQUEDA_SOCIOS = 20
+
+
 class ValidationError(ValueError):
     """Error de validación usado en los servicios de pagos."""
     pass
@@ -72,28 +83,163 @@ def registrar_pago_membresia(socio_id, plan_id, monto, tipo_pago, comprobante_id
 
 
 def obtener_membresias_con_socios():
-
-    actualizar_estados_membresias()
-    
+    # Solo lectura: las membresías vencidas las expira el comando
+    # expirar_membresias (o el programador de apps.pagos.programador).
+    ultimo_pago = Pago.objects.filter(
+        SocioMembresiaID=OuterRef('pk')
+    ).order_by('-FechaPago', '-id')
     membresias = SocioMembresia.objects.select_related(
         'SocioID', 'PlanID'
-    ).prefetch_related(
-        Prefetch('pagos', queryset=Pago.objects.order_by('-FechaPago'))
-    ).order_by('-FechaFin')
-    
+    ).annotate(
+        ultimo_pago_monto=Subquery(ultimo_pago.values('Monto')[:1]),
+        ultimo_pago_fecha=Subquery(ultimo_pago.values('FechaPago')[:1]),
+    ).order_by('-FechaFin', '-id')
+
     return membresias
 
 
-def actualizar_estados_membresias():
-    hoy = timezone.localdate()
-    
-    membresias_expiradas = SocioMembresia.objects.filter(
-        FechaFin__lt=hoy
-    ).exclude(
-        Estado=SocioMembresia.ESTADO_EXPIRADA
+def filtrar_membresias(membresias, estado=None, plan_id=None, busqueda=''):
+    """Aplica los filtros de la gestión de pagos sobre un QuerySet de membresías."""
+    if estado:
+        membresias = membresias.filter(Estado=estado)
+    if plan_id:
+        membresias = membresias.filter(PlanID_id=plan_id)
+    if busqueda:
+        membresias = membresias.filter(
+            Q(SocioID__NombreCompleto__icontains=busqueda)
+            | Q(SocioID__Identificacion__icontains=busqueda)
+        )
+    return membresias
+
+
+def _leer_cursor(cursor):
+    """``AAAA-MM-DD_id`` -> (fecha, id); None si el cursor no es válido."""
+    try:
+        fecha, membresia_id = cursor.split('_')
+        return datetime.strptime(fecha, '%Y-%m-%d').date(), int(membresia_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def paginar_membresias(membresias, cursor=None, tamano=TAMANO_PAGINA_MEMBRESIAS):
+    """
+    Página de membresías ordenadas por (FechaFin, id) descendente, por clave:
+    el cursor es la última fila de la página anterior, así que cada página
+    cuesta lo mismo sin importar cuántas haya antes.
+
+    Returns:
+        (lista de membresías, cursor de la página siguiente o None)
+    """
+    posicion = _leer_cursor(cursor) if cursor else None
+    if posicion:
+        fecha_fin, membresia_id = posicion
+        membresias = membresias.filter(
+            Q(FechaFin__lt=fecha_fin) | Q(FechaFin=fecha_fin, id__lt=membresia_id)
+        )
+
+    pagina = list(membresias.order_by('-FechaFin', '-id')[:tamano + 1])
+    siguiente = None
+    if len(pagina) > tamano:
+        pagina = pagina[:tamano]
+        ultima = pagina[-1]
+        siguiente = f"{ultima.FechaFin.isoformat()}_{ultima.id}"
+    return pagina, siguiente
+
+
+def membresias_actuales(socio_ids):
+    """
+    Plan y precio de la membresía más reciente (por FechaInicio) de cada
+    socio, en una sola consulta: DISTINCT ON donde la base de datos lo
+    soporta (PostgreSQL) y ROW_NUMBER() en el resto.
+
+    Returns:
+        dict socio_id -> {'plan_id', 'precio'} (sin los socios cuya última
+        membresía no tiene plan)
+    """
+    ultimas = SocioMembresia.objects.filter(SocioID__in=socio_ids)
+    if connection.features.can_distinct_on_fields:
+        ultimas = ultimas.order_by('SocioID', '-FechaInicio', '-id').distinct('SocioID')
+    else:
+        ultimas = ultimas.annotate(
+            orden=Window(
+                RowNumber(),
+                partition_by=[F('SocioID')],
+                order_by=[F('FechaInicio').desc(), F('id').desc()],
+            )
+        ).filter(orden=1)
+
+    return {
+        socio_id: {'plan_id': plan_id, 'precio': float(precio)}
+        for socio_id, plan_id, precio in ultimas.values_list(
+            'SocioID', 'PlanID', 'PlanID__Precio'
+        )
+        if plan_id is not None
+    }
+
+
+def buscar_socios_para_pago(texto, limite=LIMITE_BUSQUEDA_SOCIOS):
+    """
+    Socios cuyo nombre o identificación contiene ``texto``, con el plan y el
+    precio de su membresía actual para precargar el formulario de pago.
+    """
+    socios = list(
+        Socio.objects.filter(Rol='Socio')
+        .filter(Q(NombreCompleto__icontains=texto) | Q(Identificacion__icontains=texto))
+        .order_by('NombreCompleto', 'id')
+        .values('id', 'NombreCompleto', 'Identificacion')[:limite]
     )
-    
-    membresias_expiradas.update(Estado=SocioMembresia.ESTADO_EXPIRADA)
+    actuales = membresias_actuales([socio['id'] for socio in socios]) if socios else {}
+
+    return [
+        {
+            'id': socio['id'],
+            'nombre': socio['NombreCompleto'],
+            'identificacion': socio['Identificacion'],
+            'plan_id': actuales.get(socio['id'], {}).get('plan_id'),
+            'precio': actuales.get(socio['id'], {}).get('precio'),
+        }
+        for socio in socios
+    ]
+
+
+def actualizar_estados_membresias(hoy=None, tamano_lote=TAMANO_LOTE_EXPIRACION):
+    """
+    Pasa a Expirada las membresías con FechaFin anterior a hoy, por lotes.
+
+    Cada lote es una transacción corta. Donde la base de datos lo permite las
+    filas se bloquean con SKIP LOCKED, así que dos ejecuciones simultáneas se
+    reparten el trabajo en vez de esperarse, y no bloquean los pagos en curso
+    más que lo que dura un lote.
+
+    Returns:
+        Número de membresías que cambiaron de estado
+    """
+    hoy = hoy or timezone.localdate()
+    bloqueo = {'skip_locked': connection.features.has_select_for_update_skip_locked}
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            vencidas = SocioMembresia.objects.filter(
+                FechaFin__lt=hoy
+            ).exclude(
+                Estado=SocioMembresia.ESTADO_EXPIRADA
+            )
+            ids = list(
+                vencidas.select_for_update(**bloqueo)
+                .order_by('id')
+                .values_list('id', flat=True)[:tamano_lote]
+            )
+            if not ids:
+                break
+            total += vencidas.filter(id__in=ids).update(
+                Estado=SocioMembresia.ESTADO_EXPIRADA
+            )
+
+    if total:
+        # update() no dispara señales
+        invalidar_cache_dashboard()
+    return total
 
 
 def obtener_estadisticas_pagos():
@@ -122,6 +268,22 @@ def obtener_estadisticas_pagos():
     }
 
 
+def socios_activos_del_plan(plan_id, fecha=None):
+    """IDs de los socios con una membresía activa de ``plan_id`` vigente en ``fecha`` (hoy)."""
+    fecha = fecha or timezone.localdate()
+    return (
+        SocioMembresia.objects.filter(
+            PlanID_id=plan_id,
+            Estado=SocioMembresia.ESTADO_ACTIVA,
+            FechaInicio__lte=fecha,
+            FechaFin__gte=fecha,
+        )
+        .order_by()
+        .values_list("SocioID", flat=True)
+        .distinct()
+    )
+
+
 def crear_membresia_para_socio(socio_id, plan_id, fecha_inicio=None):
     try:
         socio = Socio.objects.get(id=socio_id)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.pagos.models import PlanMembresia, SocioMembresia
+from apps.pagos.programador import segundos_hasta_cambio_de_dia
+from apps.pagos.servicios.pagos_service import (
+    actualizar_estados_membresias,
+    obtener_membresias_con_socios,
+)
+from apps.socios.models import Socio
+
+
+class ExpiracionMembresiasTest(TestCase):
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.plan = PlanMembresia.objects.create(
+            Nombre="Plan Mensual", Precio=Decimal("30000.00"), DuracionDias=30
+        )
+        casos = [
+            (-1, "Activa"), (-10, "Morosa"), (-3, "Activa"),
+            (-5, "Expirada"), (0, "Activa"), (15, "Activa"),
+        ]
+        for n, (dias_fin, estado) in enumerate(casos):
+            socio = Socio.objects.create(Identificacion=str(n), NombreCompleto=f"Socio {n}")
+            SocioMembresia.objects.create(
+                SocioID=socio,
+                PlanID=self.plan,
+                FechaInicio=self.hoy - timedelta(days=40),
+                FechaFin=self.hoy + timedelta(days=dias_fin),
+                Estado=estado,
+            )
+
+    def test_expira_por_lotes_y_reporta_filas_cambiadas(self):
+        cambiadas = actualizar_estados_membresias(tamano_lote=2)
+
+        self.assertEqual(cambiadas, 3)
+        self.assertEqual(
+            SocioMembresia.objects.filter(Estado=SocioMembresia.ESTADO_EXPIRADA).count(), 4
+        )
+        # Volver a ejecutarlo no cambia nada
+        self.assertEqual(actualizar_estados_membresias(tamano_lote=2), 0)
+
+    def test_comando_informa_el_numero_de_cambios(self):
+        salida = StringIO()
+
+        call_command("expirar_membresias", stdout=salida)
+
+        self.assertIn("Membresías expiradas: 3", salida.getvalue())
+
+    def test_listado_de_membresias_no_escribe(self):
+        with CaptureQueriesContext(connection) as consultas:
+            list(obtener_membresias_con_socios())
+
+        self.assertFalse(
+            [q for q in consultas.captured_queries if q["sql"].startswith("UPDATE")]
+        )
+
+    def test_programador_espera_hasta_pasada_medianoche(self):
+        ahora = timezone.make_aware(datetime.combine(self.hoy, datetime.min.time())) + timedelta(
+            hours=23
+        )
+
+        self.assertEqual(segundos_hasta_cambio_de_dia(ahora), 3660)
@@ -0,0 +1,155 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.pagos.models import Pago, PlanMembresia, SocioMembresia
+from apps.pagos.servicios.pagos_service import (
+    TAMANO_PAGINA_MEMBRESIAS,
+    buscar_socios_para_pago,
+    filtrar_membresias,
+    membresias_actuales,
+    obtener_membresias_con_socios,
+    paginar_membresias,
+)
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.models import Socio
+
+
+class GestionPagosTest(TestCase):
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.mensual = PlanMembresia.objects.create(
+            Nombre="Mensual", Precio=Decimal("30000.00"), DuracionDias=30
+        )
+        self.anual = PlanMembresia.objects.create(
+            Nombre="Anual", Precio=Decimal("300000.00"), DuracionDias=365
+        )
+
+    def _socios(self, cantidad, desde=0):
+        for n in range(desde, desde + cantidad):
+            socio = Socio.objects.create(Identificacion=f"{n:010d}", NombreCompleto=f"Socio {n}")
+            for meses_atras, plan in ((2, self.mensual), (1, self.anual)):
+                membresia = SocioMembresia.objects.create(
+                    SocioID=socio,
+                    PlanID=plan,
+                    FechaInicio=self.hoy - timedelta(days=30 * meses_atras),
+                    FechaFin=self.hoy + timedelta(days=n - 30 * meses_atras),
+                )
+                Pago.objects.create(SocioMembresiaID=membresia, Monto=plan.Precio)
+
+    def _entrar_como_admin(self):
+        rol = Rol.objects.create(NombreRol="Administrativo")
+        usuario = Usuario.objects.create(
+            NombreUsuario="admin", Email="admin@test.com",
+            PasswordHash=make_password("clave12345"), RolID=rol,
+        )
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "administrativo"
+        session.save()
+
+    def test_membresia_actual_de_cada_socio_en_una_consulta(self):
+        self._socios(3)
+        sin_plan = Socio.objects.create(Identificacion="9999999999", NombreCompleto="Sin plan")
+        SocioMembresia.objects.create(
+            SocioID=sin_plan, PlanID=None, FechaInicio=self.hoy, FechaFin=self.hoy
+        )
+        ids = list(Socio.objects.values_list("id", flat=True))
+
+        with self.assertNumQueries(1):
+            actuales = membresias_actuales(ids)
+
+        self.assertEqual(len(actuales), 3)
+        self.assertNotIn(sin_plan.id, actuales)
+        for valor in actuales.values():
+            self.assertEqual(valor, {"plan_id": self.anual.id, "precio": 300000.0})
+
+    def test_paginacion_por_clave_recorre_todo_sin_repetir(self):
+        self._socios(30)
+        membresias = obtener_membresias_con_socios()
+        esperado = list(membresias.values_list("id", flat=True))
+
+        vistos, cursor = [], None
+        while True:
+            pagina, cursor = paginar_membresias(membresias, cursor, tamano=7)
+            vistos += [m.id for m in pagina]
+            if cursor is None:
+                break
+
+        self.assertEqual(vistos, esperado)
+
+    def test_cursor_invalido_devuelve_la_primera_pagina(self):
+        self._socios(2)
+
+        pagina, siguiente = paginar_membresias(obtener_membresias_con_socios(), "basura")
+
+        self.assertEqual(len(pagina), 4)
+        self.assertIsNone(siguiente)
+
+    def test_filtros_en_base_de_datos(self):
+        self._socios(12)
+        membresias = obtener_membresias_con_socios()
+
+        self.assertEqual(filtrar_membresias(membresias, busqueda="Socio 1").count(), 6)
+        self.assertEqual(filtrar_membresias(membresias, busqueda="0000000011").count(), 2)
+        self.assertEqual(filtrar_membresias(membresias, plan_id=self.anual.id).count(), 12)
+
+    def test_busqueda_de_socios_incluye_plan_actual(self):
+        self._socios(3)
+
+        resultado = buscar_socios_para_pago("Socio 2")
+
+        self.assertEqual(len(resultado), 1)
+        self.assertEqual(resultado[0]["plan_id"], self.anual.id)
+        self.assertEqual(resultado[0]["precio"], 300000.0)
+
+    def test_vista_con_consultas_y_tamano_fijos(self):
+        self._entrar_como_admin()
+        self._socios(5)
+
+        def medir():
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(reverse("gestion_pagos"))
+            self.assertEqual(respuesta.status_code, 200)
+            return len(consultas), len(respuesta.context["membresias"]), len(respuesta.content)
+
+        consultas_pocos, filas_pocos, _ = medir()
+        self._socios(40, desde=5)
+        consultas_muchos, filas_muchos, tamano_muchos = medir()
+        self._socios(40, desde=45)
+        _, _, tamano_mas = medir()
+
+        self.assertEqual(consultas_pocos, consultas_muchos)
+        self.assertEqual(filas_pocos, 10)
+        self.assertEqual(filas_muchos, TAMANO_PAGINA_MEMBRESIAS)
+        # Solo cambian los contadores, no el número de filas
+        self.assertLess(abs(tamano_mas - tamano_muchos), 100)
+
+    def test_vista_pagina_siguiente(self):
+        self._entrar_como_admin()
+        self._socios(20)
+
+        primera = self.client.get(reverse("gestion_pagos"), {"estado": "Activa"})
+        cursor = primera.context["siguiente_cursor"]
+        segunda = self.client.get(reverse("gestion_pagos"), {"estado": "Activa", "cursor": cursor})
+
+        self.assertEqual(len(segunda.context["membresias"]), 40 - TAMANO_PAGINA_MEMBRESIAS)
+        self.assertIsNone(segunda.context["siguiente_cursor"])
+        self.assertContains(primera, f"estado=Activa&amp;cursor={cursor}")
+
+    def test_endpoint_busqueda_socios(self):
+        self._entrar_como_admin()
+        self._socios(3)
+
+        respuesta = self.client.get(reverse("buscar_socios_pago"), {"q": "0000000001"})
+
+        self.assertEqual([s["nombre"] for s in respuesta.json()["socios"]], ["Socio 1"])
+        corta = self.client.get(reverse("buscar_socios_pago"), {"q": "S"})
+        self.assertEqual(corta.json(), {"socios": []})
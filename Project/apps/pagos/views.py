@@ -2,14 +2,18 @@ from django.shortcuts import render, redirect
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
+from django.db.models import Count
 from apps.seguridad.decoradores import admin_requerido
 from apps.pagos.servicios.pagos_service import (
+    buscar_socios_para_pago,
+    filtrar_membresias,
     obtener_membresias_con_socios,
     obtener_estadisticas_pagos,
+    paginar_membresias,
     registrar_pago_membresia
 )
 from apps.pagos.models import PlanMembresia, SocioMembresia
-from apps.socios.models import Socio
+from apps.seguridad.servicios.estadisticas_dashboard import invalidar_cache_dashboard
 
 
 @admin_requerido
@@ -19,64 +23,56 @@ def gestion_pagos_view(request):
     estado_filter = request.GET.get('estado', 'todos')
     plan_filter = request.GET.get('plan', 'todos')
     busqueda = request.GET.get('busqueda', '').strip()
-    
-    # Obtener todas las membresías
-    membresias = obtener_membresias_con_socios()
-    
-    # Aplicar filtros
-    if estado_filter != 'todos':
-        membresias = membresias.filter(Estado=estado_filter)
-    
-    if plan_filter != 'todos':
-        membresias = membresias.filter(PlanID__id=plan_filter)
-    
-    if busqueda:
-        membresias = membresias.filter(
-            SocioID__NombreCompleto__icontains=busqueda
-        ) | membresias.filter(
-            SocioID__Identificacion__icontains=busqueda
-        )
-    
+    cursor = request.GET.get('cursor')
+
+    # Filtros y paginación en la base de datos: la página tiene un tamaño
+    # fijo sin importar cuántas membresías haya
+    membresias = filtrar_membresias(
+        obtener_membresias_con_socios(),
+        estado=estado_filter if estado_filter != 'todos' else None,
+        plan_id=plan_filter if plan_filter.isdigit() else None,
+        busqueda=busqueda,
+    )
+    total_membresias = membresias.count()
+    pagina, siguiente_cursor = paginar_membresias(membresias, cursor)
+
     # Obtener estadísticas
     estadisticas = obtener_estadisticas_pagos()
-    
-    # Obtener todos los planes para el filtro
-    planes = PlanMembresia.objects.all().order_by('Nombre')
-    
-    # Obtener todos los socios para el modal con sus membresías actuales
-    socios = Socio.objects.filter(Rol='Socio').order_by('NombreCompleto')
-    
-    # Crear diccionario con membresía actual de cada socio (plan_id y precio)
-    import json
-    socios_membresias = {}
-    for socio in socios:
-        membresia_actual = SocioMembresia.objects.filter(
-            SocioID=socio
-        ).select_related('PlanID').order_by('-FechaInicio').first()
-        
-        # Sólo registrar la membresía si existe y tiene un Plan asociado
-        if membresia_actual and getattr(membresia_actual, 'PlanID', None) is not None:
-            socios_membresias[socio.id] = {
-                'plan_id': membresia_actual.PlanID.id,
-                'precio': float(membresia_actual.PlanID.Precio)
-            }
-    
-    socios_membresias_json = json.dumps(socios_membresias)
-    
+
+    # Planes para los filtros y la tabla de planes, con sus socios contados
+    planes = PlanMembresia.objects.annotate(
+        num_membresias=Count('socio_membresias')
+    ).order_by('Nombre')
+
+    # Parámetros de los filtros para los enlaces de paginación
+    filtros = request.GET.copy()
+    filtros.pop('cursor', None)
+
     context = {
-        'membresias': membresias,
+        'membresias': pagina,
+        'total_membresias': total_membresias,
+        'siguiente_cursor': siguiente_cursor,
+        'es_primera_pagina': not cursor,
+        'filtros_query': filtros.urlencode(),
         'estadisticas': estadisticas,
         'planes': planes,
-        'socios': socios,
-        'socios_membresias_json': socios_membresias_json,
         'estado_filter': estado_filter,
         'plan_filter': plan_filter,
         'busqueda': busqueda,
     }
-    
+
     return render(request, "pagos/GestionPagos.html", context)
 
 
+@admin_requerido
+def buscar_socios_pago_view(request):
+    """Búsqueda de socios para el formulario de registrar pago (JSON)"""
+    texto = request.GET.get('q', '').strip()
+    if len(texto) < 2:
+        return JsonResponse({'socios': []})
+    return JsonResponse({'socios': buscar_socios_para_pago(texto)})
+
+
 @admin_requerido
 @require_http_methods(["POST"])
 def registrar_pago_view(request):
@@ -236,6 +232,7 @@ def eliminar_plan_membresia_view(request, plan_id):
         SocioMembresia.objects.filter(PlanID=plan).update(
             Estado=SocioMembresia.ESTADO_MOROSA
         )
+        invalidar_cache_dashboard()
         
         # Eliminar el plan (ahora SET_NULL se encargará de poner PlanID=NULL)
         nombre_plan = plan.Nombre
@@ -1,6 +1,6 @@
 # seguridad/admin.py
 from django.contrib import admin
-from .models import Rol, Usuario, RegistroAuditoria
+from .models import KPISnapshotDiario, Rol, Usuario, RegistroAuditoria
 
 
 @admin.register(Rol)
@@ -11,10 +11,11 @@ class RolAdmin(admin.ModelAdmin):
 
 @admin.register(Usuario)
 class UsuarioAdmin(admin.ModelAdmin):
-    list_display = ("id", "NombreUsuario", "RolID", "UltimoAcceso")
+    list_display = ("id", "NombreUsuario", "RolID", "SocioID", "UltimoAcceso")
     search_fields = ("NombreUsuario",)
     list_filter = ("RolID",)
     readonly_fields = ("UltimoAcceso",)
+    raw_id_fields = ("SocioID",)
 
 
 @admin.register(RegistroAuditoria)
@@ -22,3 +23,17 @@ class RegistroAuditoriaAdmin(admin.ModelAdmin):
     list_display = ("id", "FechaHora", "TipoAccion", "UsuarioID")
     list_filter = ("TipoAccion", "FechaHora")
     search_fields = ("Detalle",)
+
+
+@admin.register(KPISnapshotDiario)
+class KPISnapshotDiarioAdmin(admin.ModelAdmin):
+    list_display = (
+        "Fecha",
+        "TotalSocios",
+        "NuevosSocios",
+        "IngresosDia",
+        "SuscripcionesActivas",
+        "Reconstruido",
+    )
+    list_filter = ("Reconstruido",)
+    date_hierarchy = "Fecha"
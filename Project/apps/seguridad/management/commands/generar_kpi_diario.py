@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.seguridad.servicios.kpi_snapshot import (
+    guardar_snapshot_del_dia,
+    reconstruir_snapshots,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Guarda los KPIs del día para el dashboard administrativo. Con "
+        "--backfill-dias o --desde reconstruye además los días anteriores."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backfill-dias",
+            type=int,
+            help="Reconstruye desde el historial los N días anteriores a hoy.",
+        )
+        parser.add_argument(
+            "--desde",
+            help="Reconstruye desde el historial a partir de esta fecha (AAAA-MM-DD).",
+        )
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        desde = None
+
+        if options["desde"]:
+            try:
+                desde = date.fromisoformat(options["desde"])
+            except ValueError:
+                raise CommandError("--desde debe tener el formato AAAA-MM-DD.")
+        elif options["backfill_dias"]:
+            desde = hoy - timedelta(days=options["backfill_dias"])
+
+        if desde is not None:
+            reconstruidos = reconstruir_snapshots(desde, hoy - timedelta(days=1))
+            self.stdout.write(f"Días reconstruidos: {reconstruidos}")
+
+        snapshot = guardar_snapshot_del_dia(hoy)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"KPIs del {snapshot.Fecha}: {snapshot.TotalSocios} socios, "
+                f"{snapshot.SuscripcionesActivas} suscripciones activas."
+            )
+        )
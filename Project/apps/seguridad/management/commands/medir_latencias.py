@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.seguridad.servicios.medicion_latencias import (
+    TIMEOUT_SEGUNDOS,
+    ValidationError,
+    ejecutar_benchmark,
+    informe_markdown,
+)
+from apps.socios.servicios.generador_datos import PASSWORD_GENERADO
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide p50/p95/p99 de los recorridos de socio, entrenador y administrativo "
+        "contra un servidor ya levantado y una base sembrada con generar_datos. "
+        "Escribe el informe en JSON y Markdown; con --comparar lo contrasta con "
+        "otro informe JSON. Los recorridos registran pagos y sesiones reales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default="http://127.0.0.1:8000", help="URL base del servidor."
+        )
+        parser.add_argument("--concurrencia", type=int, default=4, help="Usuarios virtuales.")
+        parser.add_argument(
+            "--iteraciones", type=int, default=50, help="Recorridos medidos por usuario."
+        )
+        parser.add_argument(
+            "--calentamiento", type=int, default=2, help="Recorridos previos sin medir."
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Semilla de los recorridos.")
+        parser.add_argument(
+            "--password",
+            default=PASSWORD_GENERADO,
+            help="Contraseña de los usuarios (la de generar_datos por defecto).",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=TIMEOUT_SEGUNDOS,
+            help="Segundos máximos por petición; si se superan cuenta como error.",
+        )
+        parser.add_argument(
+            "--salida",
+            default="latencias",
+            help="Ruta sin extensión de los informes (.json y .md).",
+        )
+        parser.add_argument("--comparar", help="Informe JSON de otro commit.")
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options["comparar"]:
+            try:
+                anterior = json.loads(Path(options["comparar"]).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {exc}")
+
+        try:
+            informe = ejecutar_benchmark(
+                options["url"],
+                concurrencia=options["concurrencia"],
+                iteraciones=options["iteraciones"],
+                calentamiento=options["calentamiento"],
+                semilla=options["seed"],
+                password=options["password"],
+                timeout=options["timeout"],
+            )
+        except ValidationError as exc:
+            raise CommandError(str(exc))
+
+        markdown = informe_markdown(informe, anterior)
+        salida = Path(options["salida"])
+        salida.with_suffix(".json").write_text(json.dumps(informe, indent=2, ensure_ascii=False))
+        salida.with_suffix(".md").write_text(markdown)
+
+        self.stdout.write(markdown)
+        estilo = self.style.SUCCESS if not informe["errores"] else self.style.WARNING
+        self.stdout.write(
+            estilo(f"Informes en {salida.with_suffix('.json')} y {salida.with_suffix('.md')}")
+        )
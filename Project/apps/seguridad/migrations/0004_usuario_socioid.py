@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0003_alter_usuario_email'),
+        ('socios', '0005_registrocomidadiaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='SocioID',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usuario', to='socios.socio'),
+        ),
+    ]
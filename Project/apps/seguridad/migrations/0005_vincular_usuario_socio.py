@@ -0,0 +1,69 @@
+from django.db import migrations, transaction
+from django.db.models import Q
+
+# Tamaño de lote: cada lote se confirma por separado, así que si la migración
+# se interrumpe puede relanzarse y continúa con los usuarios aún sin vincular.
+TAMANO_LOTE = 1000
+
+
+def vincular_usuarios_con_socios(apps, schema_editor):
+    Usuario = apps.get_model("seguridad", "Usuario")
+    Socio = apps.get_model("socios", "Socio")
+
+    ultimo_id = 0
+    while True:
+        with transaction.atomic():
+            lote = list(
+                Usuario.objects.filter(id__gt=ultimo_id, SocioID__isnull=True)
+                .order_by("id")
+                .only("id", "Email", "NombreUsuario")[:TAMANO_LOTE]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            emails = {u.Email for u in lote if u.Email}
+            identificaciones = {u.NombreUsuario for u in lote if u.NombreUsuario}
+            candidatos = Socio.objects.filter(
+                Q(Email__in=emails) | Q(Identificacion__in=identificaciones),
+                usuario__isnull=True,
+            ).order_by("id")
+
+            # El vínculo histórico era el email; la identificación cubre los
+            # usuarios creados desde el panel (NombreUsuario = Identificacion).
+            por_email = {}
+            por_identificacion = {}
+            for socio in candidatos:
+                if socio.Email:
+                    por_email.setdefault(socio.Email, socio)
+                por_identificacion.setdefault(socio.Identificacion, socio)
+
+            usados = set()
+            vinculados = []
+            for usuario in lote:
+                socio = por_email.get(usuario.Email) or por_identificacion.get(
+                    usuario.NombreUsuario
+                )
+                if socio is None or socio.id in usados:
+                    continue
+                usados.add(socio.id)
+                usuario.SocioID = socio
+                vinculados.append(usuario)
+
+            Usuario.objects.bulk_update(vinculados, ["SocioID"])
+
+
+class Migration(migrations.Migration):
+    # Sin transacción global: cada lote se confirma por su cuenta
+    atomic = False
+
+    dependencies = [
+        ("seguridad", "0004_usuario_socioid"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            vincular_usuarios_con_socios,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seguridad', '0005_vincular_usuario_socio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPISnapshotDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Fecha', models.DateField(unique=True)),
+                ('TotalSocios', models.PositiveIntegerField(default=0)),
+                ('NuevosSocios', models.PositiveIntegerField(default=0)),
+                ('IngresosDia', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('SuscripcionesActivas', models.PositiveIntegerField(default=0)),
+                ('Reconstruido', models.BooleanField(default=False)),
+                ('FechaCalculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'kpi_snapshot_diario',
+                'ordering': ['Fecha'],
+            },
+        ),
+    ]
@@ -16,6 +16,15 @@ class Usuario(models.Model):
 
     Email = models.EmailField(max_length=254, unique=True)
 
+    # Vínculo con el perfil de socio (solo para usuarios con rol Socio)
+    SocioID = models.OneToOneField(
+        "socios.Socio",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="usuario",
+    )
+
     def __str__(self):
         return self.Email
 
@@ -32,4 +41,26 @@ class RegistroAuditoria(models.Model):
     )
 
     def __str__(self):
-        return f"{self.FechaHora} - {self.TipoAccion}"
\ No newline at end of file
+        return f"{self.FechaHora} - {self.TipoAccion}"
+
+
+# === TABLA KPISnapshotDiario ===
+class KPISnapshotDiario(models.Model):
+    """KPIs del panel de administración calculados una vez por día."""
+
+    Fecha = models.DateField(unique=True)
+    TotalSocios = models.PositiveIntegerField(default=0)
+    # Socios cuya primera membresía empieza ese día
+    NuevosSocios = models.PositiveIntegerField(default=0)
+    IngresosDia = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    SuscripcionesActivas = models.PositiveIntegerField(default=0)
+    # True si el día se reconstruyó desde el historial (backfill)
+    Reconstruido = models.BooleanField(default=False)
+    FechaCalculo = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"KPI {self.Fecha}"
+
+    class Meta:
+        db_table = "kpi_snapshot_diario"
+        ordering = ["Fecha"]
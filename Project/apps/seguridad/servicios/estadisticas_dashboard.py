@@ -1,62 +1,108 @@
 """
 Servicio para calcular estadísticas del dashboard administrativo
 """
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count, Sum, Q
-from apps.socios.models import Socio
-from apps.pagos.models import SocioMembresia, Pago
-import calendar
-    
+from django.db.models import Count, OuterRef, Subquery, Sum, Q
+from django.db.models.functions import TruncMonth
+from apps.pagos.models import SocioMembresia
+from apps.seguridad.models import KPISnapshotDiario
+from apps.seguridad.servicios.kpi_snapshot import snapshot_de_hoy
+
+# Los datos se cachean y se invalidan al escribir Pago/SocioMembresia/Socio
+# (ver apps/seguridad/signals.py); el TTL cubre los cortes por fecha.
+CACHE_DASHBOARD_SEGUNDOS = 300
+CLAVE_ESTADISTICAS = 'dashboard:admin:estadisticas'
+CLAVE_ESTADISTICAS_PAGOS = 'dashboard:admin:estadisticas_pagos'
+CLAVE_ACTIVIDAD = 'dashboard:admin:actividad'
+
+NOMBRES_MESES = {
+    1: 'Ene', 2: 'Feb', 3: 'Mar', 4: 'Abr',
+    5: 'May', 6: 'Jun', 7: 'Jul', 8: 'Ago',
+    9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dic'
+}
+
+
+def invalidar_cache_dashboard():
+    cache.delete_many([CLAVE_ESTADISTICAS, CLAVE_ESTADISTICAS_PAGOS, CLAVE_ACTIVIDAD])
+
+
+def _cacheado(clave, calcular):
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular()
+        cache.set(clave, datos, CACHE_DASHBOARD_SEGUNDOS)
+    return datos
+
+
+def _ultimos_meses(hoy, cantidad):
+    """(año, mes) de los últimos ``cantidad`` meses, terminando en el de ``hoy``."""
+    meses_ventana = []
+    for i in range(cantidad - 1, -1, -1):
+        mes_actual = hoy.month - i
+        año_actual = hoy.year
+
+        while mes_actual <= 0:
+            mes_actual += 12
+            año_actual -= 1
+
+        meses_ventana.append((año_actual, mes_actual))
+    return meses_ventana
+
 
 def obtener_estadisticas_dashboard():
+    return _cacheado(CLAVE_ESTADISTICAS, _calcular_estadisticas_dashboard)
+
+
+def _calcular_estadisticas_dashboard():
+    """
+    Tarjetas del panel leídas de KPISnapshotDiario (ver kpi_snapshot): los
+    totales son los del snapshot de hoy y los nuevos socios de los últimos
+    30 días y los ingresos del mes, la suma de los días.
+    """
+    hoy = snapshot_de_hoy()
+    hace_30_dias = hoy.Fecha - timedelta(days=29)
+    primer_dia_mes = hoy.Fecha.replace(day=1)
+
+    sumas = KPISnapshotDiario.objects.filter(
+        Fecha__gte=min(hace_30_dias, primer_dia_mes), Fecha__lte=hoy.Fecha
+    ).aggregate(
+        nuevos=Sum('NuevosSocios', filter=Q(Fecha__gte=hace_30_dias)),
+        ingresos=Sum('IngresosDia', filter=Q(Fecha__gte=primer_dia_mes)),
+    )
 
-    hoy = timezone.now()
-    
-    total_socios = Socio.objects.count()
-    
-    hace_30_dias = hoy - timedelta(days=30)
-    
-    nuevos_socios = Socio.objects.filter(
-        membresias__FechaInicio__gte=hace_30_dias
-    ).distinct().count()
-    
-    primer_dia_mes = timezone.make_aware(timezone.datetime(hoy.year, hoy.month, 1))
-    ingresos_mes = Pago.objects.filter(
-        FechaPago__gte=primer_dia_mes
-    ).aggregate(total=Sum('Monto'))['total'] or 0
-    
-    suscripciones_activas = SocioMembresia.objects.filter(Estado='Activa').count()
-    
     return {
-        'total_socios': total_socios,
-        'nuevos_socios': nuevos_socios,
-        'ingresos_mes': ingresos_mes,
-        'suscripciones_activas': suscripciones_activas,
+        'total_socios': hoy.TotalSocios,
+        'nuevos_socios': sumas['nuevos'] or 0,
+        'ingresos_mes': sumas['ingresos'] or 0,
+        'suscripciones_activas': hoy.SuscripcionesActivas,
     }
 
 
 def obtener_estadisticas_pagos_dashboard():
-    
-    socios_con_membresia = Socio.objects.filter(membresias__isnull=False).distinct()
-    
-    activas = 0
-    morosas = 0
-    expiradas = 0
-    
-    for socio in socios_con_membresia:
-        membresia_actual = socio.membresias.order_by('-FechaInicio').first()
-        
-        if membresia_actual:
-            if membresia_actual.Estado == 'Activa':
-                activas += 1
-            elif membresia_actual.Estado == 'Morosa':
-                morosas += 1
-            elif membresia_actual.Estado == 'Expirada':
-                expiradas += 1
-    
+    return _cacheado(CLAVE_ESTADISTICAS_PAGOS, _calcular_estadisticas_pagos_dashboard)
+
+
+def _calcular_estadisticas_pagos_dashboard():
+    # Estado de la membresía más reciente de cada socio, agrupado en una consulta
+    ultima_membresia = SocioMembresia.objects.filter(
+        SocioID=OuterRef('SocioID')
+    ).order_by('-FechaInicio', '-id').values('id')[:1]
+
+    por_estado = dict(
+        SocioMembresia.objects.filter(id=Subquery(ultima_membresia))
+        .order_by()
+        .values_list('Estado')
+        .annotate(n=Count('id'))
+    )
+
+    activas = por_estado.get(SocioMembresia.ESTADO_ACTIVA, 0)
+    morosas = por_estado.get(SocioMembresia.ESTADO_MOROSA, 0)
+    expiradas = por_estado.get(SocioMembresia.ESTADO_EXPIRADA, 0)
+
     total = activas + morosas + expiradas
-    
+
     return {
         'total': total,
         'activas': activas,
@@ -66,54 +112,66 @@ def obtener_estadisticas_pagos_dashboard():
 
 
 def obtener_actividad_plataforma():
+    return _cacheado(CLAVE_ACTIVIDAD, _calcular_actividad_plataforma)
+
+
+def _calcular_actividad_plataforma():
+    # Gráfico por defecto: nuevos socios de los últimos 6 meses
+    return _serie_kpi(6, 'mes', timezone.localdate())
+
+
+# Rangos del gráfico histórico: (días o meses hacia atrás, agrupación)
+RANGOS_KPI = {
+    '30d': (30, 'dia'),
+    '12m': (12, 'mes'),
+    '3y': (36, 'mes'),
+}
+MAX_ETIQUETAS_GRAFICO = 12
+
+
+def obtener_serie_kpi(rango, hoy=None):
+    """
+    Serie histórica de nuevos socios leída de KPISnapshotDiario
+    (ver el comando generar_kpi_diario), por día o por mes según el rango.
+    """
+    cantidad, agrupacion = RANGOS_KPI[rango]
+    serie = _serie_kpi(cantidad, agrupacion, hoy or timezone.localdate())
+    return {'rango': rango, **serie}
+
+
+def _serie_kpi(cantidad, agrupacion, hoy):
+    """Nuevos socios de los últimos ``cantidad`` días o meses."""
+    if agrupacion == 'dia':
+        periodos = [hoy - timedelta(days=i) for i in range(cantidad - 1, -1, -1)]
+        filas = KPISnapshotDiario.objects.filter(
+            Fecha__gte=periodos[0], Fecha__lte=hoy
+        ).values_list('Fecha', 'NuevosSocios')
+        etiquetas = [dia.strftime('%d/%m') for dia in periodos]
+    else:
+        meses_ventana = _ultimos_meses(hoy, cantidad)
+        periodos = [timezone.datetime(año, mes, 1).date() for año, mes in meses_ventana]
+        filas = (
+            KPISnapshotDiario.objects.filter(Fecha__gte=periodos[0], Fecha__lte=hoy)
+            .annotate(mes=TruncMonth('Fecha'))
+            .order_by()
+            .values_list('mes')
+            .annotate(nuevos=Sum('NuevosSocios'))
+        )
+        etiquetas = [
+            NOMBRES_MESES[mes] if cantidad <= 12 else f"{NOMBRES_MESES[mes]} {año % 100:02d}"
+            for año, mes in meses_ventana
+        ]
+
+    por_periodo = dict(filas)
+    datos = [por_periodo.get(periodo, 0) for periodo in periodos]
+
+    # Con muchos puntos solo se rotulan algunos para que quepan en el eje
+    paso = -(-len(etiquetas) // MAX_ETIQUETAS_GRAFICO)
+    meses = [e if i % paso == 0 else '' for i, e in enumerate(etiquetas)]
 
-    hoy = timezone.now()
-    
-    nombres_meses = {
-        1: 'Ene', 2: 'Feb', 3: 'Mar', 4: 'Abr', 
-        5: 'May', 6: 'Jun', 7: 'Jul', 8: 'Ago',
-        9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dic'
-    }
-    
-    datos_mensuales = []
-    
-    for i in range(5, -1, -1): 
-        mes_actual = hoy.month - i
-        año_actual = hoy.year
-        
-        while mes_actual <= 0:
-            mes_actual += 12
-            año_actual -= 1
-        
-        primer_dia = timezone.datetime(año_actual, mes_actual, 1)
-        primer_dia = timezone.make_aware(primer_dia)
-        
-        ultimo_dia_num = calendar.monthrange(año_actual, mes_actual)[1]
-        ultimo_dia = timezone.datetime(año_actual, mes_actual, ultimo_dia_num, 23, 59, 59)
-        ultimo_dia = timezone.make_aware(ultimo_dia)
-
-        count = 0
-        socios = Socio.objects.filter(
-            membresias__FechaInicio__gte=primer_dia,
-            membresias__FechaInicio__lte=ultimo_dia
-        ).distinct()
-        
-        for socio in socios:
-            primera_membresia = socio.membresias.order_by('FechaInicio').first()
-            if primera_membresia and primer_dia.date() <= primera_membresia.FechaInicio <= ultimo_dia.date():
-                count += 1
-        
-        datos_mensuales.append({
-            'nombre': nombres_meses[mes_actual],
-            'count': count
-        })
-    
-    meses = [item['nombre'] for item in datos_mensuales]
-    datos = [item['count'] for item in datos_mensuales]
-    max_valor = max(datos) if datos and max(datos) > 0 else 1
-    
     return {
         'meses': meses,
         'datos': datos,
-        'max_valor': max_valor,
+        'max_valor': max(datos) if datos and max(datos) > 0 else 1,
+        'divisor_x': max(len(datos) - 1, 1),
     }
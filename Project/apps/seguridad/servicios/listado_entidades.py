@@ -0,0 +1,141 @@
+"""
+Listado paginado de socios y usuarios para la gestión de usuarios
+"""
+from django.db import connection
+from django.db.models import CharField, DateField, Exists, F, OuterRef, Q, Subquery, Value
+
+from apps.pagos.models import SocioMembresia
+from apps.seguridad.models import Usuario
+from apps.seguridad.servicios.kpi_snapshot import socios_con_primera_membresia
+from apps.socios.models import Socio
+
+# Filas por página en la gestión de usuarios
+TAMANO_PAGINA_ENTIDADES = 25
+
+TIPO_SOCIO = "Socio"
+TIPO_USUARIO = "Usuario"
+TIPOS_FILTRO = ("todos", "Socio", "Administrativo", "Entrenador")
+
+# Mismas columnas y en el mismo orden en las dos ramas del UNION
+COLUMNAS = ("tipo", "id", "nombre", "email", "rol", "fecha_registro", "estado", "plan")
+ORDEN = ("nombre", "tipo", "id")
+
+
+def _socios(plan_id=None):
+    """
+    Socios con la fecha de registro (inicio de su primera membresía) y el
+    estado y plan de su membresía más reciente, anotados con subconsultas.
+    """
+    ultima = SocioMembresia.objects.filter(SocioID=OuterRef("pk")).order_by(
+        "-FechaInicio", "-id"
+    )
+    socios = socios_con_primera_membresia().annotate(
+        tipo=Value(TIPO_SOCIO, output_field=CharField()),
+        nombre=F("NombreCompleto"),
+        email=F("Email"),
+        rol=F("Rol"),
+        fecha_registro=F("primera"),
+        estado=Subquery(ultima.values("Estado")[:1]),
+        plan=Subquery(ultima.values("PlanID__Nombre")[:1]),
+    )
+    if plan_id:
+        # Socios que han tenido el plan alguna vez, sin JOIN + DISTINCT
+        socios = socios.filter(
+            Exists(SocioMembresia.objects.filter(SocioID=OuterRef("pk"), PlanID=plan_id))
+        )
+    return socios
+
+
+def _usuarios(rol=None):
+    """Usuarios del staff. No guardan fecha de alta, así que va vacía."""
+    usuarios = Usuario.objects.annotate(
+        tipo=Value(TIPO_USUARIO, output_field=CharField()),
+        nombre=F("NombreUsuario"),
+        email=F("Email"),
+        rol=F("RolID__NombreRol"),
+        fecha_registro=Value(None, output_field=DateField()),
+        estado=Value(None, output_field=CharField()),
+        plan=Value(None, output_field=CharField()),
+    )
+    if rol:
+        usuarios = usuarios.filter(RolID__NombreRol=rol)
+    return usuarios
+
+
+def _despues_de(queryset, tipo, posicion):
+    """Filas de ``queryset`` (todas de ``tipo``) posteriores a ``posicion`` en ORDEN."""
+    if posicion is None:
+        return queryset
+    nombre, tipo_cursor, entidad_id = posicion
+    if tipo > tipo_cursor:
+        return queryset.filter(nombre__gte=nombre)
+    if tipo < tipo_cursor:
+        return queryset.filter(nombre__gt=nombre)
+    return queryset.filter(Q(nombre__gt=nombre) | Q(nombre=nombre, id__gt=entidad_id))
+
+
+def _leer_cursor(cursor):
+    """``Tipo_id`` -> (nombre, tipo, id) de esa fila; None si no es válido o ya no existe."""
+    try:
+        tipo, entidad_id = cursor.split("_")
+        entidad_id = int(entidad_id)
+    except (AttributeError, ValueError):
+        return None
+    if tipo == TIPO_SOCIO:
+        nombre = Socio.objects.filter(id=entidad_id).values_list("NombreCompleto", flat=True)
+    elif tipo == TIPO_USUARIO:
+        nombre = Usuario.objects.filter(id=entidad_id).values_list("NombreUsuario", flat=True)
+    else:
+        return None
+    nombre = nombre.first()
+    return (nombre, tipo, entidad_id) if nombre is not None else None
+
+
+def listar_entidades(tipo="todos", plan_id=None, cursor=None, tamano=TAMANO_PAGINA_ENTIDADES):
+    """
+    Página de socios y usuarios ordenada por nombre, filtrada, ordenada y
+    paginada en la base de datos con un UNION de las dos tablas.
+
+    La paginación es por clave (nombre, tipo, id): el cursor es la última
+    fila de la página anterior y cada rama del UNION trae solo las filas
+    posteriores, así que cada página cuesta lo mismo.
+
+    Args:
+        tipo: 'todos', 'Socio', 'Administrativo' o 'Entrenador'
+        plan_id: solo socios que han tenido ese plan; el staff no tiene
+            membresías y se lista igual
+        cursor: ``Tipo_id`` de la última fila de la página anterior
+
+    Returns:
+        dict con 'entidades' (lista de dicts con COLUMNAS), 'total' y
+        'siguiente_cursor' (None en la última página)
+    """
+    if tipo not in TIPOS_FILTRO:
+        tipo = "todos"
+    posicion = _leer_cursor(cursor) if cursor else None
+
+    ramas = []
+    if tipo in ("todos", TIPO_SOCIO):
+        ramas.append((TIPO_SOCIO, _socios(plan_id)))
+    if tipo != TIPO_SOCIO:
+        rol = tipo if tipo != "todos" else None
+        ramas.append((TIPO_USUARIO, _usuarios(rol)))
+
+    if not ramas:
+        return {"entidades": [], "total": 0, "siguiente_cursor": None}
+    total = sum(queryset.count() for _, queryset in ramas)
+
+    paginas = [_despues_de(queryset, rama, posicion).values(*COLUMNAS) for rama, queryset in ramas]
+    if connection.features.supports_slicing_ordering_in_compound:
+        # Cada rama aporta como mucho una página (PostgreSQL); SQLite no
+        # admite LIMIT dentro de un UNION y limita solo el resultado
+        paginas = [pagina.order_by(*ORDEN)[:tamano + 1] for pagina in paginas]
+    consulta = paginas[0].union(*paginas[1:], all=True) if len(paginas) > 1 else paginas[0]
+    entidades = list(consulta.order_by(*ORDEN)[:tamano + 1])
+
+    siguiente = None
+    if len(entidades) > tamano:
+        entidades = entidades[:tamano]
+        ultima = entidades[-1]
+        siguiente = f"{ultima['tipo']}_{ultima['id']}"
+    return {"entidades": entidades, "total": total, "siguiente_cursor": siguiente}
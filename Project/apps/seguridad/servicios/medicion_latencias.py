@@ -0,0 +1,423 @@
+"""
+Benchmark HTTP de extremo a extremo de los recorridos más usados por rol.
+
+Contra un servidor ya levantado (``runserver`` o gunicorn) y una base de datos
+sembrada con ``generar_datos``: cada hilo inicia sesión por ``login_view`` con
+un usuario de cada rol y repite recorridos elegidos por peso, midiendo cada
+petición por separado (las redirecciones no se siguen). El informe en JSON y
+Markdown incluye p50/p95/p99 por paso y por recorrido, y se puede comparar con
+el de otro commit.
+"""
+import json
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.control_acceso.models import DiaRutinaEjercicio, RutinaSemanal
+from apps.pagos.models import PlanMembresia, SocioMembresia
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.servicios.generador_datos import PASSWORD_GENERADO
+
+# Peso de cada recorrido al elegir el siguiente
+PESOS_RECORRIDOS = {"socio": 6, "entrenador": 2, "administrativo": 1}
+
+# Usuarios de staff que crea el benchmark si no existen
+EMAILS_STAFF = {
+    "entrenador": "benchmark.entrenador@datos.test",
+    "administrativo": "benchmark.administrativo@datos.test",
+}
+
+PERCENTILES = (50, 95, 99)
+
+TIMEOUT_SEGUNDOS = 30
+
+# Cambio de p95 a partir del cual la comparación lo marca
+UMBRAL_REGRESION = 0.10
+
+
+class ValidationError(ValueError):
+    pass
+
+
+class _SinRedirecciones(HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class ClienteHTTP:
+    """
+    Navegador mínimo: guarda cookies (sesión y CSRF) y anota la duración y el
+    estado de cada petición en ``mediciones``.
+    """
+
+    def __init__(self, base_url, mediciones, timeout=TIMEOUT_SEGUNDOS):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _SinRedirecciones)
+        self.mediciones = mediciones
+
+    def _csrf(self):
+        for cookie in self.cookies:
+            if cookie.name == "csrftoken":
+                return cookie.value
+        return ""
+
+    def pedir(self, paso, ruta, metodo="GET", datos=None, como_json=False):
+        cabeceras = {}
+        cuerpo = None
+        if metodo == "POST":
+            cabeceras["X-CSRFToken"] = self._csrf()
+            if como_json:
+                cuerpo = json.dumps(datos or {}).encode()
+                cabeceras["Content-Type"] = "application/json"
+            else:
+                cuerpo = urlencode(
+                    {**(datos or {}), "csrfmiddlewaretoken": self._csrf()}
+                ).encode()
+                cabeceras["Content-Type"] = "application/x-www-form-urlencoded"
+        peticion = Request(self.base_url + ruta, data=cuerpo, headers=cabeceras, method=metodo)
+
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(peticion, timeout=self.timeout) as respuesta:
+                respuesta.read()
+                estado = respuesta.status
+        except HTTPError as error:
+            # Las redirecciones llegan como HTTPError porque no se siguen
+            error.read()
+            estado = error.code
+        except OSError:
+            # Conexión rechazada o timeout: cuenta como error con estado 0
+            estado = 0
+        segundos = time.perf_counter() - inicio
+
+        self.mediciones.append((paso, segundos, estado))
+        return estado
+
+    def iniciar_sesion(self, email, password, rol):
+        self.pedir("login_form", reverse("login"))
+        estado = self.pedir(
+            "login",
+            reverse("login"),
+            "POST",
+            {"email": email, "password": password, "role": rol},
+        )
+        if estado != 302:
+            raise ValidationError(f"No se pudo iniciar sesión como {rol} con {email}.")
+
+
+def recorrido_socio(cliente, datos, rng):
+    """Panel -> mi rutina -> iniciar sesión -> marcar un ejercicio -> terminar."""
+    cliente.pedir("socio_panel", reverse("socio_panel"))
+    cliente.pedir("mi_rutina", reverse("mi_rutina"))
+    cliente.pedir("iniciar_sesion", reverse("iniciar_sesion"), "POST")
+    if datos["ejercicios_hoy"]:
+        cliente.pedir(
+            "toggle_ejercicio",
+            reverse("toggle_ejercicio"),
+            "POST",
+            {"ejercicio_id": rng.choice(datos["ejercicios_hoy"])},
+            como_json=True,
+        )
+    cliente.pedir("terminar_sesion", reverse("terminar_sesion"), "POST")
+
+
+def recorrido_entrenador(cliente, datos, rng):
+    """Panel -> clientes -> detalle de una rutina."""
+    cliente.pedir("entrenador_panel", reverse("entrenador_panel"))
+    cliente.pedir("clientes_list", reverse("clientes_list"))
+    cliente.pedir(
+        "rutina_detalle",
+        reverse("rutina_detalle", kwargs={"rutina_id": rng.choice(datos["rutinas"])}),
+    )
+
+
+def recorrido_administrativo(cliente, datos, rng):
+    """Panel -> gestión de pagos -> registrar un pago."""
+    cliente.pedir("panel_admin", reverse("panel_admin"))
+    cliente.pedir("gestion_pagos", reverse("gestion_pagos"))
+    plan = rng.choice(datos["planes"])
+    cliente.pedir(
+        "registrar_pago",
+        reverse("registrar_pago"),
+        "POST",
+        {
+            "socio_id": rng.choice(datos["socios_pago"]),
+            "plan_id": plan["id"],
+            "monto": str(plan["precio"]),
+            "tipo_pago": "Efectivo",
+        },
+    )
+
+
+RECORRIDOS = {
+    "socio": recorrido_socio,
+    "entrenador": recorrido_entrenador,
+    "administrativo": recorrido_administrativo,
+}
+
+
+def preparar_datos(concurrencia, password):
+    """
+    Elige en la base de datos un socio distinto por hilo (con membresía activa
+    y rutina) y los datos de los recorridos. Crea los usuarios de staff del
+    benchmark con ``password`` si no existen.
+    """
+    hoy = timezone.localdate()
+    socios = list(
+        Usuario.objects.filter(
+            RolID__NombreRol__iexact="socio",
+            SocioID__membresias__Estado=SocioMembresia.ESTADO_ACTIVA,
+            SocioID__membresias__FechaFin__gte=hoy,
+            SocioID__rutinas__EsPlantilla=False,
+        )
+        .distinct()
+        .order_by("id")
+        .values("Email", "SocioID")[:concurrencia]
+    )
+    if len(socios) < concurrencia:
+        raise ValidationError(
+            f"Hacen falta {concurrencia} socios con membresía activa y rutina; "
+            f"hay {len(socios)}. Siembra la base con generar_datos."
+        )
+
+    ejercicios_hoy = {}
+    for asignacion_id, socio_id in DiaRutinaEjercicio.objects.filter(
+        RutinaID__SocioID__in=[s["SocioID"] for s in socios],
+        RutinaID__EsPlantilla=False,
+        DiaSemana=hoy.weekday(),
+    ).values_list("id", "RutinaID__SocioID"):
+        ejercicios_hoy.setdefault(socio_id, []).append(asignacion_id)
+
+    for rol, email in EMAILS_STAFF.items():
+        rol_obj, _ = Rol.objects.get_or_create(NombreRol=rol.capitalize())
+        Usuario.objects.update_or_create(
+            Email=email,
+            defaults={
+                "NombreUsuario": email,
+                "PasswordHash": make_password(password),
+                "RolID": rol_obj,
+            },
+        )
+
+    planes = [
+        {"id": plan_id, "precio": precio}
+        for plan_id, precio in PlanMembresia.objects.order_by("id").values_list("id", "Precio")
+    ]
+    rutinas = list(
+        RutinaSemanal.objects.filter(EsPlantilla=False, SocioID__isnull=False)
+        .order_by("id")
+        .values_list("id", flat=True)[:500]
+    )
+    if not planes or not rutinas:
+        raise ValidationError("La base de datos no tiene planes de membresía o rutinas.")
+
+    return {
+        "socios": [
+            {"email": s["Email"], "ejercicios_hoy": ejercicios_hoy.get(s["SocioID"], [])}
+            for s in socios
+        ],
+        "planes": planes,
+        "rutinas": rutinas,
+        "socios_pago": [s["SocioID"] for s in socios],
+    }
+
+
+def _hilo(indice, base_url, datos, password, iteraciones, calentamiento, semilla, timeout):
+    """Un usuario virtual: inicia sesión con cada rol y repite recorridos."""
+    rng = random.Random(f"{semilla}-{indice}")
+    mediciones = []
+    recorridos = []
+
+    clientes = {}
+    for rol in RECORRIDOS:
+        cliente = ClienteHTTP(base_url, mediciones, timeout)
+        email = datos["socios"][indice]["email"] if rol == "socio" else EMAILS_STAFF[rol]
+        cliente.iniciar_sesion(email, password, rol)
+        clientes[rol] = cliente
+    datos_socio = {**datos, **datos["socios"][indice]}
+
+    roles = list(PESOS_RECORRIDOS)
+    pesos = [PESOS_RECORRIDOS[rol] for rol in roles]
+    for iteracion in range(calentamiento + iteraciones):
+        rol = rng.choices(roles, pesos)[0]
+        desde = len(mediciones)
+        inicio = time.perf_counter()
+        RECORRIDOS[rol](clientes[rol], datos_socio, rng)
+        segundos = time.perf_counter() - inicio
+        if iteracion < calentamiento:
+            del mediciones[desde:]
+        else:
+            recorridos.append((rol, segundos))
+
+    return mediciones, recorridos
+
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) con interpolación lineal sobre valores ordenados."""
+    if not valores:
+        return None
+    posicion = (len(valores) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (posicion - inferior)
+
+
+def resumir(duraciones, errores=0):
+    """Estadísticas en milisegundos de una lista de duraciones en segundos."""
+    valores = sorted(segundos * 1000 for segundos in duraciones)
+    resumen = {"n": len(valores), "errores": errores}
+    for p in PERCENTILES:
+        valor = percentil(valores, p)
+        resumen[f"p{p}_ms"] = round(valor, 2) if valor is not None else None
+    resumen["media_ms"] = round(sum(valores) / len(valores), 2) if valores else None
+    resumen["max_ms"] = round(valores[-1], 2) if valores else None
+    return resumen
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar_benchmark(base_url, concurrencia=4, iteraciones=50, calentamiento=2,
+                       semilla=42, password=PASSWORD_GENERADO, timeout=TIMEOUT_SEGUNDOS,
+                       datos=None):
+    """
+    Lanza ``concurrencia`` usuarios virtuales que hacen ``iteraciones``
+    recorridos cada uno (más ``calentamiento`` que no se miden).
+
+    Returns:
+        dict con el informe (ver ``informe_markdown``)
+    """
+    if concurrencia < 1 or iteraciones < 1:
+        raise ValidationError("La concurrencia y las iteraciones deben ser positivas.")
+    datos = datos or preparar_datos(concurrencia, password)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        resultados = list(ejecutor.map(
+            lambda i: _hilo(
+                i, base_url, datos, password, iteraciones, calentamiento, semilla, timeout
+            ),
+            range(concurrencia),
+        ))
+    duracion = time.perf_counter() - inicio
+
+    por_paso, errores_paso, por_recorrido = {}, {}, {}
+    for mediciones, recorridos in resultados:
+        for paso, segundos, estado in mediciones:
+            por_paso.setdefault(paso, []).append(segundos)
+            errores_paso[paso] = errores_paso.get(paso, 0) + (not 200 <= estado < 400)
+        for rol, segundos in recorridos:
+            por_recorrido.setdefault(rol, []).append(segundos)
+
+    peticiones = sum(len(valores) for valores in por_paso.values())
+    return {
+        "fecha": timezone.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "base_url": base_url,
+        "concurrencia": concurrencia,
+        "iteraciones": iteraciones,
+        "semilla": semilla,
+        "duracion_s": round(duracion, 2),
+        "peticiones": peticiones,
+        "errores": sum(errores_paso.values()),
+        "peticiones_por_segundo": round(peticiones / duracion, 2) if duracion else None,
+        "pasos": {
+            paso: resumir(valores, errores_paso[paso])
+            for paso, valores in sorted(por_paso.items())
+        },
+        "recorridos": {
+            rol: resumir(valores) for rol, valores in sorted(por_recorrido.items())
+        },
+    }
+
+
+def comparar(actual, anterior):
+    """
+    Variación de p50/p95/p99 por paso y recorrido respecto a otro informe.
+
+    Returns:
+        lista de dicts (seccion, nombre, pXX_antes, pXX_ahora, cambio_p95, regresion)
+    """
+    filas = []
+    for seccion in ("recorridos", "pasos"):
+        for nombre, ahora in actual[seccion].items():
+            antes = anterior.get(seccion, {}).get(nombre)
+            if not antes:
+                continue
+            fila = {"seccion": seccion, "nombre": nombre}
+            for p in PERCENTILES:
+                fila[f"p{p}_antes"] = antes[f"p{p}_ms"]
+                fila[f"p{p}_ahora"] = ahora[f"p{p}_ms"]
+            if antes["p95_ms"]:
+                fila["cambio_p95"] = round(ahora["p95_ms"] / antes["p95_ms"] - 1, 4)
+            else:
+                fila["cambio_p95"] = None
+            fila["regresion"] = (fila["cambio_p95"] or 0) > UMBRAL_REGRESION
+            filas.append(fila)
+    return filas
+
+
+def _tabla(titulo, filas):
+    lineas = [
+        f"### {titulo}",
+        "",
+        "| Nombre | n | errores | p50 (ms) | p95 (ms) | p99 (ms) | máx (ms) |",
+        "|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    for nombre, r in filas.items():
+        lineas.append(
+            f"| {nombre} | {r['n']} | {r['errores']} | {r['p50_ms']} | "
+            f"{r['p95_ms']} | {r['p99_ms']} | {r['max_ms']} |"
+        )
+    return lineas + [""]
+
+
+def informe_markdown(informe, anterior=None):
+    """Informe legible; si se pasa ``anterior`` añade la comparación de p95."""
+    lineas = [
+        f"## Latencias HTTP ({informe['commit'] or 'sin commit'}, {informe['fecha']})",
+        "",
+        f"- Servidor: {informe['base_url']}",
+        f"- Concurrencia: {informe['concurrencia']}, recorridos por hilo: "
+        f"{informe['iteraciones']}, semilla: {informe['semilla']}",
+        f"- Peticiones: {informe['peticiones']} en {informe['duracion_s']} s "
+        f"({informe['peticiones_por_segundo']} pet/s), errores: {informe['errores']}",
+        "",
+    ]
+    lineas += _tabla("Recorridos", informe["recorridos"])
+    lineas += _tabla("Pasos", informe["pasos"])
+
+    if anterior is not None:
+        lineas += [
+            f"### Comparación con {anterior.get('commit') or 'informe anterior'}",
+            "",
+            "| Nombre | p95 antes | p95 ahora | cambio |",
+            "|---|---:|---:|---:|",
+        ]
+        for fila in comparar(informe, anterior):
+            cambio = "-" if fila["cambio_p95"] is None else f"{fila['cambio_p95']:+.1%}"
+            marca = " ⚠️" if fila["regresion"] else ""
+            lineas.append(
+                f"| {fila['nombre']} | {fila['p95_antes']} | {fila['p95_ahora']} "
+                f"| {cambio}{marca} |"
+            )
+        lineas.append("")
+    return "\n".join(lineas)
@@ -8,20 +8,27 @@ def crear_usuario_para_socio(socio, password_plano):
     rol_socio, _ = Rol.objects.get_or_create(NombreRol="Socio")
 
     try:
-        usuario, creado = Usuario.objects.get_or_create(
-            Email=socio.Email,
-            defaults={
-                "NombreUsuario": socio.Email,  
-                "PasswordHash": make_password(password_plano),
-                "RolID": rol_socio,
-            },
-        )
+        # Primero por el vínculo directo; si no existe, se adopta el usuario
+        # con el mismo email que aún no esté vinculado a ningún socio.
+        usuario = Usuario.objects.filter(SocioID=socio).first()
+        if usuario is None:
+            usuario = Usuario.objects.filter(
+                Email=socio.Email, SocioID__isnull=True
+            ).first()
 
-        if not creado:
-            usuario.PasswordHash = make_password(password_plano)
-            usuario.RolID = rol_socio
-            usuario.save(update_fields=["PasswordHash", "RolID"])
+        if usuario is None:
+            return Usuario.objects.create(
+                NombreUsuario=socio.Email,
+                Email=socio.Email,
+                PasswordHash=make_password(password_plano),
+                RolID=rol_socio,
+                SocioID=socio,
+            )
 
+        usuario.PasswordHash = make_password(password_plano)
+        usuario.RolID = rol_socio
+        usuario.SocioID = socio
+        usuario.save(update_fields=["PasswordHash", "RolID", "SocioID"])
         return usuario
 
     except IntegrityError:
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.pagos.models import Pago, SocioMembresia
+from apps.seguridad.servicios.estadisticas_dashboard import invalidar_cache_dashboard
+from apps.socios.models import Socio
+
+
+@receiver([post_save, post_delete], sender=Pago)
+@receiver([post_save, post_delete], sender=SocioMembresia)
+@receiver([post_save, post_delete], sender=Socio)
+def invalidar_dashboard_admin(sender, **kwargs):
+    """Las estadísticas del panel de administración dependen de estos modelos."""
+    invalidar_cache_dashboard()
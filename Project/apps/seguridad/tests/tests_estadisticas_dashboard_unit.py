@@ -0,0 +1,106 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.pagos.models import Pago, PlanMembresia, SocioMembresia
+from apps.seguridad.models import KPISnapshotDiario
+from apps.seguridad.servicios.estadisticas_dashboard import (
+    obtener_actividad_plataforma,
+    obtener_estadisticas_dashboard,
+    obtener_estadisticas_pagos_dashboard,
+)
+from apps.seguridad.servicios.kpi_snapshot import guardar_snapshot_del_dia, reconstruir_snapshots
+from apps.socios.models import Socio
+
+
+class EstadisticasDashboardTests(TestCase):
+    """
+    Tests de las estadísticas agregadas del panel de administración.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.plan = PlanMembresia.objects.create(Nombre="Mensual", Precio=100, DuracionDias=30)
+        self.hoy = timezone.now().date()
+
+    def _socio(self, n, *membresias):
+        socio = Socio.objects.create(
+            Identificacion=str(n), NombreCompleto=f"Socio {n}", Email=f"s{n}@test.com"
+        )
+        for dias_atras, estado in membresias:
+            inicio = self.hoy - timedelta(days=dias_atras)
+            SocioMembresia.objects.create(
+                SocioID=socio,
+                PlanID=self.plan,
+                FechaInicio=inicio,
+                FechaFin=inicio + timedelta(days=30),
+                Estado=estado,
+            )
+        return socio
+
+    def test_estado_de_la_ultima_membresia_por_socio(self):
+        self._socio(1, (400, "Expirada"), (5, "Activa"))
+        self._socio(2, (5, "Morosa"))
+        self._socio(3, (90, "Activa"), (60, "Expirada"))
+        self._socio(4)
+
+        with self.assertNumQueries(1):
+            datos = obtener_estadisticas_pagos_dashboard()
+
+        self.assertEqual(
+            datos, {"total": 3, "activas": 1, "morosas": 1, "expiradas": 1}
+        )
+
+    def test_actividad_cuenta_socios_por_mes_de_primera_membresia(self):
+        self._socio(1, (0, "Activa"))
+        self._socio(2, (0, "Activa"))
+        # Renovación este mes de un socio antiguo: no es nuevo
+        self._socio(3, (800, "Expirada"), (0, "Activa"))
+        reconstruir_snapshots(self.hoy - timedelta(days=200), self.hoy - timedelta(days=1))
+        guardar_snapshot_del_dia(self.hoy)
+
+        with self.assertNumQueries(1):
+            actividad = obtener_actividad_plataforma()
+
+        self.assertEqual(len(actividad["datos"]), 6)
+        self.assertEqual(actividad["datos"][-1], 2)
+        self.assertEqual(sum(actividad["datos"]), 2)
+
+    def test_tarjetas_leen_los_snapshots(self):
+        socio = self._socio(1, (40, "Expirada"), (5, "Activa"))
+        self._socio(2, (10, "Activa"))
+        Pago.objects.create(SocioMembresiaID=socio.membresias.latest("FechaInicio"), Monto=100)
+        reconstruir_snapshots(self.hoy - timedelta(days=60), self.hoy - timedelta(days=1))
+
+        # Sin snapshot de hoy (generar_kpi_diario aún no corrió) se calcula y guarda
+        datos = obtener_estadisticas_dashboard()
+
+        self.assertTrue(KPISnapshotDiario.objects.filter(Fecha=self.hoy).exists())
+        self.assertEqual(
+            datos,
+            {
+                "total_socios": 2,
+                "nuevos_socios": 1,
+                "ingresos_mes": 100,
+                "suscripciones_activas": 2,
+            },
+        )
+        cache.clear()
+        with self.assertNumQueries(2):
+            obtener_estadisticas_dashboard()
+
+    def test_cache_se_invalida_al_registrar_pagos(self):
+        socio = self._socio(1, (5, "Morosa"))
+        obtener_estadisticas_pagos_dashboard()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(obtener_estadisticas_pagos_dashboard()["morosas"], 1)
+
+        membresia = socio.membresias.get()
+        Pago.objects.create(SocioMembresiaID=membresia, Monto=100)
+        membresia.Estado = SocioMembresia.ESTADO_ACTIVA
+        membresia.save()
+
+        self.assertEqual(obtener_estadisticas_pagos_dashboard()["activas"], 1)
@@ -0,0 +1,127 @@
+from datetime import date
+
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase
+from django.urls import reverse
+
+from apps.pagos.models import PlanMembresia, SocioMembresia
+from apps.seguridad.models import Rol, Usuario
+from apps.seguridad.servicios.listado_entidades import listar_entidades
+from apps.socios.models import Socio
+
+
+class ListadoEntidadesTests(TestCase):
+    """
+    Tests del listado paginado de la gestión de usuarios.
+    """
+
+    def setUp(self):
+        self.admin = Rol.objects.create(NombreRol="Administrativo")
+        self.entrenador = Rol.objects.create(NombreRol="Entrenador")
+        self.mensual = PlanMembresia.objects.create(Nombre="Mensual", Precio=100, DuracionDias=30)
+        self.anual = PlanMembresia.objects.create(Nombre="Anual", Precio=900, DuracionDias=365)
+
+    def _socio(self, nombre, *membresias):
+        socio = Socio.objects.create(
+            Identificacion=str(Socio.objects.count()), NombreCompleto=nombre
+        )
+        for plan, inicio, estado in membresias:
+            SocioMembresia.objects.create(
+                SocioID=socio, PlanID=plan, FechaInicio=inicio, FechaFin=inicio, Estado=estado
+            )
+        return socio
+
+    def _usuario(self, nombre, rol):
+        return Usuario.objects.create(
+            NombreUsuario=nombre, Email=f"{nombre}@test.com",
+            PasswordHash=make_password("clave12345"), RolID=rol,
+        )
+
+    def test_socio_con_registro_y_ultima_membresia(self):
+        self._socio(
+            "Ana",
+            (self.mensual, date(2025, 1, 1), "Expirada"),
+            (self.anual, date(2025, 3, 1), "Activa"),
+        )
+        self._socio("Beto")
+        self._usuario("carla", self.entrenador)
+
+        entidades = listar_entidades()["entidades"]
+
+        self.assertEqual([e["nombre"] for e in entidades], ["Ana", "Beto", "carla"])
+        ana, beto, carla = entidades
+        self.assertEqual(ana["fecha_registro"], date(2025, 1, 1))
+        self.assertEqual((ana["estado"], ana["plan"]), ("Activa", "Anual"))
+        self.assertIsNone(beto["estado"])
+        self.assertEqual((carla["tipo"], carla["rol"]), ("Usuario", "Entrenador"))
+        # El staff no tiene fecha de alta: no se inventa
+        self.assertIsNone(carla["fecha_registro"])
+
+    def test_paginacion_recorre_socios_y_usuarios_sin_repetir(self):
+        # Nombres repetidos entre tablas para ejercitar el desempate por tipo e id
+        for n in range(7):
+            self._socio(f"Persona {n % 4}")
+            self._usuario(f"Persona {n % 3}" if n < 3 else f"usuario{n}", self.admin)
+        esperado = sorted(
+            [(s.NombreCompleto, "Socio", s.id) for s in Socio.objects.all()]
+            + [(u.NombreUsuario, "Usuario", u.id) for u in Usuario.objects.all()]
+        )
+
+        vistos, cursor = [], None
+        while True:
+            pagina = listar_entidades(cursor=cursor, tamano=3)
+            vistos += [(e["nombre"], e["tipo"], e["id"]) for e in pagina["entidades"]]
+            cursor = pagina["siguiente_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(vistos, esperado)
+        self.assertEqual(pagina["total"], 14)
+
+    def test_filtros_por_rol_y_por_plan(self):
+        self._socio("Ana", (self.mensual, date(2025, 1, 1), "Expirada"))
+        self._socio("Beto", (self.anual, date(2025, 1, 1), "Activa"))
+        self._usuario("admin", self.admin)
+        self._usuario("entrenador", self.entrenador)
+
+        def nombres(**filtros):
+            return [e["nombre"] for e in listar_entidades(**filtros)["entidades"]]
+
+        self.assertEqual(nombres(tipo="Entrenador"), ["entrenador"])
+        self.assertEqual(nombres(tipo="Socio"), ["Ana", "Beto"])
+        self.assertEqual(nombres(tipo="Socio", plan_id=self.mensual.id), ["Ana"])
+        # El filtro de plan solo se aplica a los socios: el staff sigue en la lista
+        self.assertEqual(
+            sorted(nombres(plan_id=self.mensual.id)), sorted(["Ana", "admin", "entrenador"])
+        )
+        self.assertEqual(nombres(tipo="Administrativo", plan_id=self.mensual.id), ["admin"])
+        self.assertEqual(len(nombres(tipo="desconocido")), 4)
+
+    def test_cursor_invalido_devuelve_la_primera_pagina(self):
+        self._socio("Ana")
+
+        for cursor in ("basura", "Socio_999", "Otro_1"):
+            self.assertEqual(len(listar_entidades(cursor=cursor)["entidades"]), 1)
+
+    def test_vista_pagina_con_consultas_fijas(self):
+        admin = self._usuario("admin", self.admin)
+        session = self.client.session
+        session["usuario_id"] = admin.id
+        session["usuario_email"] = admin.Email
+        session["usuario_rol"] = "administrativo"
+        session.save()
+        for n in range(30):
+            self._socio(f"Socio {n:02d}", (self.mensual, date(2025, 1, 1), "Activa"))
+
+        with self.assertNumQueries(4):
+            primera = self.client.get(reverse("gestionar_usuarios"), {"tipo": "Socio"})
+        cursor = primera.context["siguiente_cursor"]
+        segunda = self.client.get(
+            reverse("gestionar_usuarios"), {"tipo": "Socio", "cursor": cursor}
+        )
+
+        self.assertEqual(len(primera.context["entidades"]), 25)
+        self.assertEqual(primera.context["total_entidades"], 30)
+        self.assertContains(primera, f"tipo=Socio&amp;cursor={cursor}")
+        self.assertEqual([e["nombre"] for e in segunda.context["entidades"]][0], "Socio 25")
+        self.assertIsNone(segunda.context["siguiente_cursor"])
@@ -0,0 +1,116 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase
+
+from apps.control_acceso.models import SesionEntrenamiento
+from apps.seguridad.servicios.medicion_latencias import (
+    comparar,
+    ejecutar_benchmark,
+    informe_markdown,
+    percentil,
+    preparar_datos,
+    resumir,
+)
+from apps.socios.servicios.generador_datos import PASSWORD_GENERADO, generar_datos
+
+
+def _fila(p95):
+    return {"n": 10, "errores": 0, "p50_ms": 10.0, "p95_ms": p95,
+            "p99_ms": p95, "media_ms": 12.0, "max_ms": p95}
+
+
+def informe(p95_panel, p95_socio):
+    return {
+        "fecha": "2025-06-30T10:00:00+00:00",
+        "commit": "abc1234",
+        "base_url": "http://127.0.0.1:8000",
+        "concurrencia": 2,
+        "iteraciones": 5,
+        "semilla": 42,
+        "duracion_s": 1.0,
+        "peticiones": 20,
+        "errores": 0,
+        "peticiones_por_segundo": 20.0,
+        "pasos": {"socio_panel": _fila(p95_panel)},
+        "recorridos": {"socio": _fila(p95_socio)},
+    }
+
+
+class EstadisticasLatenciaTests(SimpleTestCase):
+    """
+    Tests de los percentiles y la comparación de informes.
+    """
+
+    def test_percentil_interpola(self):
+        valores = [10, 20, 30, 40]
+
+        self.assertEqual(percentil(valores, 0), 10)
+        self.assertEqual(percentil(valores, 50), 25)
+        self.assertEqual(percentil(valores, 100), 40)
+        self.assertIsNone(percentil([], 50))
+
+    def test_resumir_en_milisegundos(self):
+        resumen = resumir([0.1, 0.2, 0.3], errores=1)
+
+        self.assertEqual(resumen["n"], 3)
+        self.assertEqual(resumen["errores"], 1)
+        self.assertEqual(resumen["p50_ms"], 200.0)
+        self.assertEqual(resumen["max_ms"], 300.0)
+
+    def test_comparar_marca_regresiones_de_p95(self):
+        filas = {f["nombre"]: f for f in comparar(informe(150.0, 95.0), informe(100.0, 100.0))}
+
+        self.assertTrue(filas["socio_panel"]["regresion"])
+        self.assertAlmostEqual(filas["socio_panel"]["cambio_p95"], 0.5)
+        self.assertFalse(filas["socio"]["regresion"])
+
+    def test_markdown_incluye_comparacion(self):
+        texto = informe_markdown(informe(150.0, 95.0), informe(100.0, 100.0))
+
+        self.assertIn("| socio_panel | 10 | 0 | 10.0 | 150.0 |", texto)
+        self.assertIn("+50.0% ⚠️", texto)
+
+
+class BenchmarkServidorTests(LiveServerTestCase):
+    """
+    Recorre los journeys contra un servidor real con datos generados.
+    """
+
+    def setUp(self):
+        generar_datos(socios=4, meses=2, semilla=3)
+
+    def test_recorridos_sin_errores(self):
+        resultado = ejecutar_benchmark(
+            self.live_server_url, concurrencia=1, iteraciones=6, calentamiento=1, semilla=1
+        )
+
+        self.assertEqual(resultado["errores"], 0, resultado["pasos"])
+        self.assertEqual(sum(r["n"] for r in resultado["recorridos"].values()), 6)
+        self.assertIn("login", resultado["pasos"])
+        for paso in ("socio_panel", "mi_rutina", "iniciar_sesion", "terminar_sesion"):
+            self.assertIn(paso, resultado["pasos"])
+        # Cada recorrido de socio cierra la sesión que abre
+        self.assertEqual(
+            resultado["pasos"]["terminar_sesion"]["n"], resultado["recorridos"]["socio"]["n"]
+        )
+        email = preparar_datos(1, PASSWORD_GENERADO)["socios"][0]["email"]
+        self.assertFalse(SesionEntrenamiento.objects.filter(
+            FechaFin__isnull=True, SocioMembresiaID__SocioID__usuario__Email=email
+        ).exists())
+
+    def test_comando_escribe_informes(self):
+        with tempfile.TemporaryDirectory() as carpeta:
+            salida = Path(carpeta) / "latencias"
+            call_command(
+                "medir_latencias", "--url", self.live_server_url, "--concurrencia", "1",
+                "--iteraciones", "3", "--seed", "7", "--salida", str(salida), stdout=StringIO(),
+            )
+            datos = json.loads(salida.with_suffix(".json").read_text())
+            self.assertIn("### Pasos", salida.with_suffix(".md").read_text())
+
+        self.assertEqual(datos["iteraciones"], 3)
+        self.assertEqual(datos["errores"], 0)
@@ -0,0 +1,59 @@
+from importlib import import_module
+
+from django.apps import apps as django_apps
+from django.test import TestCase
+
+from apps.seguridad.models import Rol, Usuario
+from apps.seguridad.servicios.registro_usuario import crear_usuario_para_socio
+from apps.socios.models import Socio
+
+vincular_usuarios_con_socios = import_module(
+    "apps.seguridad.migrations.0005_vincular_usuario_socio"
+).vincular_usuarios_con_socios
+
+
+class VinculoUsuarioSocioTests(TestCase):
+    """
+    Tests del vínculo Usuario -> Socio (backfill y registro).
+    """
+
+    def setUp(self):
+        self.rol = Rol.objects.create(NombreRol="Socio")
+
+    def _usuario(self, nombre, email):
+        return Usuario.objects.create(
+            NombreUsuario=nombre, Email=email, PasswordHash="x", RolID=self.rol
+        )
+
+    def test_backfill_vincula_por_email_y_por_identificacion(self):
+        por_email = Socio.objects.create(
+            Identificacion="111", NombreCompleto="A", Email="a@test.com"
+        )
+        por_identificacion = Socio.objects.create(
+            Identificacion="222", NombreCompleto="B", Email="b-socio@test.com"
+        )
+        u1 = self._usuario("a@test.com", "a@test.com")
+        u2 = self._usuario("222", "b-usuario@test.com")
+        u3 = self._usuario("sin-socio", "nadie@test.com")
+
+        vincular_usuarios_con_socios(django_apps, None)
+        # Relanzarlo no cambia nada
+        vincular_usuarios_con_socios(django_apps, None)
+
+        u1.refresh_from_db()
+        u2.refresh_from_db()
+        u3.refresh_from_db()
+        self.assertEqual(u1.SocioID, por_email)
+        self.assertEqual(u2.SocioID, por_identificacion)
+        self.assertIsNone(u3.SocioID)
+
+    def test_crear_usuario_para_socio_adopta_usuario_por_email(self):
+        socio = Socio.objects.create(
+            Identificacion="333", NombreCompleto="C", Email="c@test.com"
+        )
+        existente = self._usuario("c@test.com", "c@test.com")
+
+        usuario = crear_usuario_para_socio(socio, "clave12345")
+
+        self.assertEqual(usuario.pk, existente.pk)
+        self.assertEqual(Usuario.objects.get(SocioID=socio).pk, existente.pk)
@@ -1,12 +1,9 @@
 from django.contrib import messages
-from django.db.models import Prefetch
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
 
-from apps.pagos.models import SocioMembresia
 from apps.seguridad.decoradores import admin_requerido, login_requerido
 from apps.seguridad.models import Rol, Usuario
 from apps.seguridad.servicios.autenticacion import (
@@ -18,6 +15,7 @@ from apps.seguridad.servicios.FormularioSocio_Membresia import (
     SocioMembresiaForm,
     UsuarioForm,
 )
+from apps.seguridad.servicios.listado_entidades import listar_entidades
 from apps.socios.models import Medicion, Socio
 
 
@@ -92,12 +90,19 @@ def panel_admin_view(request):
         obtener_actividad_plataforma,
         obtener_estadisticas_dashboard,
         obtener_estadisticas_pagos_dashboard,
+        obtener_serie_kpi,
+        RANGOS_KPI,
     )
 
     # Obtener todas las estadísticas desde el servicio
     estadisticas = obtener_estadisticas_dashboard()
     estadisticas_pagos = obtener_estadisticas_pagos_dashboard()
-    actividad = obtener_actividad_plataforma()
+    # Con ?rango= el gráfico lee la serie histórica de los snapshots diarios
+    rango = request.GET.get("rango")
+    if rango in RANGOS_KPI:
+        actividad = obtener_serie_kpi(rango)
+    else:
+        actividad = obtener_actividad_plataforma()
 
     # Combinar todos los diccionarios
     context = {**estadisticas, **estadisticas_pagos, **actividad}
@@ -110,91 +115,35 @@ def panel_admin_view(request):
 def gestionar_usuarios_view(request):
     """Gestionar Socios y Usuarios (Administrativos, Entrenadores)"""
     from apps.pagos.models import PlanMembresia
-    from apps.pagos.servicios.pagos_service import actualizar_estados_membresias
-
-    # Actualizar estados de membresías expiradas
-    actualizar_estados_membresias()
 
     # Obtener filtros del request GET
     tipo_selected = request.GET.get("tipo", "todos")
-    plan_id = request.GET.get("plan", "todos")
-
-    # Prefetch memberships ordered by most recent FechaInicio first
-    memb_qs = SocioMembresia.objects.order_by("-FechaInicio")
+    plan_id = request.GET.get("plan_id", "todos")
+    cursor = request.GET.get("cursor")
 
     # Obtener todos los planes disponibles
     planes = PlanMembresia.objects.all().order_by("Nombre")
 
-    # Combinar socios y usuarios en una sola lista con información de tipo
-    entidades = []
-
-    # Agregar socios si el filtro lo permite
-    if tipo_selected == "todos" or tipo_selected == "Socio":
-        # Filtrar socios según el plan seleccionado
-        if plan_id and plan_id != "todos":
-            socios = (
-                Socio.objects.prefetch_related(
-                    Prefetch(
-                        "membresias", queryset=memb_qs, to_attr="membresias_ordered"
-                    )
-                )
-                .filter(membresias__PlanID_id=plan_id)
-                .distinct()
-            )
-        else:
-            socios = Socio.objects.prefetch_related(
-                Prefetch("membresias", queryset=memb_qs, to_attr="membresias_ordered")
-            ).all()
-
-        for socio in socios:
-            # Obtener la fecha de registro (FechaInicio de la membresía más antigua)
-            membresias = getattr(socio, "membresias_ordered", [])
-            fecha_registro = None
-            if membresias:
-                fecha_registro = membresias[-1].FechaInicio
-
-            entidades.append(
-                {
-                    "tipo": "Socio",
-                    "id": socio.id,
-                    "nombre": socio.NombreCompleto,
-                    "email": socio.Email,
-                    "rol": socio.Rol,
-                    "fecha_registro": fecha_registro,
-                    "membresias_ordered": membresias,
-                    "objeto": socio,
-                }
-            )
+    # Socios y usuarios ordenados, filtrados y paginados en la base de datos
+    listado = listar_entidades(
+        tipo=tipo_selected,
+        plan_id=plan_id if plan_id.isdigit() else None,
+        cursor=cursor,
+    )
 
-    # Agregar usuarios si el filtro lo permite
-    if tipo_selected == "todos" or tipo_selected in ["Administrativo", "Entrenador"]:
-        usuarios = Usuario.objects.select_related("RolID").all()
-
-        # Filtrar por tipo específico de usuario
-        if tipo_selected == "Administrativo":
-            usuarios = usuarios.filter(RolID__NombreRol="Administrativo")
-        elif tipo_selected == "Entrenador":
-            usuarios = usuarios.filter(RolID__NombreRol="Entrenador")
-
-        for usuario in usuarios:
-            entidades.append(
-                {
-                    "tipo": "Usuario",
-                    "id": usuario.id,
-                    "nombre": usuario.NombreUsuario,
-                    "email": usuario.Email,
-                    "rol": usuario.RolID.NombreRol if usuario.RolID else "N/A",
-                    "fecha_registro": timezone.now(),
-                    "membresias_ordered": [],
-                    "objeto": usuario,
-                }
-            )
+    # Parámetros de los filtros para los enlaces de paginación
+    filtros = request.GET.copy()
+    filtros.pop("cursor", None)
 
     return render(
         request,
         "Administrador/GestionUsuario.html",
         {
-            "entidades": entidades,
+            "entidades": listado["entidades"],
+            "total_entidades": listado["total"],
+            "siguiente_cursor": listado["siguiente_cursor"],
+            "es_primera_pagina": not cursor,
+            "filtros_query": filtros.urlencode(),
             "planes": planes,
             "plan_id_selected": plan_id,
             "tipo_selected": tipo_selected,
@@ -276,6 +225,7 @@ def crear_socio_view(request):
                 Email=socio.Email,
                 PasswordHash=make_password(password),
                 RolID=rol_socio,
+                SocioID=socio,
             )
 
             messages.success(
@@ -306,8 +256,8 @@ def editar_socio_view(request, socio_id):
             password = socio_form.cleaned_data.get("password")
             if password:
                 try:
-                    # Buscar el usuario por la identificación del socio
-                    usuario = Usuario.objects.get(NombreUsuario=socio.Identificacion)
+                    # Buscar el usuario vinculado al socio
+                    usuario = Usuario.objects.get(SocioID=socio)
                     from django.contrib.auth.hashers import make_password
 
                     usuario.PasswordHash = make_password(password)
@@ -0,0 +1,69 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.socios.servicios.generador_datos import (
+    PASSWORD_GENERADO,
+    TAMANO_LOTE,
+    ValidationError,
+    generar_datos,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera socios sintéticos con historial completo (membresías, pagos, "
+        "asistencias, sesiones, mediciones, rutinas y nutrición) usando "
+        "bulk_create. Con la misma semilla y --hasta el resultado es idéntico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socios", type=int, default=1000, help="Número de socios.")
+        parser.add_argument("--meses", type=int, default=12, help="Meses de historial.")
+        parser.add_argument("--seed", type=int, default=42, help="Semilla del generador.")
+        parser.add_argument(
+            "--hasta",
+            help="Último día del historial (AAAA-MM-DD). Por defecto hoy.",
+        )
+        parser.add_argument(
+            "--tamano-lote",
+            type=int,
+            default=TAMANO_LOTE,
+            help="Socios guardados por transacción.",
+        )
+
+    def handle(self, *args, **options):
+        hasta = None
+        if options["hasta"]:
+            try:
+                hasta = date.fromisoformat(options["hasta"])
+            except ValueError:
+                raise CommandError("--hasta debe tener el formato AAAA-MM-DD.")
+
+        def progreso(generados, total):
+            self.stdout.write(f"  {generados}/{total} socios")
+
+        inicio = time.monotonic()
+        try:
+            conteos = generar_datos(
+                socios=options["socios"],
+                meses=options["meses"],
+                semilla=options["seed"],
+                hasta=hasta,
+                tamano_lote=options["tamano_lote"],
+                progreso=progreso,
+            )
+        except ValidationError as exc:
+            raise CommandError(str(exc))
+        segundos = time.monotonic() - inicio
+
+        for modelo, filas in sorted(conteos.items()):
+            self.stdout.write(f"{modelo}: {filas}")
+        total = sum(conteos.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Filas creadas: {total} en {segundos:.1f} s. "
+                f"Contraseña de los usuarios generados: {PASSWORD_GENERADO}"
+            )
+        )
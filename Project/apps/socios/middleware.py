@@ -0,0 +1,76 @@
+from django.utils.functional import SimpleLazyObject
+
+from apps.pagos.models import SocioMembresia
+from apps.socios.models import Socio
+
+# Clave de sesión con el vínculo Usuario -> Socio ya resuelto
+SESION_IDENTIDAD_SOCIO = "identidad_socio"
+
+
+def _socio_desde_sesion(request, usuario_id):
+    """
+    Usa el id de socio cacheado en la sesión. La consulta valida en el mismo
+    viaje que el Usuario siga vinculado a ese Socio, así que si el vínculo
+    cambia la entrada de la sesión deja de ser válida.
+    """
+    identidad = request.session.get(SESION_IDENTIDAD_SOCIO)
+    if not identidad or identidad.get("usuario_id") != usuario_id:
+        return None
+
+    return Socio.objects.filter(
+        pk=identidad.get("socio_id"), usuario__pk=usuario_id
+    ).first()
+
+
+def obtener_socio_actual(request):
+    """
+    Devuelve el Socio asociado al usuario en sesión (o None).
+
+    El resultado se memoriza en la petición y el vínculo se guarda en la sesión
+    para que las siguientes peticiones solo hagan una búsqueda por clave primaria.
+    """
+    if hasattr(request, "_socio_actual"):
+        return request._socio_actual
+
+    socio = None
+    usuario_id = request.session.get("usuario_id")
+
+    if usuario_id:
+        socio = _socio_desde_sesion(request, usuario_id)
+
+        if socio is None:
+            request.session.pop(SESION_IDENTIDAD_SOCIO, None)
+            socio = Socio.objects.filter(usuario__pk=usuario_id).first()
+            if socio is not None:
+                request.session[SESION_IDENTIDAD_SOCIO] = {
+                    "usuario_id": usuario_id,
+                    "socio_id": socio.id,
+                }
+
+    request._socio_actual = socio
+    return socio
+
+
+def obtener_membresias_actuales(request):
+    """QuerySet (sin evaluar) con las membresías del socio en sesión."""
+    socio = obtener_socio_actual(request)
+    if socio is None:
+        return SocioMembresia.objects.none()
+    return SocioMembresia.objects.filter(SocioID_id=socio.id)
+
+
+class SocioActualMiddleware:
+    """
+    Expone ``request.socio`` y ``request.membresias`` como atributos perezosos:
+    solo se consultan si la vista los usa y como máximo una vez por petición.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.socio = SimpleLazyObject(lambda: obtener_socio_actual(request))
+        request.membresias = SimpleLazyObject(
+            lambda: obtener_membresias_actuales(request)
+        )
+        return self.get_response(request)
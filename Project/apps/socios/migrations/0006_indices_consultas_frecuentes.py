@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('control_acceso', '0007_indices_consultas_frecuentes'),
+        ('socios', '0005_registrocomidadiaria'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='medicion',
+            index=models.Index(fields=['SocioID', '-Fecha'], name='medicion_socio_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registrocomidadiaria',
+            index=models.Index(fields=['SocioID', 'Fecha'], name='regcomida_socio_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('socios', '0006_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='socio',
+            index=models.Index(fields=['NombreCompleto', 'id'], name='socio_nombre_id_idx'),
+        ),
+    ]
@@ -23,6 +23,12 @@ class Socio(models.Model):
         help_text="Altura en metros",
     )
 
+    class Meta:
+        indexes = [
+            # Listado de gestión de usuarios, paginado por (nombre, id)
+            models.Index(fields=["NombreCompleto", "id"], name="socio_nombre_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.NombreCompleto} ({self.Rol})"
 
@@ -38,6 +44,12 @@ class Medicion(models.Model):
     MedidasCorporales = models.TextField(null=True, blank=True)
     IMC = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Última medición de un socio
+            models.Index(fields=["SocioID", "-Fecha"], name="medicion_socio_fecha_idx"),
+        ]
+
 
 class RegistroComidaDiaria(models.Model):
     SocioID = models.ForeignKey(
@@ -57,6 +69,9 @@ class RegistroComidaDiaria(models.Model):
         db_table = "registro_comida_diaria"
         ordering = ["-Fecha", "DiaComidaID"]
         unique_together = [["SocioID", "DiaComidaID", "Fecha"]]
+        indexes = [
+            models.Index(fields=["SocioID", "Fecha"], name="regcomida_socio_fecha_idx"),
+        ]
 
     def __str__(self):
         estado = "✓" if self.Completado else "✗"
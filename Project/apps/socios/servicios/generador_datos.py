@@ -0,0 +1,593 @@
+"""
+Generador de datos sintéticos a escala para reproducir en local problemas de
+rendimiento: socios con usuario, membresías (renovaciones, abandonos y
+morosos), pagos, asistencias, sesiones con ejercicios completados, mediciones,
+rutina, plan nutricional y registro de comidas.
+
+La historia de cada socio sale de su propio ``random.Random`` (semilla +
+número de socio), así que el resultado solo depende de la semilla, del número
+de socios, de los meses y de la fecha final, no del tamaño de lote.
+"""
+import random
+from collections import Counter
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from apps.control_acceso.models import (
+    Alimento,
+    Asistencia,
+    ComidaAlimento,
+    DiaComida,
+    DiaRutinaEjercicio,
+    Ejercicio,
+    EjercicioSesionCompletado,
+    PlanNutricional,
+    RachaEntrenamiento,
+    RutinaSemanal,
+    SesionEntrenamiento,
+)
+from apps.control_acceso.servicios.nutricion_service import parsear_macros
+from apps.control_acceso.servicios.rachas_service import aplicar_dias, fecha_de_sesion
+from apps.pagos.models import Pago, PlanMembresia, SocioMembresia
+from apps.seguridad.models import KPISnapshotDiario, Rol, Usuario
+from apps.seguridad.servicios.estadisticas_dashboard import invalidar_cache_dashboard
+from apps.seguridad.servicios.kpi_snapshot import reconstruir_snapshots
+from apps.socios.models import Medicion, RegistroComidaDiaria, Socio
+
+# Socios que se generan y guardan por transacción
+TAMANO_LOTE = 1000
+
+# Filas por INSERT (Django lo reduce en SQLite si hace falta)
+FILAS_POR_INSERT = 2000
+
+# Contraseña de todos los usuarios generados (se hashea una sola vez)
+PASSWORD_GENERADO = "datos12345"
+
+# (Nombre, precio, duración en días, peso al elegir plan)
+PLANES = [
+    ("Mensual", Decimal("90000"), 30, 70),
+    ("Trimestral", Decimal("240000"), 90, 20),
+    ("Anual", Decimal("850000"), 365, 10),
+]
+
+TIPOS_PAGO = ["Efectivo", "Tarjeta", "Transferencia", "Nequi", "Daviplata"]
+
+EJERCICIOS = [
+    ("Sentadilla", "Piernas"),
+    ("Press de Banca", "Pecho"),
+    ("Peso Muerto", "Espalda"),
+    ("Remo con Barra", "Espalda"),
+    ("Press Militar", "Hombros"),
+    ("Dominadas", "Espalda"),
+    ("Plancha", "Core"),
+    ("Zancadas", "Piernas"),
+    ("Press de Piernas", "Piernas"),
+    ("Curl de Bíceps", "Brazos"),
+    ("Extensión de Tríceps", "Brazos"),
+    ("Burpees", "Full Body"),
+]
+
+# (Nombre, porción base, kcal, macros)
+ALIMENTOS = [
+    ("Avena con frutas", "100 g", 320, "P: 12g, C: 58g, G: 7g"),
+    ("Yogur griego con miel", "150 g", 180, "P: 15g, C: 20g, G: 4g"),
+    ("Pechuga de pollo a la plancha", "150 g", 250, "P: 37g, C: 0g, G: 6g"),
+    ("Arroz integral", "140 g", 220, "P: 5g, C: 45g, G: 2g"),
+    ("Ensalada verde", "100 g", 90, "P: 3g, C: 10g, G: 4g"),
+    ("Batido de proteínas", "250 ml", 200, "P: 30g, C: 12g, G: 3g"),
+    ("Salmón al horno", "160 g", 280, "P: 34g, C: 0g, G: 15g"),
+    ("Quinoa cocida", "130 g", 190, "P: 7g, C: 35g, G: 3g"),
+    ("Mix frutos secos", "40 g", 210, "P: 6g, C: 9g, G: 17g"),
+]
+
+NOMBRES = [
+    "Ana", "Carlos", "Daniela", "Felipe", "Juliana", "Andrés", "Valentina",
+    "Santiago", "Camila", "Mateo", "Laura", "Sebastián", "Mariana", "Diego",
+]
+APELLIDOS = [
+    "García", "Rodríguez", "Martínez", "López", "González", "Hernández",
+    "Pérez", "Sánchez", "Ramírez", "Torres", "Gómez", "Díaz", "Vargas",
+]
+
+# Visitas por semana y probabilidad de cada frecuencia
+FRECUENCIAS = [1, 2, 3, 4, 5]
+PESOS_FRECUENCIA = [15, 25, 30, 20, 10]
+DIAS_POR_FRECUENCIA = {
+    1: [2],
+    2: [1, 3],
+    3: [0, 2, 4],
+    4: [0, 1, 3, 4],
+    5: [0, 1, 2, 3, 4],
+}
+LETRAS_DIA = "LMXJVSD"
+
+COMIDAS = ["Desayuno", "Almuerzo", "Cena"]
+
+# Días hacia atrás desde ``hasta`` en los que hay registro de comidas
+DIAS_REGISTRO_COMIDAS = 60
+
+
+class ValidationError(ValueError):
+    pass
+
+
+def prefijo_identificacion(semilla):
+    """Prefijo común de las identificaciones generadas con una semilla."""
+    return f"S{semilla}-"
+
+
+def _asegurar_catalogo(modelo, filas):
+    """
+    Crea las filas del catálogo que falten (por nombre) y las devuelve en el
+    orden de ``filas``. Si un nombre está repetido se usa el registro más antiguo.
+    """
+    nombres = [fila["Nombre"] for fila in filas]
+    por_nombre = {}
+    for objeto in modelo.objects.filter(Nombre__in=nombres).order_by("id"):
+        por_nombre.setdefault(objeto.Nombre, objeto)
+    for objeto in modelo.objects.bulk_create(
+        modelo(**fila) for fila in filas if fila["Nombre"] not in por_nombre
+    ):
+        por_nombre[objeto.Nombre] = objeto
+    return [por_nombre[nombre] for nombre in nombres]
+
+
+def _preparar_catalogos():
+    """Roles, planes, ejercicios y alimentos que usan los datos generados."""
+    rol_socio, _ = Rol.objects.get_or_create(NombreRol="Socio")
+
+    planes = []
+    for nombre, precio, duracion, peso in PLANES:
+        plan, _ = PlanMembresia.objects.get_or_create(
+            Nombre=nombre, defaults={"Precio": precio, "DuracionDias": duracion}
+        )
+        planes.append((plan, peso))
+
+    ejercicios = _asegurar_catalogo(
+        Ejercicio, [{"Nombre": nombre, "GrupoMuscular": grupo} for nombre, grupo in EJERCICIOS]
+    )
+    alimentos = _asegurar_catalogo(
+        Alimento,
+        [
+            {
+                "Nombre": nombre, "PorcionBase": porcion, "Kcal": kcal, "Macros": macros,
+                **parsear_macros(macros),
+            }
+            for nombre, porcion, kcal, macros in ALIMENTOS
+        ],
+    )
+
+    return {
+        "rol_socio": rol_socio,
+        "planes": planes,
+        "ejercicios": ejercicios,
+        "alimentos": alimentos,
+    }
+
+
+def _momento(dia, rng, tz, desde_hora=6, hasta_hora=20):
+    return datetime.combine(
+        dia, time(rng.randint(desde_hora, hasta_hora), rng.randrange(0, 60, 5)), tzinfo=tz
+    )
+
+
+def _historia_socio(n, semilla, contexto):
+    """
+    Genera en memoria (sin tocar la base de datos) todo el historial de un
+    socio. Las claves ajenas se expresan como índices dentro del propio dict.
+    """
+    rng = random.Random(f"{semilla}-{n}")
+    desde, hasta, tz = contexto["desde"], contexto["hasta"], contexto["tz"]
+
+    nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+    altura = Decimal(rng.randint(150, 195)) / 100
+    historia = {
+        "socio": {
+            "Identificacion": f"{prefijo_identificacion(semilla)}{n:07d}",
+            "NombreCompleto": nombre,
+            "Email": f"socio{n}.s{semilla}@datos.test",
+            "Telefono": f"+57 3{rng.randint(0, 999999999):09d}",
+            "FechaNacimiento": hasta - timedelta(days=rng.randint(16 * 365, 65 * 365)),
+            "Altura": altura,
+        },
+    }
+
+    # Membresías: alta en algún día de la ventana y renovaciones hasta que abandona
+    alta = desde + timedelta(days=rng.randint(0, max((hasta - desde).days - 7, 0)))
+    planes = [plan for plan, _ in contexto["planes"]]
+    pesos = [peso for _, peso in contexto["planes"]]
+    membresias = []
+    inicio = alta
+    while inicio <= hasta:
+        plan = rng.choices(planes, pesos)[0]
+        fin = inicio + timedelta(days=plan.DuracionDias)
+        monto, pendiente = plan.Precio, Decimal("0.00")
+        if fin < hasta:
+            estado = SocioMembresia.ESTADO_EXPIRADA
+        elif rng.random() < 0.1:
+            estado = SocioMembresia.ESTADO_MOROSA
+            monto = (plan.Precio / 2).quantize(Decimal("1"))
+            pendiente = plan.Precio - monto
+        else:
+            estado = SocioMembresia.ESTADO_ACTIVA
+        membresias.append({
+            "plan": plan,
+            "inicio": inicio,
+            "fin": fin,
+            "estado": estado,
+            "pago": {
+                "Monto": monto,
+                "MontoPendiente": pendiente,
+                "TipoPago": rng.choice(TIPOS_PAGO),
+                "FechaPago": _momento(inicio, rng, tz, 7, 19),
+            },
+        })
+        if rng.random() < 0.12:
+            break
+        hueco = 0 if rng.random() < 0.8 else rng.randint(1, 45)
+        inicio = fin + timedelta(days=1 + hueco)
+    historia["membresias"] = membresias
+
+    # Rutina según la frecuencia con la que entrena
+    frecuencia = rng.choices(FRECUENCIAS, PESOS_FRECUENCIA)[0]
+    dias_rutina = DIAS_POR_FRECUENCIA[frecuencia]
+    ejercicios_rutina = []
+    for dia in dias_rutina:
+        for ejercicio in rng.sample(contexto["ejercicios"], 3):
+            ejercicios_rutina.append({
+                "EjercicioID": ejercicio,
+                "DiaSemana": dia,
+                "Series": rng.randint(3, 5),
+                "Repeticiones": rng.choice([6, 8, 10, 12, 15]),
+                "PesoObjetivo": Decimal(rng.randrange(10, 120, 5)),
+            })
+    historia["rutina"] = {
+        "Nombre": f"Rutina {frecuencia} días",
+        "DiasEntrenamiento": "".join(LETRAS_DIA[d] for d in dias_rutina),
+        "ejercicios": ejercicios_rutina,
+    }
+
+    # Visitas: los días de rutina cubiertos por una membresía, con cierta adherencia
+    adherencia = rng.uniform(0.5, 0.95)
+    visitas = []
+    for indice, membresia in enumerate(membresias):
+        lunes = membresia["inicio"] - timedelta(days=membresia["inicio"].weekday())
+        ultimo = min(membresia["fin"], hasta)
+        while lunes <= ultimo:
+            for dia in dias_rutina:
+                fecha = lunes + timedelta(days=dia)
+                if not membresia["inicio"] <= fecha <= ultimo or rng.random() >= adherencia:
+                    continue
+                entrada = _momento(fecha, rng, tz, 5, 20)
+                duracion = rng.randint(40, 100)
+                abierta = fecha == hasta
+                ejercicios_dia = [
+                    i for i, e in enumerate(ejercicios_rutina) if e["DiaSemana"] == fecha.weekday()
+                ]
+                visitas.append({
+                    "membresia": indice,
+                    "entrada": entrada,
+                    "salida": None if abierta else entrada + timedelta(minutes=duracion + 10),
+                    "sesion": rng.random() < 0.9,
+                    "inicio_sesion": entrada + timedelta(minutes=5),
+                    "duracion": None if abierta else duracion,
+                    "completados": [(i, rng.random() < 0.85) for i in ejercicios_dia],
+                })
+            lunes += timedelta(days=7)
+    historia["visitas"] = visitas
+
+    # Una medición al mes desde el alta
+    peso = rng.uniform(55, 105)
+    tendencia = rng.uniform(-0.8, 0.3)
+    mediciones = []
+    fecha = alta
+    while fecha <= hasta:
+        peso_dec = Decimal(f"{peso:.2f}")
+        mediciones.append({
+            "Fecha": fecha,
+            "PesoCorporal": peso_dec,
+            "IMC": (peso_dec / (altura * altura)).quantize(Decimal("0.01")),
+        })
+        peso = max(40.0, peso + tendencia + rng.uniform(-0.5, 0.5))
+        fecha += timedelta(days=30)
+    historia["mediciones"] = mediciones
+
+    # Plan nutricional (no todos los socios tienen) y registro de comidas reciente
+    historia["plan_nutricional"] = None
+    if rng.random() < 0.55:
+        comidas = []
+        for dia in range(7):
+            for tipo in COMIDAS + (["Snack"] if rng.random() < 0.5 else []):
+                comidas.append({
+                    "DiaSemana": dia,
+                    "TipoComida": tipo,
+                    "alimentos": [
+                        (alimento, Decimal(rng.randrange(50, 260, 10)))
+                        for alimento in rng.sample(contexto["alimentos"], 2)
+                    ],
+                })
+        adherencia_comidas = rng.uniform(0.3, 0.9)
+        registros = []
+        fecha = max(alta, hasta - timedelta(days=DIAS_REGISTRO_COMIDAS))
+        while fecha < hasta:
+            for indice, comida in enumerate(comidas):
+                if comida["DiaSemana"] == fecha.weekday() and rng.random() < adherencia_comidas:
+                    registros.append((indice, fecha, _momento(fecha, rng, tz, 7, 21)))
+            fecha += timedelta(days=1)
+        historia["plan_nutricional"] = {
+            "ObjetivoCaloricoDiario": rng.randrange(1600, 3200, 100),
+            "comidas": comidas,
+            "registros": registros,
+        }
+
+    return historia
+
+
+def _crear(modelo, objetos, conteos):
+    creados = modelo.objects.bulk_create(objetos, batch_size=FILAS_POR_INSERT)
+    conteos[modelo.__name__] += len(creados)
+    return creados
+
+
+def _guardar_lote(historias, contexto, conteos):
+    """Inserta un lote de historias en orden de dependencias."""
+    socios = _crear(Socio, [Socio(**h["socio"]) for h in historias], conteos)
+
+    _crear(
+        Usuario,
+        [
+            Usuario(
+                NombreUsuario=socio.Email,
+                Email=socio.Email,
+                PasswordHash=contexto["password_hash"],
+                RolID=contexto["rol_socio"],
+                SocioID=socio,
+            )
+            for socio in socios
+        ],
+        conteos,
+    )
+
+    membresias = _crear(
+        SocioMembresia,
+        [
+            SocioMembresia(
+                SocioID=socio,
+                PlanID=m["plan"],
+                FechaInicio=m["inicio"],
+                FechaFin=m["fin"],
+                Estado=m["estado"],
+            )
+            for socio, h in zip(socios, historias)
+            for m in h["membresias"]
+        ],
+        conteos,
+    )
+    # Membresías de cada socio, en el orden de su historia
+    membresias_por_socio = []
+    posicion = 0
+    for h in historias:
+        membresias_por_socio.append(membresias[posicion:posicion + len(h["membresias"])])
+        posicion += len(h["membresias"])
+
+    _crear(
+        Pago,
+        [
+            Pago(SocioMembresiaID=membresia, **m["pago"])
+            for h, propias in zip(historias, membresias_por_socio)
+            for m, membresia in zip(h["membresias"], propias)
+        ],
+        conteos,
+    )
+
+    rutinas = _crear(
+        RutinaSemanal,
+        [
+            RutinaSemanal(
+                SocioID=socio,
+                Nombre=h["rutina"]["Nombre"],
+                DiasEntrenamiento=h["rutina"]["DiasEntrenamiento"],
+            )
+            for socio, h in zip(socios, historias)
+        ],
+        conteos,
+    )
+    asignaciones = _crear(
+        DiaRutinaEjercicio,
+        [
+            DiaRutinaEjercicio(RutinaID=rutina, **e)
+            for rutina, h in zip(rutinas, historias)
+            for e in h["rutina"]["ejercicios"]
+        ],
+        conteos,
+    )
+    asignaciones_por_socio = []
+    posicion = 0
+    for h in historias:
+        total = len(h["rutina"]["ejercicios"])
+        asignaciones_por_socio.append(asignaciones[posicion:posicion + total])
+        posicion += total
+
+    _crear(
+        Asistencia,
+        [
+            Asistencia(
+                SocioMembresiaID=propias[v["membresia"]],
+                FechaHoraEntrada=v["entrada"],
+                FechaHoraSalida=v["salida"],
+                TerminalAcceso="Torniquete 1",
+            )
+            for h, propias in zip(historias, membresias_por_socio)
+            for v in h["visitas"]
+        ],
+        conteos,
+    )
+
+    visitas_con_sesion = [
+        (indice, v)
+        for indice, h in enumerate(historias)
+        for v in h["visitas"]
+        if v["sesion"]
+    ]
+    sesiones = _crear(
+        SesionEntrenamiento,
+        [
+            SesionEntrenamiento(
+                RutinaID=rutinas[indice],
+                SocioMembresiaID=membresias_por_socio[indice][v["membresia"]],
+                FechaInicio=v["inicio_sesion"],
+                FechaFin=(
+                    v["inicio_sesion"] + timedelta(minutes=v["duracion"])
+                    if v["duracion"] is not None
+                    else None
+                ),
+                DuracionMinutos=v["duracion"],
+                DiaSemana=v["inicio_sesion"].weekday(),
+                TotalEjercicios=len(v["completados"]),
+                EjerciciosCompletados=sum(1 for _, completado in v["completados"] if completado),
+            )
+            for indice, v in visitas_con_sesion
+        ],
+        conteos,
+    )
+    _crear(
+        EjercicioSesionCompletado,
+        [
+            EjercicioSesionCompletado(
+                SesionID=sesion,
+                DiaRutinaEjercicioID=asignaciones_por_socio[indice][asignacion],
+                Completado=completado,
+            )
+            for sesion, (indice, v) in zip(sesiones, visitas_con_sesion)
+            for asignacion, completado in v["completados"]
+        ],
+        conteos,
+    )
+
+    # Rachas ya calculadas para no reconstruirlas en la primera visita al panel
+    dias_por_socio = [set() for _ in historias]
+    for sesion, (indice, _) in zip(sesiones, visitas_con_sesion):
+        if sesion.FechaFin is not None:
+            dias_por_socio[indice].add(fecha_de_sesion(sesion))
+    _crear(
+        RachaEntrenamiento,
+        [
+            aplicar_dias(RachaEntrenamiento(SocioID=socio), dias)
+            for socio, dias in zip(socios, dias_por_socio)
+        ],
+        conteos,
+    )
+
+    _crear(
+        Medicion,
+        [
+            Medicion(SocioID=socio, **m)
+            for socio, h in zip(socios, historias)
+            for m in h["mediciones"]
+        ],
+        conteos,
+    )
+
+    con_plan = [
+        (socio, h["plan_nutricional"])
+        for socio, h in zip(socios, historias)
+        if h["plan_nutricional"]
+    ]
+    planes = _crear(
+        PlanNutricional,
+        [
+            PlanNutricional(
+                SocioID=socio,
+                Nombre="Plan personalizado",
+                ObjetivoCaloricoDiario=plan["ObjetivoCaloricoDiario"],
+            )
+            for socio, plan in con_plan
+        ],
+        conteos,
+    )
+    dias_comida = _crear(
+        DiaComida,
+        [
+            DiaComida(PlanNutricionalID=plan, DiaSemana=c["DiaSemana"], TipoComida=c["TipoComida"])
+            for plan, (_, datos) in zip(planes, con_plan)
+            for c in datos["comidas"]
+        ],
+        conteos,
+    )
+    comidas_por_plan = []
+    posicion = 0
+    for _, datos in con_plan:
+        comidas_por_plan.append(dias_comida[posicion:posicion + len(datos["comidas"])])
+        posicion += len(datos["comidas"])
+
+    _crear(
+        ComidaAlimento,
+        [
+            ComidaAlimento(DiaComidaID=dia_comida, AlimentoID=alimento, Porcion=porcion)
+            for propias, (_, datos) in zip(comidas_por_plan, con_plan)
+            for dia_comida, c in zip(propias, datos["comidas"])
+            for alimento, porcion in c["alimentos"]
+        ],
+        conteos,
+    )
+    _crear(
+        RegistroComidaDiaria,
+        [
+            RegistroComidaDiaria(
+                SocioID=socio,
+                DiaComidaID=propias[indice],
+                Fecha=fecha,
+                Completado=True,
+                HoraCompletado=hora,
+            )
+            for propias, (socio, datos) in zip(comidas_por_plan, con_plan)
+            for indice, fecha, hora in datos["registros"]
+        ],
+        conteos,
+    )
+
+
+def generar_datos(socios, meses, semilla, hasta=None, tamano_lote=TAMANO_LOTE, progreso=None):
+    """
+    Genera ``socios`` socios con ``meses`` meses de historial hasta la fecha
+    ``hasta`` (hoy por defecto). Cada lote va en su propia transacción.
+
+    ``progreso(generados, total)`` se llama tras guardar cada lote.
+
+    Returns:
+        Counter con las filas creadas por modelo
+    """
+    if socios < 1 or meses < 1:
+        raise ValidationError("El número de socios y de meses debe ser positivo.")
+    if Socio.objects.filter(Identificacion__startswith=prefijo_identificacion(semilla)).exists():
+        raise ValidationError(
+            f"Ya existen socios generados con la semilla {semilla}; usa otra semilla."
+        )
+
+    hasta = hasta or timezone.localdate()
+    desde = hasta - timedelta(days=meses * 30)
+    contexto = _preparar_catalogos()
+    contexto.update(
+        desde=desde,
+        hasta=hasta,
+        tz=timezone.get_current_timezone(),
+        password_hash=make_password(PASSWORD_GENERADO),
+    )
+
+    conteos = Counter()
+    for inicio in range(0, socios, tamano_lote):
+        numeros = range(inicio, min(inicio + tamano_lote, socios))
+        historias = [_historia_socio(n, semilla, contexto) for n in numeros]
+        with transaction.atomic():
+            _guardar_lote(historias, contexto, conteos)
+        if progreso:
+            progreso(numeros.stop, socios)
+
+    # Las señales no se disparan con bulk_create
+    conteos[KPISnapshotDiario.__name__] += reconstruir_snapshots(desde, hasta - timedelta(days=1))
+    invalidar_cache_dashboard()
+    return conteos
@@ -0,0 +1,147 @@
+"""
+Historial de comidas del socio: adherencia por semana o por mes y detalle
+por día del periodo que se despliega
+"""
+from datetime import timedelta
+
+from django.db.models import Count
+from django.db.models.functions import ExtractIsoWeekDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from apps.socios.models import RegistroComidaDiaria
+
+OPCIONES_RANGO = [7, 14, 21, 30, 90, 180, 365]
+MAXIMO_DIAS = 365
+# Hasta este rango se muestran todos los días; por encima, solo los del
+# periodo desplegado
+MAXIMO_DIAS_DETALLE = 31
+# Hasta este rango la adherencia se agrupa por semana; por encima, por mes
+MAXIMO_DIAS_SEMANAL = 90
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+def registros_completados(socio, plan, desde, hasta):
+    """
+    Comidas completadas del rango que siguen en el plan y se registraron en
+    su día de la semana (igual que las cuenta el detalle por día).
+    """
+    return RegistroComidaDiaria.objects.filter(
+        SocioID=socio,
+        Completado=True,
+        Fecha__range=(desde, hasta),
+        DiaComidaID__PlanNutricionalID=plan,
+        DiaComidaID__DiaSemana=ExtractIsoWeekDay("Fecha") - 1,
+    )
+
+
+def comidas_esperadas(desde, hasta, por_dia_semana):
+    """Comidas del plan entre ``desde`` y ``hasta`` (incluidos) sin recorrer los días."""
+    semanas, resto = divmod((hasta - desde).days + 1, 7)
+    return semanas * sum(por_dia_semana) + sum(
+        por_dia_semana[(desde.weekday() + i) % 7] for i in range(resto)
+    )
+
+
+def _fin_de_periodo(inicio, periodo):
+    if periodo == "semana":
+        return inicio + timedelta(days=6)
+    siguiente = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return siguiente - timedelta(days=1)
+
+
+def _inicio_de_periodo(fecha, periodo):
+    if periodo == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    return fecha.replace(day=1)
+
+
+def adherencia_por_periodo(socio, plan, por_dia_semana, desde, hasta, periodo="semana"):
+    """
+    Adherencia de cada semana (o mes) del rango, del más reciente al más
+    antiguo, con una consulta agrupada por periodo.
+
+    Args:
+        por_dia_semana: comidas del plan para cada día de la semana (0 = lunes)
+        periodo: 'semana' o 'mes'
+
+    Returns:
+        lista de dicts con 'inicio' y 'fin' (recortados al rango),
+        'completadas', 'esperadas' y 'porcentaje'
+    """
+    truncar = TruncWeek if periodo == "semana" else TruncMonth
+    completadas = dict(
+        registros_completados(socio, plan, desde, hasta)
+        .annotate(periodo=truncar("Fecha"))
+        .values("periodo")
+        .annotate(total=Count("id"))
+        .values_list("periodo", "total")
+    )
+
+    periodos = []
+    inicio = _inicio_de_periodo(hasta, periodo)
+    while True:
+        fin = _fin_de_periodo(inicio, periodo)
+        esperadas = comidas_esperadas(max(inicio, desde), min(fin, hasta), por_dia_semana)
+        hechas = completadas.get(inicio, 0)
+        periodos.append({
+            "inicio": max(inicio, desde),
+            "fin": min(fin, hasta),
+            "clave": inicio.isoformat(),
+            "completadas": hechas,
+            "esperadas": esperadas,
+            "porcentaje": round(100 * hechas / esperadas) if esperadas else 0,
+        })
+        if inicio <= desde:
+            return periodos
+        inicio = _inicio_de_periodo(inicio - timedelta(days=1), periodo)
+
+
+def detalle_por_dia(socio, plan, dias_documento, desde, hasta):
+    """
+    Días del rango con alguna comida completada, del más reciente al más
+    antiguo, con el estado de cada comida del plan. Una consulta.
+    """
+    comidas_por_dia = {}
+    for dia in dias_documento:
+        comidas_por_dia[dia["indice"]] = [
+            {
+                "id": comida["id"],
+                "nombre": comida["tipo"],
+                "alimentos_texto": ", ".join(a["nombre"] for a in comida["alimentos"])
+                or "Sin alimentos configurados",
+            }
+            for comida in dia["comidas"]
+        ]
+
+    registros = {
+        (registro.Fecha, registro.DiaComidaID_id): registro
+        for registro in registros_completados(socio, plan, desde, hasta).only(
+            "Fecha", "DiaComidaID", "Completado", "HoraCompletado"
+        )
+    }
+    fechas = sorted({fecha for fecha, _ in registros}, reverse=True)
+
+    historial_dias = []
+    for fecha in fechas:
+        comidas = comidas_por_dia.get(fecha.weekday(), [])
+        comidas_render = []
+        for comida in comidas:
+            registro = registros.get((fecha, comida["id"]))
+            comidas_render.append({
+                "nombre": comida["nombre"],
+                "completado": registro is not None,
+                "hora": timezone.localtime(registro.HoraCompletado).strftime("%H:%M")
+                if registro and registro.HoraCompletado
+                else "",
+                "alimentos_texto": comida["alimentos_texto"],
+            })
+        historial_dias.append({
+            "fecha": fecha,
+            "fecha_display": fecha.strftime("%d %b %Y"),
+            "dia_semana": DIAS_SEMANA[fecha.weekday()],
+            "total": len(comidas),
+            "completadas": sum(1 for comida in comidas_render if comida["completado"]),
+            "comidas": comidas_render,
+        })
+    return historial_dias
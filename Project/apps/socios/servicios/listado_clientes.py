@@ -0,0 +1,79 @@
+"""
+Listado de clientes (socios) para entrenadores y administrativos
+"""
+from django.db.models import Exists, OuterRef, Q, Subquery
+
+from apps.control_acceso.models import RutinaSemanal, SesionEntrenamiento
+from apps.socios.models import Medicion, Socio
+
+# Tarjetas por página (la grilla es de 3 columnas)
+TAMANO_PAGINA_CLIENTES = 24
+
+
+def clientes_anotados(busqueda=None):
+    """
+    Socios ordenables por nombre con lo que muestra la tarjeta de cada uno,
+    anotado con subconsultas para no hacer consultas por socio:
+    ``peso`` y ``fecha_medicion`` (última medición con peso),
+    ``tiene_rutina`` y ``ultima_sesion`` (inicio de la última sesión).
+    """
+    ultima_medicion = Medicion.objects.filter(
+        SocioID=OuterRef("pk"), PesoCorporal__isnull=False
+    ).order_by("-Fecha", "-id")
+    ultima_sesion = SesionEntrenamiento.objects.filter(
+        SocioMembresiaID__SocioID=OuterRef("pk")
+    ).order_by("-FechaInicio")
+
+    clientes = Socio.objects.annotate(
+        peso=Subquery(ultima_medicion.values("PesoCorporal")[:1]),
+        fecha_medicion=Subquery(ultima_medicion.values("Fecha")[:1]),
+        tiene_rutina=Exists(RutinaSemanal.objects.filter(SocioID=OuterRef("pk"))),
+        ultima_sesion=Subquery(ultima_sesion.values("FechaInicio")[:1]),
+    )
+    if busqueda:
+        clientes = clientes.filter(
+            Q(NombreCompleto__icontains=busqueda)
+            | Q(Identificacion__icontains=busqueda)
+            | Q(Email__icontains=busqueda)
+        )
+    return clientes
+
+
+def calcular_imc(peso, altura):
+    """IMC redondeado a un decimal; None si falta el peso o la altura."""
+    if peso is None or not altura or altura <= 0:
+        return None
+    return round(float(peso) / (float(altura) ** 2), 1)
+
+
+def listar_clientes(busqueda=None, cursor=None, tamano=TAMANO_PAGINA_CLIENTES):
+    """
+    Página de clientes ordenada por (NombreCompleto, id), paginada por clave:
+    el cursor es el id del último socio de la página anterior. El número de
+    consultas no depende de cuántos socios haya.
+
+    Returns:
+        dict con 'clientes' (socios anotados, con ``imc``), 'total' y
+        'siguiente_cursor' (None en la última página)
+    """
+    clientes = clientes_anotados(busqueda)
+    total = clientes.count()
+
+    posicion = None
+    if cursor and str(cursor).isdigit():
+        posicion = Socio.objects.filter(id=cursor).values_list("NombreCompleto", "id").first()
+    if posicion:
+        nombre, socio_id = posicion
+        clientes = clientes.filter(
+            Q(NombreCompleto__gt=nombre) | Q(NombreCompleto=nombre, id__gt=socio_id)
+        )
+
+    pagina = list(clientes.order_by("NombreCompleto", "id")[:tamano + 1])
+    siguiente = None
+    if len(pagina) > tamano:
+        pagina = pagina[:tamano]
+        siguiente = pagina[-1].id
+
+    for socio in pagina:
+        socio.imc = calcular_imc(socio.peso, socio.Altura)
+    return {"clientes": pagina, "total": total, "siguiente_cursor": siguiente}
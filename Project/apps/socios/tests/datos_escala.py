@@ -0,0 +1,171 @@
+"""
+Datos de prueba a escala para los tests de presupuesto de consultas: cada
+socio tiene usuario, membresía, pago, sesiones, medición, rutina y plan
+nutricional, creados con bulk_create.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from apps.control_acceso.models import (
+    Alimento,
+    Asistencia,
+    ComidaAlimento,
+    DiaComida,
+    DiaRutinaEjercicio,
+    Ejercicio,
+    PlanNutricional,
+    RutinaSemanal,
+    SesionEntrenamiento,
+)
+from apps.pagos.models import Pago, PlanMembresia, SocioMembresia
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.models import Medicion, RegistroComidaDiaria, Socio
+
+PASSWORD = "clave12345"
+
+
+def crear_base():
+    """Roles, usuarios de staff, plan de membresía, catálogo y plantillas."""
+    password_hash = make_password(PASSWORD)
+    roles = {
+        nombre: Rol.objects.create(NombreRol=nombre)
+        for nombre in ("Socio", "Entrenador", "Administrativo")
+    }
+    usuarios = {
+        nombre: Usuario.objects.create(
+            NombreUsuario=nombre.lower(),
+            Email=f"{nombre.lower()}@escala.test",
+            PasswordHash=password_hash,
+            RolID=rol,
+        )
+        for nombre, rol in roles.items()
+        if nombre != "Socio"
+    }
+    plan = PlanMembresia.objects.create(Nombre="Mensual", Precio=Decimal("100"), DuracionDias=30)
+    ejercicios = Ejercicio.objects.bulk_create(
+        Ejercicio(Nombre=f"Ejercicio {n}", GrupoMuscular="Pierna") for n in range(5)
+    )
+    alimentos = Alimento.objects.bulk_create(
+        Alimento(Nombre=f"Alimento {n}", Kcal=100 + n, PorcionBase="100 g") for n in range(5)
+    )
+    plantilla_rutina = RutinaSemanal.objects.create(
+        Nombre="Plantilla", DiasEntrenamiento="LMV", EsPlantilla=True
+    )
+    DiaRutinaEjercicio.objects.bulk_create(
+        DiaRutinaEjercicio(RutinaID=plantilla_rutina, EjercicioID=e, DiaSemana=0, Series=3)
+        for e in ejercicios
+    )
+    plantilla_nutricion = PlanNutricional.objects.create(Nombre="Plantilla", EsPlantilla=True)
+    dia = DiaComida.objects.create(
+        PlanNutricionalID=plantilla_nutricion, DiaSemana=0, TipoComida="Desayuno"
+    )
+    ComidaAlimento.objects.create(DiaComidaID=dia, AlimentoID=alimentos[0], Porcion=Decimal("100"))
+
+    return {
+        "roles": roles,
+        "usuarios": usuarios,
+        "plan": plan,
+        "ejercicios": ejercicios,
+        "alimentos": alimentos,
+        "plantilla_rutina": plantilla_rutina,
+        "plantilla_nutricion": plantilla_nutricion,
+    }
+
+
+def sembrar_socios(base, cantidad, desde=0):
+    """Crea ``cantidad`` socios con todo su historial; devuelve la lista."""
+    hoy = timezone.localdate()
+    ahora = timezone.now()
+    numeros = range(desde, desde + cantidad)
+    password_hash = base["usuarios"]["Administrativo"].PasswordHash
+
+    socios = Socio.objects.bulk_create(
+        Socio(
+            Identificacion=f"ES{n:06d}",
+            NombreCompleto=f"Socio Escala {n}",
+            Email=f"socio{n}@escala.test",
+            Altura=Decimal("1.70"),
+        )
+        for n in numeros
+    )
+    Usuario.objects.bulk_create(
+        Usuario(
+            NombreUsuario=socio.Identificacion,
+            Email=socio.Email,
+            PasswordHash=password_hash,
+            RolID=base["roles"]["Socio"],
+            SocioID=socio,
+        )
+        for socio in socios
+    )
+    membresias = SocioMembresia.objects.bulk_create(
+        SocioMembresia(
+            SocioID=socio,
+            PlanID=base["plan"],
+            FechaInicio=hoy - timedelta(days=n % 20),
+            FechaFin=hoy + timedelta(days=30 - n % 20),
+            Estado=SocioMembresia.ESTADO_MOROSA if n % 7 == 0 else SocioMembresia.ESTADO_ACTIVA,
+        )
+        for n, socio in zip(numeros, socios)
+    )
+    Pago.objects.bulk_create(
+        Pago(SocioMembresiaID=m, Monto=Decimal("100"), FechaPago=ahora - timedelta(days=1))
+        for m in membresias
+    )
+    rutinas = RutinaSemanal.objects.bulk_create(
+        RutinaSemanal(
+            SocioID=socio, Nombre=f"Rutina {socio.Identificacion}", DiasEntrenamiento="LMV"
+        )
+        for socio in socios
+    )
+    DiaRutinaEjercicio.objects.bulk_create(
+        DiaRutinaEjercicio(
+            RutinaID=rutina, EjercicioID=ejercicio, DiaSemana=dia, Series=3, Repeticiones=10
+        )
+        for rutina in rutinas
+        for dia in (0, 2, 4)
+        for ejercicio in base["ejercicios"][:2]
+    )
+    SesionEntrenamiento.objects.bulk_create(
+        SesionEntrenamiento(
+            RutinaID=rutina,
+            SocioMembresiaID=membresia,
+            FechaInicio=ahora - timedelta(days=d),
+            FechaFin=ahora - timedelta(days=d) + timedelta(hours=1),
+            DuracionMinutos=60,
+            DiaSemana=(ahora - timedelta(days=d)).weekday(),
+        )
+        for rutina, membresia in zip(rutinas, membresias)
+        for d in (1, 2)
+    )
+    Asistencia.objects.bulk_create(
+        Asistencia(SocioMembresiaID=m, FechaHoraEntrada=ahora - timedelta(days=1))
+        for m in membresias
+    )
+    Medicion.objects.bulk_create(
+        Medicion(SocioID=socio, Fecha=hoy - timedelta(days=7 * s), PesoCorporal=Decimal("70"))
+        for socio in socios
+        for s in range(2)
+    )
+    planes = PlanNutricional.objects.bulk_create(
+        PlanNutricional(SocioID=socio, Nombre="Plan", ObjetivoCaloricoDiario=2000)
+        for socio in socios
+    )
+    dias = DiaComida.objects.bulk_create(
+        DiaComida(PlanNutricionalID=plan, DiaSemana=hoy.weekday(), TipoComida="Almuerzo")
+        for plan in planes
+    )
+    ComidaAlimento.objects.bulk_create(
+        ComidaAlimento(DiaComidaID=dia, AlimentoID=base["alimentos"][1], Porcion=Decimal("150"))
+        for dia in dias
+    )
+    RegistroComidaDiaria.objects.bulk_create(
+        RegistroComidaDiaria(
+            SocioID=socio, DiaComidaID=dia, Fecha=hoy - timedelta(days=1), Completado=True
+        )
+        for socio, dia in zip(socios, dias)
+    )
+    return socios
@@ -0,0 +1,95 @@
+"""
+Presupuesto de consultas SQL por ruta con nombre (ver test_presupuesto_consultas).
+
+Cada ruta se pide como ``rol`` con 50 y con 500 socios. El número de consultas
+no puede superar ``maximo`` y tiene que ser el mismo con ambos tamaños. Las
+rutas con ``crece=True`` son N+1 conocidos: para ellas se exige que sigan
+creciendo, así que al corregirlas hay que actualizar esta tabla.
+
+Si una ruta nueva o un cambio sube el número de consultas, el cambio de esta
+tabla queda a la vista en la revisión.
+"""
+from collections import namedtuple
+
+Presupuesto = namedtuple("Presupuesto", ["rol", "metodo", "maximo", "crece"], defaults=[False])
+
+SOCIO = "socio"
+ENTRENADOR = "entrenador"
+ADMIN = "administrativo"
+
+# Medido con SQLite en los tests; al corregir un N+1 se baja ``maximo`` y se
+# quita ``crece``.
+PRESUPUESTO_CONSULTAS = {
+    # Acceso
+    "login": Presupuesto(None, "GET", 0),
+    "logout": Presupuesto(SOCIO, "GET", 5),
+    # Socio
+    "socio_panel": Presupuesto(SOCIO, "GET", 22),
+    "mi_rutina": Presupuesto(SOCIO, "GET", 15),
+    # Los días con ejercicios se suma un insert en bloque (antes, un insert por ejercicio)
+    "iniciar_sesion": Presupuesto(SOCIO, "POST", 11),
+    # Con sesión activa y todo completado: cierre, racha y CompletionTracking
+    "terminar_sesion": Presupuesto(SOCIO, "POST", 22),
+    # Con sesión activa: el clic son dos UPDATE ... RETURNING (uno en PostgreSQL)
+    "toggle_ejercicio": Presupuesto(SOCIO, "POST", 8),
+    "detalle_sesion": Presupuesto(SOCIO, "GET", 8),
+    "historial_sesiones": Presupuesto(SOCIO, "GET", 6),
+    "mi_nutricion": Presupuesto(SOCIO, "GET", 9),
+    "toggle_comida": Presupuesto(SOCIO, "POST", 11),
+    "historial_comidas": Presupuesto(SOCIO, "GET", 8),
+    "mi_perfil": Presupuesto(SOCIO, "GET", 8),
+    # Administrativo
+    # Tarjetas y gráfico leídos de KPISnapshotDiario
+    "panel_admin": Presupuesto(ADMIN, "GET", 7),
+    "gestionar_usuarios": Presupuesto(ADMIN, "GET", 5),
+    "registrar_entrada": Presupuesto(ADMIN, "POST", 6),
+    "ingerir_eventos_acceso": Presupuesto(ADMIN, "POST", 9),
+    "gestion_pagos": Presupuesto(ADMIN, "GET", 8),
+    "buscar_socios_pago": Presupuesto(ADMIN, "GET", 3),
+    "registrar_pago": Presupuesto(ADMIN, "POST", 8),
+    "crear_plan_membresia": Presupuesto(ADMIN, "GET", 1),
+    "eliminar_plan_membresia": Presupuesto(ADMIN, "POST", 6),
+    "editar_plan_membresia": Presupuesto(ADMIN, "GET", 2),
+    "admin_clientes": Presupuesto(ADMIN, "GET", 3),
+    "agregar_usuario": Presupuesto(ADMIN, "GET", 1),
+    "crear_usuario": Presupuesto(ADMIN, "GET", 2),
+    "crear_socio": Presupuesto(ADMIN, "GET", 1),
+    "crear_membresia": Presupuesto(ADMIN, "GET", 5),
+    "editar_socio": Presupuesto(ADMIN, "GET", 3),
+    "editar_usuario": Presupuesto(ADMIN, "GET", 4),
+    "eliminar_entidad": Presupuesto(ADMIN, "POST", 6),
+    # El borrado en cascada también recorre los eventos de acceso de las membresías
+    "eliminar_socio": Presupuesto(ADMIN, "POST", 35),
+    # Entrenador
+    "clientes_list": Presupuesto(ENTRENADOR, "GET", 3),
+    "entrenador_panel": Presupuesto(ENTRENADOR, "GET", 8),
+    "entrenador_nutricion": Presupuesto(ENTRENADOR, "GET", 7),
+    "entrenador_plan_nutricion": Presupuesto(ENTRENADOR, "GET", 4),
+    "entrenador_plantilla_nutricion": Presupuesto(ENTRENADOR, "GET", 3),
+    "entrenador_crear_plantilla": Presupuesto(ENTRENADOR, "POST", 2),
+    "entrenador_aplicar_plantilla_grupo": Presupuesto(ENTRENADOR, "POST", 18),
+    "entrenador_crear_plan_socio": Presupuesto(ENTRENADOR, "GET", 3),
+    "entrenador_nutricion_actualizar_plan": Presupuesto(ENTRENADOR, "POST", 3),
+    "entrenador_nutricion_agregar_comida": Presupuesto(ENTRENADOR, "POST", 4),
+    "entrenador_nutricion_eliminar_comida": Presupuesto(ENTRENADOR, "POST", 7),
+    "entrenador_nutricion_agregar_alimento": Presupuesto(ENTRENADOR, "POST", 6),
+    "entrenador_nutricion_crear_alimento": Presupuesto(ENTRENADOR, "POST", 3),
+    "entrenador_nutricion_actualizar_alimento": Presupuesto(ENTRENADOR, "POST", 6),
+    "entrenador_nutricion_eliminar_alimento": Presupuesto(ENTRENADOR, "POST", 6),
+    "crear_rutina_entrenador": Presupuesto(ENTRENADOR, "GET", 3),
+    "rutinas_list": Presupuesto(ENTRENADOR, "GET", 4),
+    "rutinas_banco": Presupuesto(ENTRENADOR, "GET", 3),
+    "rutina_detalle": Presupuesto(ENTRENADOR, "GET", 4),
+    "entrenador_editar_socio": Presupuesto(ENTRENADOR, "GET", 2),
+    "entrenador_ver_rutina": Presupuesto(ENTRENADOR, "GET", 3),
+    "editar_rutina_entrenador": Presupuesto(ENTRENADOR, "GET", 7),
+    "ajax_agregar_ejercicio": Presupuesto(ENTRENADOR, "POST", 6),
+    "ajax_eliminar_ejercicio": Presupuesto(ENTRENADOR, "POST", 5),
+    "ajax_limpiar_dia": Presupuesto(ENTRENADOR, "POST", 5),
+    "ajax_asignar_rutina": Presupuesto(ENTRENADOR, "POST", 4),
+    "ajax_asignar_rutina_grupo": Presupuesto(ENTRENADOR, "POST", 8),
+    "ajax_ejercicios_dia": Presupuesto(ENTRENADOR, "GET", 2),
+    "ajax_crear_ejercicio": Presupuesto(ENTRENADOR, "POST", 2),
+    "ajax_actualizar_ejercicio": Presupuesto(ENTRENADOR, "POST", 3),
+    "borrar_rutina": Presupuesto(ENTRENADOR, "POST", 11),
+}
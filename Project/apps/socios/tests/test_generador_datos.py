@@ -0,0 +1,110 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from apps.control_acceso.models import (
+    Asistencia,
+    EjercicioSesionCompletado,
+    RachaEntrenamiento,
+    SesionEntrenamiento,
+)
+from apps.pagos.models import Pago, SocioMembresia
+from apps.seguridad.models import Usuario
+from apps.socios.models import Medicion, RegistroComidaDiaria, Socio
+from apps.socios.servicios.generador_datos import (
+    ValidationError,
+    generar_datos,
+    prefijo_identificacion,
+)
+
+HASTA = date(2025, 6, 30)
+
+
+def huella():
+    """Resumen comparable de todo lo generado."""
+    return (
+        list(Socio.objects.order_by("Identificacion").values_list(
+            "Identificacion", "NombreCompleto", "Telefono", "FechaNacimiento", "Altura"
+        )),
+        list(SocioMembresia.objects.order_by("SocioID__Identificacion", "FechaInicio").values_list(
+            "SocioID__Identificacion", "PlanID__Nombre", "FechaInicio", "FechaFin", "Estado"
+        )),
+        list(Pago.objects.order_by("FechaPago", "Monto").values_list(
+            "Monto", "TipoPago", "FechaPago"
+        )),
+        list(SesionEntrenamiento.objects.order_by("FechaInicio").values_list(
+            "SocioMembresiaID__SocioID__Identificacion", "FechaInicio", "FechaFin"
+        )),
+        RegistroComidaDiaria.objects.count(),
+        EjercicioSesionCompletado.objects.filter(Completado=True).count(),
+    )
+
+
+class GeneradorDatosTest(TestCase):
+    def test_cuenta_las_filas_creadas_por_modelo(self):
+        conteos = generar_datos(socios=12, meses=4, semilla=1, hasta=HASTA)
+
+        self.assertEqual(conteos["Socio"], 12)
+        self.assertEqual(conteos["Usuario"], Usuario.objects.filter(SocioID__isnull=False).count())
+        self.assertEqual(conteos["RachaEntrenamiento"], RachaEntrenamiento.objects.count())
+        for modelo in (SocioMembresia, Pago, Asistencia, SesionEntrenamiento, Medicion):
+            self.assertEqual(conteos[modelo.__name__], modelo.objects.count(), modelo.__name__)
+        self.assertGreater(conteos["Asistencia"], conteos["Socio"])
+        self.assertEqual(conteos["Pago"], conteos["SocioMembresia"])
+
+    def test_historial_coherente(self):
+        generar_datos(socios=12, meses=4, semilla=1, hasta=HASTA)
+
+        # Las membresías ya vencidas están expiradas y ninguna empieza después de hasta
+        self.assertFalse(
+            SocioMembresia.objects.filter(FechaFin__lt=HASTA)
+            .exclude(Estado=SocioMembresia.ESTADO_EXPIRADA)
+            .exists()
+        )
+        self.assertFalse(SocioMembresia.objects.filter(FechaInicio__gt=HASTA).exists())
+        # Solo quedan abiertas las sesiones del último día
+        abiertas = SesionEntrenamiento.objects.filter(FechaFin__isnull=True)
+        self.assertFalse(abiertas.exclude(FechaInicio__date=HASTA).exists())
+
+    def test_misma_semilla_mismos_datos_con_cualquier_tamano_de_lote(self):
+        generar_datos(socios=9, meses=3, semilla=5, hasta=HASTA, tamano_lote=2)
+        primera = huella()
+
+        Usuario.objects.filter(SocioID__isnull=False).delete()
+        Socio.objects.all().delete()
+        generar_datos(socios=9, meses=3, semilla=5, hasta=HASTA, tamano_lote=50)
+
+        self.assertEqual(huella(), primera)
+
+    def test_otra_semilla_da_otros_datos(self):
+        generar_datos(socios=5, meses=3, semilla=5, hasta=HASTA)
+        primera = huella()
+        Usuario.objects.filter(SocioID__isnull=False).delete()
+        Socio.objects.all().delete()
+
+        generar_datos(socios=5, meses=3, semilla=6, hasta=HASTA)
+
+        self.assertNotEqual(huella()[1:], primera[1:])
+
+    def test_no_repite_una_semilla_ya_generada(self):
+        generar_datos(socios=2, meses=1, semilla=3, hasta=HASTA)
+
+        with self.assertRaises(ValidationError):
+            generar_datos(socios=2, meses=1, semilla=3, hasta=HASTA)
+
+    def test_comando(self):
+        salida = StringIO()
+
+        call_command(
+            "generar_datos", "--socios", "3", "--meses", "2", "--seed", "11",
+            "--hasta", "2025-06-30", stdout=salida,
+        )
+
+        self.assertIn("Socio: 3", salida.getvalue())
+        self.assertEqual(
+            Socio.objects.filter(Identificacion__startswith=prefijo_identificacion(11)).count(), 3
+        )
+        with self.assertRaises(CommandError):
+            call_command("generar_datos", "--hasta", "30/06/2025", stdout=StringIO())
@@ -0,0 +1,145 @@
+from datetime import date, timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.control_acceso.models import DiaComida, PlanNutricional
+from apps.seguridad.servicios.registro_usuario import crear_usuario_para_socio
+from apps.socios.models import RegistroComidaDiaria, Socio
+from apps.socios.servicios.historial_comidas import (
+    adherencia_por_periodo,
+    comidas_esperadas,
+    detalle_por_dia,
+)
+
+
+class HistorialComidasTest(TestCase):
+    def setUp(self):
+        self.socio = Socio.objects.create(
+            Identificacion="1", NombreCompleto="Socio Historial", Email="historial@test.com"
+        )
+        self.plan = PlanNutricional.objects.create(SocioID=self.socio)
+        # Dos comidas de lunes a viernes, una el fin de semana
+        self.comidas = {
+            dia: [
+                DiaComida.objects.create(
+                    PlanNutricionalID=self.plan, DiaSemana=dia, TipoComida=tipo
+                )
+                for tipo in (("Desayuno", "Cena") if dia < 5 else ("Almuerzo",))
+            ]
+            for dia in range(7)
+        }
+        self.por_dia = [2, 2, 2, 2, 2, 1, 1]
+
+    def _completar(self, fecha, indice=0, dia=None):
+        comida = self.comidas[fecha.weekday() if dia is None else dia][indice]
+        return RegistroComidaDiaria.objects.create(
+            SocioID=self.socio, DiaComidaID=comida, Fecha=fecha, Completado=True
+        )
+
+    def test_comidas_esperadas_sin_recorrer_dias(self):
+        inicio = date(2025, 1, 1)
+        for dias in (1, 6, 7, 30, 365):
+            fin = inicio + timedelta(days=dias - 1)
+            a_mano = sum(self.por_dia[(inicio + timedelta(days=n)).weekday()] for n in range(dias))
+            self.assertEqual(comidas_esperadas(inicio, fin, self.por_dia), a_mano)
+
+    def test_adherencia_por_semana_y_por_mes(self):
+        # Lunes 6 y martes 7 de enero de 2025
+        self._completar(date(2025, 1, 6))
+        self._completar(date(2025, 1, 6), 1)
+        self._completar(date(2025, 1, 7))
+        # Registrado en un día que no le toca a esa comida: no cuenta
+        self._completar(date(2025, 1, 8), dia=5)
+        RegistroComidaDiaria.objects.create(
+            SocioID=self.socio, DiaComidaID=self.comidas[3][0], Fecha=date(2025, 1, 9)
+        )
+
+        with self.assertNumQueries(1):
+            semanas = adherencia_por_periodo(
+                self.socio, self.plan, self.por_dia, date(2025, 1, 1), date(2025, 1, 12)
+            )
+        self.assertEqual(
+            [(s["inicio"], s["fin"], s["completadas"], s["esperadas"]) for s in semanas],
+            [
+                (date(2025, 1, 6), date(2025, 1, 12), 3, 12),
+                (date(2025, 1, 1), date(2025, 1, 5), 0, 8),
+            ],
+        )
+        self.assertEqual(semanas[0]["porcentaje"], 25)
+
+        meses = adherencia_por_periodo(
+            self.socio, self.plan, self.por_dia, date(2024, 12, 15), date(2025, 1, 31), "mes"
+        )
+        self.assertEqual(
+            [(m["clave"], m["completadas"]) for m in meses], [("2025-01-01", 3), ("2024-12-01", 0)]
+        )
+        self.assertEqual(meses[1]["inicio"], date(2024, 12, 15))
+
+    def test_detalle_por_dia_solo_de_dias_con_registros(self):
+        self._completar(date(2025, 1, 6), 1)
+        dias = [
+            {"indice": dia, "comidas": [
+                {"id": c.id, "tipo": c.TipoComida, "alimentos": [{"nombre": "Avena"}]}
+                for c in comidas
+            ]}
+            for dia, comidas in self.comidas.items()
+        ]
+
+        detalle = detalle_por_dia(self.socio, self.plan, dias, date(2025, 1, 1), date(2025, 1, 31))
+
+        self.assertEqual(len(detalle), 1)
+        self.assertEqual((detalle[0]["dia_semana"], detalle[0]["completadas"]), ("Lunes", 1))
+        self.assertEqual(
+            [(c["nombre"], c["completado"]) for c in detalle[0]["comidas"]],
+            [("Desayuno", False), ("Cena", True)],
+        )
+
+    def test_vista_de_un_anio_con_detalle_del_periodo_desplegado(self):
+        usuario = crear_usuario_para_socio(self.socio, "ClaveSegura123")
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "socio"
+        session.save()
+        hoy = timezone.localdate()
+
+        def medir(**parametros):
+            with CaptureQueriesContext(connection) as capturadas:
+                respuesta = self.client.get(reverse("historial_comidas"), parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            return len(capturadas), respuesta
+
+        # La primera visita compila el documento del plan
+        medir(dias=365)
+        sin_registros, _ = medir(dias=365)
+        for n in range(0, 300, 3):
+            self._completar(hoy - timedelta(days=n))
+        con_registros, respuesta = medir(dias=365)
+
+        self.assertEqual(con_registros, sin_registros)
+        periodos = respuesta.context["periodos"]
+        self.assertEqual(respuesta.context["agrupacion"], "mes")
+        self.assertIn(len(periodos), (12, 13))
+        self.assertEqual(sum(p["completadas"] for p in periodos), 100)
+        self.assertEqual(respuesta.context["historial_dias"], [])
+
+        abierto = periodos[1]
+        respuesta = self.client.get(
+            reverse("historial_comidas"), {"dias": 365, "periodo": abierto["clave"]}
+        )
+        self.assertEqual(
+            {dia["fecha"] for dia in respuesta.context["historial_dias"]},
+            {
+                hoy - timedelta(days=n) for n in range(0, 300, 3)
+                if abierto["inicio"] <= hoy - timedelta(days=n) <= abierto["fin"]
+            },
+        )
+
+        # Los rangos cortos siguen mostrando todos los días
+        respuesta = self.client.get(reverse("historial_comidas"), {"dias": 7})
+        self.assertEqual(respuesta.context["agrupacion"], "semana")
+        self.assertEqual(len(respuesta.context["historial_dias"]), 3)
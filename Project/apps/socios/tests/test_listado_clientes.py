@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.control_acceso.models import RutinaSemanal, SesionEntrenamiento
+from apps.pagos.models import SocioMembresia
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.models import Medicion, Socio
+from apps.socios.servicios.listado_clientes import (
+    TAMANO_PAGINA_CLIENTES,
+    calcular_imc,
+    listar_clientes,
+)
+
+
+class ListadoClientesTest(TestCase):
+    def _socio(self, n, **campos):
+        return Socio.objects.create(
+            Identificacion=f"{n:010d}", NombreCompleto=f"Cliente {n:03d}", **campos
+        )
+
+    def _socios(self, cantidad, desde=0):
+        hoy = timezone.localdate()
+        for n in range(desde, desde + cantidad):
+            socio = self._socio(n, Altura=Decimal("1.70"))
+            Medicion.objects.create(SocioID=socio, Fecha=hoy, PesoCorporal=Decimal("70.00"))
+            RutinaSemanal.objects.create(SocioID=socio, DiasEntrenamiento="LMV")
+
+    def test_anotaciones_de_la_tarjeta(self):
+        socio = self._socio(1, Altura=Decimal("1.80"), Email="uno@test.com")
+        Medicion.objects.create(SocioID=socio, Fecha=date(2025, 1, 1), PesoCorporal=Decimal("90"))
+        Medicion.objects.create(SocioID=socio, Fecha=date(2025, 2, 1), PesoCorporal=Decimal("81"))
+        # Una medición posterior sin peso no borra el último peso conocido
+        Medicion.objects.create(SocioID=socio, Fecha=date(2025, 3, 1), IMC=Decimal("25"))
+        membresia = SocioMembresia.objects.create(
+            SocioID=socio, FechaInicio=date(2025, 1, 1), FechaFin=date(2025, 12, 31)
+        )
+        inicio = timezone.now() - timedelta(days=2)
+        SesionEntrenamiento.objects.create(
+            SocioMembresiaID=membresia, FechaInicio=inicio - timedelta(days=5), DiaSemana=0
+        )
+        SesionEntrenamiento.objects.create(
+            SocioMembresiaID=membresia, FechaInicio=inicio, DiaSemana=0
+        )
+        self._socio(2)
+
+        with self.assertNumQueries(2):
+            uno, dos = listar_clientes()["clientes"]
+
+        self.assertEqual((uno.peso, uno.fecha_medicion), (Decimal("81"), date(2025, 2, 1)))
+        self.assertEqual(uno.imc, 25.0)
+        self.assertEqual(uno.ultima_sesion, inicio)
+        self.assertFalse(uno.tiene_rutina)
+        self.assertIsNone(dos.peso)
+        self.assertIsNone(dos.imc)
+        self.assertIsNone(dos.ultima_sesion)
+
+    def test_calcular_imc(self):
+        self.assertEqual(calcular_imc(Decimal("70"), Decimal("1.75")), 22.9)
+        self.assertIsNone(calcular_imc(Decimal("70"), None))
+        self.assertIsNone(calcular_imc(None, Decimal("1.75")))
+
+    def test_busqueda_por_nombre_identificacion_y_email(self):
+        self._socio(1, Email="ana@correo.com")
+        self._socio(22)
+        self._socio(3)
+
+        def ids(texto):
+            return [s.Identificacion for s in listar_clientes(busqueda=texto)["clientes"]]
+
+        self.assertEqual(ids("cliente 02"), ["0000000022"])
+        self.assertEqual(ids("0000000003"), ["0000000003"])
+        self.assertEqual(ids("ANA@"), ["0000000001"])
+        self.assertEqual(listar_clientes(busqueda="Cliente")["total"], 3)
+
+    def test_paginacion_recorre_todo_sin_repetir(self):
+        self._socios(11)
+        esperado = list(
+            Socio.objects.order_by("NombreCompleto", "id").values_list("id", flat=True)
+        )
+
+        vistos, cursor = [], None
+        while True:
+            pagina = listar_clientes(cursor=cursor, tamano=4)
+            vistos += [s.id for s in pagina["clientes"]]
+            cursor = pagina["siguiente_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(vistos, esperado)
+
+    def test_vista_con_consultas_constantes(self):
+        rol = Rol.objects.create(NombreRol="Entrenador")
+        usuario = Usuario.objects.create(
+            NombreUsuario="coach", Email="coach@test.com",
+            PasswordHash=make_password("clave12345"), RolID=rol,
+        )
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "entrenador"
+        session.save()
+
+        def medir(**parametros):
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(reverse("clientes_list"), parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            return len(consultas), respuesta
+
+        self._socios(5)
+        pocos, _ = medir()
+        self._socios(40, desde=5)
+        muchos, respuesta = medir()
+
+        self.assertEqual(pocos, muchos)
+        self.assertEqual(len(respuesta.context["clientes"]), TAMANO_PAGINA_CLIENTES)
+        cursor = respuesta.context["siguiente_cursor"]
+        self.assertContains(respuesta, f"cursor={cursor}")
+        # IMC de 70 kg y 1,70 m
+        self.assertContains(respuesta, "24,2")
+        _, siguiente = medir(cursor=cursor)
+        self.assertEqual(len(siguiente.context["clientes"]), 45 - TAMANO_PAGINA_CLIENTES)
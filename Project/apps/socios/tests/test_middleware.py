@@ -0,0 +1,95 @@
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.middleware import SESION_IDENTIDAD_SOCIO, obtener_socio_actual
+from apps.socios.models import Socio
+
+
+class SocioActualMiddlewareTest(TestCase):
+    def setUp(self):
+        rol = Rol.objects.create(NombreRol="Socio")
+        self.socio = Socio.objects.create(
+            Identificacion="1010101010",
+            NombreCompleto="Socio Middleware",
+            Email="middleware@test.com",
+        )
+        self.usuario = Usuario.objects.create(
+            NombreUsuario="1010101010",
+            Email="middleware@test.com",
+            PasswordHash=make_password("clave12345"),
+            RolID=rol,
+            SocioID=self.socio,
+        )
+
+    def _request(self, session=None):
+        request = RequestFactory().get("/")
+        request.session = session if session is not None else SessionStore()
+        request.session["usuario_id"] = self.usuario.id
+        return request
+
+    def test_resuelve_socio_y_guarda_vinculo_en_sesion(self):
+        request = self._request()
+
+        socio = obtener_socio_actual(request)
+
+        self.assertEqual(socio, self.socio)
+        self.assertEqual(
+            request.session[SESION_IDENTIDAD_SOCIO],
+            {"usuario_id": self.usuario.id, "socio_id": self.socio.id},
+        )
+
+    def test_vinculo_cacheado_usa_una_sola_consulta(self):
+        session = SessionStore()
+        obtener_socio_actual(self._request(session))
+
+        request = self._request(session)
+        with self.assertNumQueries(1):
+            socio = obtener_socio_actual(request)
+            # Memorizado en la petición: la segunda llamada no consulta
+            obtener_socio_actual(request)
+
+        self.assertEqual(socio, self.socio)
+
+    def test_cambio_de_email_no_rompe_el_vinculo(self):
+        session = SessionStore()
+        obtener_socio_actual(self._request(session))
+
+        self.socio.Email = "otro@test.com"
+        self.socio.save()
+
+        self.assertEqual(obtener_socio_actual(self._request(session)), self.socio)
+
+    def test_desvincular_usuario_invalida_la_sesion(self):
+        session = SessionStore()
+        obtener_socio_actual(self._request(session))
+
+        self.usuario.SocioID = None
+        self.usuario.save()
+
+        self.assertIsNone(obtener_socio_actual(self._request(session)))
+        self.assertNotIn(SESION_IDENTIDAD_SOCIO, session)
+
+    def test_vista_ajax_sin_socio_responde_401(self):
+        session = self.client.session
+        session["usuario_id"] = self.usuario.id
+        session.save()
+        Socio.objects.all().delete()
+
+        response = self.client.post(
+            reverse("toggle_comida"), data="{}", content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_panel_socio_usa_request_socio(self):
+        session = self.client.session
+        session["usuario_id"] = self.usuario.id
+        session.save()
+
+        response = self.client.get(reverse("socio_panel"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["socio"], self.socio)
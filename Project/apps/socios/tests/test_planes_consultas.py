@@ -0,0 +1,202 @@
+"""
+Regresión de planes de ejecución: cada consulta frecuente debe resolverse con
+su índice. Se ejecuta EXPLAIN sobre una base sembrada y el test falla si el
+plan recorre la tabla completa (SCAN en SQLite, Seq Scan en PostgreSQL) o si
+no usa el índice esperado, así que quitar un índice rompe su test.
+"""
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.control_acceso.models import (
+    Asistencia,
+    DiaComida,
+    PlanNutricional,
+    SesionEntrenamiento,
+)
+from apps.pagos.models import Pago, PlanMembresia, SocioMembresia
+from apps.seguridad.models import Rol, Usuario
+from apps.socios.models import Medicion, RegistroComidaDiaria, Socio
+
+SOCIOS_SEMBRADOS = 80
+
+
+class PlanesConsultasFrecuentesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        hoy = timezone.localdate()
+        ahora = timezone.now()
+        plan = PlanMembresia.objects.create(Nombre="Mensual", Precio=100, DuracionDias=30)
+        Socio.objects.bulk_create(
+            Socio(Identificacion=f"P{n}", NombreCompleto=f"Socio {n}")
+            for n in range(SOCIOS_SEMBRADOS)
+        )
+        socios = list(Socio.objects.all())
+        SocioMembresia.objects.bulk_create(
+            SocioMembresia(
+                SocioID=socio,
+                PlanID=plan,
+                FechaInicio=hoy - timedelta(days=30 * k),
+                FechaFin=hoy - timedelta(days=30 * k - 30),
+                Estado="Activa" if k == 0 else "Expirada",
+            )
+            for socio in socios
+            for k in range(3)
+        )
+        membresias = list(SocioMembresia.objects.all())
+        SesionEntrenamiento.objects.bulk_create(
+            SesionEntrenamiento(
+                SocioMembresiaID=membresia,
+                FechaInicio=ahora - timedelta(days=d),
+                FechaFin=None if d == 0 else ahora - timedelta(days=d),
+                DiaSemana=0,
+            )
+            for membresia in membresias
+            for d in range(4)
+        )
+        Pago.objects.bulk_create(
+            Pago(SocioMembresiaID=membresia, Monto=100, FechaPago=ahora - timedelta(days=n % 90))
+            for n, membresia in enumerate(membresias)
+        )
+        Asistencia.objects.bulk_create(
+            Asistencia(
+                SocioMembresiaID=membresia,
+                FechaHoraEntrada=ahora - timedelta(days=d),
+                FechaHoraSalida=None if d == 0 else ahora - timedelta(days=d),
+            )
+            for membresia in membresias
+            for d in range(3)
+        )
+        Medicion.objects.bulk_create(
+            Medicion(SocioID=socio, Fecha=hoy - timedelta(days=7 * d), PesoCorporal=70)
+            for socio in socios
+            for d in range(4)
+        )
+        dia = DiaComida.objects.create(
+            PlanNutricionalID=PlanNutricional.objects.create(Nombre="Plan"), DiaSemana=0
+        )
+        RegistroComidaDiaria.objects.bulk_create(
+            RegistroComidaDiaria(SocioID=socio, DiaComidaID=dia, Fecha=hoy - timedelta(days=d))
+            for socio in socios
+            for d in range(5)
+        )
+        rol = Rol.objects.create(NombreRol="Entrenador")
+        Usuario.objects.bulk_create(
+            Usuario(
+                NombreUsuario=f"entrenador{n}", Email=f"e{n}@test.com", PasswordHash="x", RolID=rol
+            )
+            for n in range(SOCIOS_SEMBRADOS // 4)
+        )
+        cls.plan = plan
+        cls.socio = socios[SOCIOS_SEMBRADOS // 2]
+        cls.membresia = cls.socio.membresias.first()
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # Con pocas filas el planificador prefiere Seq Scan aunque haya
+            # índice; desactivarlo comprueba que el índice existe y es usable.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def indice_de_fk(self, modelo, campo):
+        """Nombre del índice que Django crea para la clave foránea ``campo``."""
+        columna = modelo._meta.get_field(campo).column
+        with connection.cursor() as cursor:
+            restricciones = connection.introspection.get_constraints(
+                cursor, modelo._meta.db_table
+            )
+        return next(
+            nombre
+            for nombre, datos in restricciones.items()
+            if datos["index"] and not datos["unique"] and datos["columns"] == [columna]
+        )
+
+    def assertUsaIndice(self, queryset, indice):
+        tabla = queryset.model._meta.db_table
+        plan = queryset.explain()
+        if connection.vendor == "postgresql":
+            recorrido = rf"Seq Scan on {tabla}\b"
+            uso = rf"(Index (Only )?Scan using|Bitmap Index Scan on) {re.escape(indice)}\b"
+        else:
+            recorrido = rf"\bSCAN (TABLE )?{tabla}\b"
+            uso = rf"USING (COVERING )?INDEX {re.escape(indice)}\b"
+        self.assertIsNone(re.search(recorrido, plan), plan)
+        self.assertRegex(plan, uso)
+
+    def test_membresia_mas_reciente_del_socio(self):
+        self.assertUsaIndice(
+            SocioMembresia.objects.filter(SocioID=self.socio).order_by("-FechaInicio")[:1],
+            "socmem_socio_inicio_idx",
+        )
+
+    def test_membresias_por_estado_vencidas(self):
+        self.assertUsaIndice(
+            SocioMembresia.objects.filter(Estado="Activa", FechaFin__lt=timezone.localdate()),
+            "socmem_estado_fin_idx",
+        )
+
+    def test_sesion_activa(self):
+        self.assertUsaIndice(
+            SesionEntrenamiento.objects.filter(
+                SocioMembresiaID__in=self.socio.membresias.all(), FechaFin__isnull=True
+            ),
+            "sesion_membresia_fin_idx",
+        )
+
+    def test_sesiones_completadas(self):
+        self.assertUsaIndice(
+            SesionEntrenamiento.objects.filter(
+                SocioMembresiaID=self.membresia, FechaFin__isnull=False
+            ),
+            "sesion_membresia_fin_idx",
+        )
+
+    def test_ultima_medicion(self):
+        self.assertUsaIndice(
+            Medicion.objects.filter(SocioID=self.socio).order_by("-Fecha")[:1],
+            "medicion_socio_fecha_idx",
+        )
+
+    def test_pagos_del_mes(self):
+        self.assertUsaIndice(
+            Pago.objects.filter(FechaPago__gte=timezone.now() - timedelta(days=30)),
+            "pago_fecha_idx",
+        )
+
+    def test_asistencia_abierta(self):
+        self.assertUsaIndice(
+            Asistencia.objects.filter(
+                SocioMembresiaID=self.membresia, FechaHoraSalida__isnull=True
+            ),
+            "u_asistencia_abierta",
+        )
+
+    def test_registro_comidas_del_dia(self):
+        self.assertUsaIndice(
+            RegistroComidaDiaria.objects.filter(
+                SocioID=self.socio, Fecha=timezone.localdate()
+            ),
+            "regcomida_socio_fecha_idx",
+        )
+
+    def test_pagina_de_socios_por_nombre(self):
+        self.assertUsaIndice(
+            Socio.objects.filter(NombreCompleto__gt=self.socio.NombreCompleto)
+            .order_by("NombreCompleto", "id")[:26],
+            "socio_nombre_id_idx",
+        )
+
+    def test_membresias_de_un_plan(self):
+        self.assertUsaIndice(
+            SocioMembresia.objects.filter(PlanID=self.plan, SocioID=self.socio),
+            "socmem_socio_inicio_idx",
+        )
+
+    def test_usuarios_por_rol(self):
+        self.assertUsaIndice(
+            Usuario.objects.filter(RolID__NombreRol="Entrenador").order_by("NombreUsuario")[:26],
+            self.indice_de_fk(Usuario, "RolID"),
+        )
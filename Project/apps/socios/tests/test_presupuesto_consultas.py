@@ -0,0 +1,236 @@
+"""
+Presupuesto de consultas por ruta: recorre todas las rutas con nombre de
+Project/urls.py como el rol que corresponde, con 50 y con 500 socios, y
+compara el número de consultas con la tabla de presupuesto_consultas.py.
+"""
+import json
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+
+from apps.control_acceso.models import (
+    ComidaAlimento,
+    DiaComida,
+    DiaRutinaEjercicio,
+    PlanNutricional,
+    SesionEntrenamiento,
+)
+
+from apps.control_acceso.servicios.documento_nutricion import obtener_documento
+from apps.control_acceso.servicios.sesiones_service import (
+    alternar_ejercicio,
+    crear_sesion,
+)
+from apps.seguridad.servicios.kpi_snapshot import guardar_snapshot_del_dia
+
+from .datos_escala import crear_base, sembrar_socios
+from .presupuesto_consultas import PRESUPUESTO_CONSULTAS
+
+TAMANOS = (50, 500)
+
+# Vistas AJAX que leen el cuerpo como JSON
+RUTAS_JSON = {"toggle_ejercicio", "toggle_comida", "ingerir_eventos_acceso"}
+
+
+def rutas_con_nombre():
+    return sorted(
+        patron.name
+        for patron in get_resolver().url_patterns
+        if isinstance(patron, URLPattern) and patron.name
+    )
+
+
+class PresupuestoConsultasTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.base = crear_base()
+        cls.socios = sembrar_socios(cls.base, TAMANOS[0])
+        # El socio "actual" y el socio objetivo de las rutas de staff
+        cls.socio = cls.socios[0]
+        cls.otro_socio = cls.socios[1]
+        # Los planes ya visitados tienen su documento compilado: se mide la
+        # lectura normal, no la primera compilación
+        for plan in PlanNutricional.objects.select_related("documento"):
+            obtener_documento(plan)
+        # Y el snapshot de KPIs de hoy, como lo deja generar_kpi_diario
+        guardar_snapshot_del_dia()
+
+    def _argumentos(self, nombre):
+        """kwargs de la URL y datos (POST o query string) para cada ruta."""
+        socio = self.otro_socio
+        rutina = socio.rutinas.get()
+        asignacion = DiaRutinaEjercicio.objects.filter(RutinaID=rutina).first()
+        plan_nutricion = PlanNutricional.objects.get(SocioID=socio)
+        dia_comida = DiaComida.objects.filter(PlanNutricionalID=plan_nutricion).first()
+        item = ComidaAlimento.objects.filter(DiaComidaID=dia_comida).first()
+        dia_comida_propio = DiaComida.objects.filter(
+            PlanNutricionalID__SocioID=self.socio
+        ).first()
+        sesion = SesionEntrenamiento.objects.filter(
+            SocioMembresiaID__SocioID=self.socio
+        ).first()
+        ejercicio = self.base["ejercicios"][4]
+        usuario_staff = self.base["usuarios"]["Entrenador"]
+
+        por_parametro = {
+            "sesion_id": sesion.id,
+            "socio_id": socio.id,
+            "usuario_id": usuario_staff.id,
+            "rutina_id": rutina.id,
+            "asignacion_id": asignacion.id,
+            "dia_id": dia_comida.id,
+            "item_id": item.id,
+            "dia": 0,
+            "tipo_rol": "Entrenador",
+            "tipo": "usuario",
+            "entidad_id": usuario_staff.id,
+        }
+        planes = {
+            "eliminar_plan_membresia": self.base["plan"].id,
+            "editar_plan_membresia": self.base["plan"].id,
+            "entrenador_plantilla_nutricion": self.base["plantilla_nutricion"].id,
+            "entrenador_aplicar_plantilla_grupo": self.base["plantilla_nutricion"].id,
+        }
+        rutinas = {
+            "ajax_asignar_rutina_grupo": self.base["plantilla_rutina"].id,
+        }
+        datos = {
+            "toggle_comida": {"dia_comida_id": dia_comida_propio.id},
+            "ajax_agregar_ejercicio": {"ejercicio_id": ejercicio.id, "dia": 1},
+            "ajax_eliminar_ejercicio": {"id": asignacion.id},
+            "ajax_limpiar_dia": {"dia": 2},
+            "ajax_asignar_rutina": {"socio_id": self.socios[2].id},
+            "ajax_asignar_rutina_grupo": {
+                "socio_ids": [self.socios[2].id, self.socios[3].id]
+            },
+            "ajax_crear_ejercicio": {"nombre": "Nuevo ejercicio"},
+            "ajax_actualizar_ejercicio": {"series": "4", "reps": "8"},
+            "entrenador_nutricion_agregar_comida": {"dia": 1, "tipo": "Cena"},
+            "entrenador_nutricion_agregar_alimento": {
+                "alimento_id": self.base["alimentos"][2].id,
+                "porcion": "100",
+            },
+            "entrenador_nutricion_actualizar_alimento": {"porcion": "120"},
+            "entrenador_nutricion_crear_alimento": {"nombre": "Arroz", "kcal": "130"},
+            "entrenador_nutricion_actualizar_plan": {"objetivo_calorico": "2100"},
+            "entrenador_crear_plantilla": {"nombre": "Nueva", "objetivo_calorico": "1800"},
+            "entrenador_aplicar_plantilla_grupo": {
+                "socio_ids": [self.socios[2].id, self.socios[3].id]
+            },
+            "buscar_socios_pago": {"q": "Escala"},
+            "registrar_entrada": {
+                "identificacion": socio.Identificacion, "terminal": "Torniquete 1",
+            },
+            "ingerir_eventos_acceso": {
+                "terminal": "Torniquete 1",
+                "eventos": [
+                    {
+                        "clave": f"{tipo}-{socio_evento.id}",
+                        "tipo": tipo,
+                        "identificacion": socio_evento.Identificacion,
+                        "fecha_hora": timezone.now().isoformat(),
+                    }
+                    for socio_evento in self.socios[2:4]
+                    for tipo in ("entrada", "salida")
+                ],
+            },
+            "registrar_pago": {
+                "socio_id": socio.id,
+                "plan_id": self.base["plan"].id,
+                "monto": "100",
+                "tipo_pago": "Efectivo",
+            },
+        }
+
+        kwargs = {}
+        patron = next(
+            p for p in get_resolver().url_patterns if getattr(p, "name", None) == nombre
+        )
+        for parametro in patron.pattern.converters:
+            if parametro == "plan_id":
+                kwargs[parametro] = planes.get(nombre, plan_nutricion.id)
+            elif parametro == "rutina_id":
+                kwargs[parametro] = rutinas.get(nombre, rutina.id)
+            else:
+                kwargs[parametro] = por_parametro[parametro]
+        return kwargs, datos.get(nombre, {})
+
+    def _iniciar_sesion(self, rol):
+        self.client.logout()
+        if rol is None:
+            return
+        usuario = (
+            self.socio.usuario if rol == "socio" else self.base["usuarios"][rol.capitalize()]
+        )
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = rol
+        session.save()
+
+    def _preparar(self, nombre, datos):
+        """Estado que la ruta necesita para recorrer su camino normal; se deshace con ella."""
+        if nombre not in ("toggle_ejercicio", "terminar_sesion"):
+            return datos
+        # Sin sesión activa solo se mediría la respuesta de error
+        rutina = self.socio.rutinas.get()
+        asignacion = DiaRutinaEjercicio.objects.filter(RutinaID=rutina).first()
+        sesion = crear_sesion(
+            rutina, self.socio.membresias.first(), asignacion.DiaSemana, timezone.now()
+        )
+        if nombre == "toggle_ejercicio":
+            return {"ejercicio_id": asignacion.id}
+        # El cierre se mide en su caso más caro: todo completado
+        for fila in sesion.ejercicios_completados.all():
+            alternar_ejercicio(sesion, fila.DiaRutinaEjercicioID_id)
+        return datos
+
+    def _contar_consultas(self, nombre, presupuesto):
+        kwargs, datos = self._argumentos(nombre)
+        self._iniciar_sesion(presupuesto.rol)
+        url = reverse(nombre, kwargs=kwargs)
+        cache.clear()
+
+        # Cada petición se deshace para que todas vean los mismos datos
+        with transaction.atomic():
+            datos = self._preparar(nombre, datos)
+            with CaptureQueriesContext(connection) as consultas:
+                if nombre in RUTAS_JSON:
+                    respuesta = self.client.post(
+                        url, json.dumps(datos), content_type="application/json"
+                    )
+                elif presupuesto.metodo == "POST":
+                    respuesta = self.client.post(url, datos)
+                else:
+                    respuesta = self.client.get(url, datos)
+            transaction.set_rollback(True)
+
+        self.assertLess(respuesta.status_code, 500, nombre)
+        return len(consultas)
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        self.assertEqual(
+            sorted(set(rutas_con_nombre()) - {"home"}), sorted(PRESUPUESTO_CONSULTAS)
+        )
+
+    def test_consultas_dentro_del_presupuesto_y_sin_crecer(self):
+        conteos = {}
+        for indice, tamano in enumerate(TAMANOS):
+            if indice:
+                sembrar_socios(self.base, tamano - TAMANOS[indice - 1], desde=TAMANOS[indice - 1])
+            for nombre, presupuesto in PRESUPUESTO_CONSULTAS.items():
+                conteos.setdefault(nombre, []).append(self._contar_consultas(nombre, presupuesto))
+
+        for nombre, presupuesto in PRESUPUESTO_CONSULTAS.items():
+            pequeno, grande = conteos[nombre]
+            with self.subTest(ruta=nombre, consultas=conteos[nombre]):
+                self.assertLessEqual(pequeno, presupuesto.maximo)
+                if presupuesto.crece:
+                    # N+1 conocido: si deja de crecer hay que actualizar la tabla
+                    self.assertGreater(grande, pequeno)
+                else:
+                    self.assertEqual(grande, pequeno)
@@ -67,4 +67,45 @@ class RegisterViewTest(TestCase):
         
         messages = list(response.context['messages'])
         self.assertEqual(len(messages), 1)
-        self.assertIn("El teléfono debe iniciar con '+57 3'", str(messages[0]))
\ No newline at end of file
+        self.assertIn("El teléfono debe iniciar con '+57 3'", str(messages[0]))
+
+
+class MiNutricionViewTest(TestCase):
+
+    def test_totales_del_dia_desde_columnas_numericas(self):
+        from datetime import datetime
+        from decimal import Decimal
+
+        from apps.control_acceso.models import (
+            Alimento, ComidaAlimento, DiaComida, PlanNutricional,
+        )
+        from apps.seguridad.servicios.registro_usuario import crear_usuario_para_socio
+
+        socio = Socio.objects.create(
+            Identificacion="1", NombreCompleto="Socio Nutrición", Email="nutricion@test.com"
+        )
+        usuario = crear_usuario_para_socio(socio, "ClaveSegura123")
+        plan = PlanNutricional.objects.create(SocioID=socio, ObjetivoCaloricoDiario=2000)
+        comida = DiaComida.objects.create(
+            PlanNutricionalID=plan, DiaSemana=datetime.now().weekday(), TipoComida="Almuerzo"
+        )
+        # El texto libre ya no se interpreta: mandan las columnas
+        pollo = Alimento.objects.create(
+            Nombre="Pollo", Kcal=165, Macros="P: 1g", ProteinaG=Decimal("31"),
+            CarbohidratosG=Decimal("0"), GrasaG=Decimal("3.6"),
+        )
+        ComidaAlimento.objects.create(DiaComidaID=comida, AlimentoID=pollo, Porcion=Decimal("200"))
+
+        session = self.client.session
+        session["usuario_id"] = usuario.id
+        session["usuario_email"] = usuario.Email
+        session["usuario_rol"] = "socio"
+        session.save()
+        response = self.client.get(reverse("mi_nutricion"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["calorias_total"], 330)
+        self.assertEqual(response.context["proteinas_total"], 62.0)
+        self.assertEqual(response.context["grasas_total"], 7.2)
+        item = response.context["comidas_hoy"][0].alimentos_list[0]
+        self.assertEqual(item["macros_texto"], "330 kcal | P: 62.0g, C: 0.0g, G: 7.2g")
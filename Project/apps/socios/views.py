@@ -61,6 +61,7 @@ import json
 #     return render(request, "socio/register.html")
 # Interfaz Inicio (beta)
 from datetime import datetime
+from types import SimpleNamespace
 
 from django.contrib import messages
 from django.db import IntegrityError
@@ -79,15 +80,34 @@ from apps.control_acceso.models import (
     RutinaSemanal,
     SesionEntrenamiento,
 )
-from apps.pagos.models import AlertaPago, Pago, PlanMembresia, SocioMembresia
+from apps.control_acceso.servicios.documento_nutricion import obtener_documento
+from apps.control_acceso.servicios.sesiones_service import (
+    alternar_ejercicio,
+    crear_sesion,
+    terminar_sesion,
+)
+from apps.control_acceso.servicios.rachas_service import (
+    fecha_de_sesion,
+    obtener_resumen_racha,
+    registrar_dia_entrenamiento,
+)
+from apps.pagos.models import AlertaPago
 from apps.seguridad.decoradores import login_requerido
 from apps.seguridad.models import Usuario
 from apps.seguridad.servicios.registro_usuario import crear_usuario_para_socio
 from apps.socios.forms import PerfilSocioForm
-from apps.socios.models import Medicion, Socio
+from apps.socios.servicios.historial_comidas import (
+    MAXIMO_DIAS,
+    MAXIMO_DIAS_DETALLE,
+    MAXIMO_DIAS_SEMANAL,
+    OPCIONES_RANGO,
+    adherencia_por_periodo,
+    detalle_por_dia,
+)
+from apps.socios.servicios.listado_clientes import listar_clientes
 from apps.socios.servicios.rutinas import obtener_o_crear_rutina_base
 
-from .models import Medicion, RegistroComidaDiaria, Socio
+from .models import Medicion, RegistroComidaDiaria
 from .servicios.registro_db import ValidationError, create_socio_from_dict
 
 # ... (keep existing imports and register_view)
@@ -95,104 +115,18 @@ from .servicios.registro_db import ValidationError, create_socio_from_dict
 
 @login_requerido
 def panel_de_control_view(request):
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        # Asumimos que el email es el vínculo entre Usuario y Socio
-        socio = Socio.objects.get(Email=usuario.Email)
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
+    socio = request.socio
+    if not socio:
         messages.error(request, "No se encontró el perfil de socio asociado.")
         return redirect("login")
 
     # --- Estadísticas ---
-    # 1. Racha (Consecutive training days with 1-day grace period)
-    membresias = SocioMembresia.objects.filter(SocioID=socio)
-
-    # Get all completed sessions ordered by date (newest first)
-    sesiones_completadas = (
-        SesionEntrenamiento.objects.filter(
-            SocioMembresiaID__in=membresias, FechaFin__isnull=False
-        )
-        .order_by("-FechaInicio")
-        .values_list("FechaInicio", flat=True)
-    )
-
-    # Calculate streak
-    racha_dias = 0
-    racha_en_peligro = False
-    mensaje_racha = ""
-
-    if sesiones_completadas:
-        hoy = timezone.now().date()
-        dias_unicos = set(dt.date() for dt in sesiones_completadas)
-        dias_unicos = sorted(dias_unicos, reverse=True)
-
-        entreno_hoy = hoy in dias_unicos
-        ayer = hoy - timezone.timedelta(days=1)
-        entreno_ayer = ayer in dias_unicos
-        es_fin_de_semana = hoy.weekday() in [5, 6]
-
-        ultimo_dia_entreno = dias_unicos[0] if dias_unicos else None
-        weekend_gap = False
-        if not entreno_hoy and not entreno_ayer and ultimo_dia_entreno:
-            dias_desde_ultimo = (hoy - ultimo_dia_entreno).days
-            if dias_desde_ultimo > 1:
-                dias_intermedios = [
-                    ultimo_dia_entreno + timezone.timedelta(days=i)
-                    for i in range(1, dias_desde_ultimo + 1)
-                ]
-                if dias_intermedios:
-                    dias_previos = dias_intermedios[:-1]
-                    if dias_previos and all(
-                        d.weekday() in [5, 6] for d in dias_previos
-                    ):
-                        weekend_gap = True
-
-        fecha_actual = None
-        if entreno_hoy:
-            fecha_actual = hoy
-        elif entreno_ayer:
-            fecha_actual = ayer
-        elif weekend_gap and ultimo_dia_entreno:
-            fecha_actual = ultimo_dia_entreno
-
-        if fecha_actual:
-            racha_dias = 1
-            dias_sin_entrenar = 0
-
-            for i in range(1, 365):
-                fecha_anterior = fecha_actual - timezone.timedelta(days=i)
-                dia_semana = fecha_anterior.weekday()
-
-                if fecha_anterior in dias_unicos:
-                    racha_dias += 1
-                    dias_sin_entrenar = 0
-                else:
-                    if dia_semana not in [5, 6]:
-                        dias_sin_entrenar += 1
-                        if dias_sin_entrenar > 1:
-                            break
-
-            if entreno_hoy:
-                mensaje_racha = f"¡Genial! Llevas {racha_dias} {'día' if racha_dias == 1 else 'días'} seguidos"
-            elif entreno_ayer:
-                if es_fin_de_semana:
-                    mensaje_racha = f"🌴 Es fin de semana, está bien si descansas :) No perderás tu racha de {racha_dias} días"
-                else:
-                    racha_en_peligro = True
-                    mensaje_racha = (
-                        f"⚠️ ¡Si hoy no entrenas perderás tu racha de {racha_dias} días!"
-                    )
-            elif weekend_gap:
-                racha_en_peligro = True
-                mensaje_racha = f"⚠️ Tu racha de {racha_dias} días sigue tras el fin de semana. Retoma hoy para mantenerla."
-            elif es_fin_de_semana:
-                mensaje_racha = f"🌴 Es fin de semana, está bien si descansas :) Tienes {racha_dias} {'día' if racha_dias == 1 else 'días'} de racha"
-        else:
-            mensaje_racha = "Comienza tu racha entrenando hoy"
-    else:
-        mensaje_racha = "Comienza tu racha entrenando hoy"
+    # 1. Racha (mantenida de forma incremental al cerrar cada sesión)
+    membresias = request.membresias
+    resumen_racha = obtener_resumen_racha(socio.id)
+    racha_dias = resumen_racha["racha_dias"]
+    racha_en_peligro = resumen_racha["racha_en_peligro"]
+    mensaje_racha = resumen_racha["mensaje_racha"]
 
     # 2. Peso Actual
     ultima_medicion = Medicion.objects.filter(SocioID=socio).order_by("-Fecha").first()
@@ -330,46 +264,25 @@ def clientes_list_view(request):
     """Lista de clientes para entrenadores/administrativos con tarjeta resumen.
 
     Muestra peso (última medición), IMC (si está), restricciones médicas (SaludBasica),
-    y datos de contacto.
+    datos de contacto y la última sesión. La búsqueda (nombre, identificación o
+    email) y la paginación se hacen en la base de datos.
     """
-    # Traer todos los socios y su última medición
-    socios = Socio.objects.all().order_by('NombreCompleto')
-    resultados = []
-    for s in socios:
-        ultima = Medicion.objects.filter(SocioID=s).order_by('-Fecha').first()
-        peso = None
-        imc = None
-        fecha_med = None
-        if ultima and ultima.PesoCorporal is not None:
-            peso = float(ultima.PesoCorporal)
-            fecha_med = ultima.Fecha
-            try:
-                if s.Altura:
-                    altura = float(s.Altura)
-                    if altura > 0:
-                        imc = round(peso / (altura * altura), 1)
-            except Exception:
-                imc = None
-
-        # Indicar si el socio ya tiene alguna rutina (esto se usa para el botón "Ver rutina"
-        # y evitar navegaciones innecesarias si no existe rutina).
-        try:
-            has_rutina = RutinaSemanal.objects.filter(SocioID=s).exists()
-        except Exception:
-            has_rutina = False
+    busqueda = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
+    listado = listar_clientes(busqueda=busqueda, cursor=cursor)
 
-        resultados.append({
-            'socio': s,
-            'peso': peso,
-            'imc': imc,
-            'fecha_medicion': fecha_med,
-            'restricciones': s.SaludBasica,
-            'telefono': s.Telefono,
-            'email': s.Email,
-            'has_rutina': has_rutina,
-        })
+    # Parámetros de la búsqueda para los enlaces de paginación
+    filtros = request.GET.copy()
+    filtros.pop('cursor', None)
 
-    return render(request, 'Entrenador/ClientesList.html', {'resultados': resultados})
+    return render(request, 'Entrenador/ClientesList.html', {
+        'clientes': listado['clientes'],
+        'total_clientes': listado['total'],
+        'siguiente_cursor': listado['siguiente_cursor'],
+        'es_primera_pagina': not cursor,
+        'filtros_query': filtros.urlencode(),
+        'busqueda': busqueda,
+    })
 
 
 @login_requerido
@@ -379,12 +292,8 @@ def mi_rutina_view(request):
         SesionEntrenamiento,
     )
 
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        socio = Socio.objects.get(Email=usuario.Email)
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
+    socio = request.socio
+    if not socio:
         messages.error(request, "No se encontró el perfil de socio asociado.")
         return redirect("login")
 
@@ -432,7 +341,7 @@ def mi_rutina_view(request):
         r.selected_attr = "selected" if r == rutina_activa else ""
         r.icon_name = "check_circle" if r == rutina_activa else "arrow_forward_ios"
 
-    membresias = SocioMembresia.objects.filter(SocioID=socio)
+    membresias = request.membresias
     sesion_activa = (
         SesionEntrenamiento.objects.filter(
             SocioMembresiaID__in=membresias, FechaFin__isnull=True
@@ -598,13 +507,20 @@ def panel_admin_view(request):
     from apps.seguridad.servicios.estadisticas_dashboard import (
         obtener_estadisticas_dashboard,
         obtener_estadisticas_pagos_dashboard,
-        obtener_actividad_plataforma
+        obtener_actividad_plataforma,
+        obtener_serie_kpi,
+        RANGOS_KPI,
     )
     
     # Obtener todas las estadísticas
     estadisticas = obtener_estadisticas_dashboard()
     estadisticas_pagos = obtener_estadisticas_pagos_dashboard()
-    actividad = obtener_actividad_plataforma()
+    # Con ?rango= el gráfico lee la serie histórica de los snapshots diarios
+    rango = request.GET.get("rango")
+    if rango in RANGOS_KPI:
+        actividad = obtener_serie_kpi(rango)
+    else:
+        actividad = obtener_actividad_plataforma()
     
     # Combinar contextos
     context = {
@@ -623,86 +539,65 @@ def panel_admin_view(request):
 def iniciar_sesion_view(request):
     from django.http import JsonResponse
 
-    from apps.control_acceso.models import (
-        EjercicioSesionCompletado,
-        SesionEntrenamiento,
-    )
+    from apps.control_acceso.models import SesionEntrenamiento
 
     if request.method == "POST":
-        usuario_id = request.session.get("usuario_id")
-
-        try:
-            usuario = Usuario.objects.get(id=usuario_id)
-            socio = Socio.objects.get(Email=usuario.Email)
-
-            # Check for free training mode
-            entrenamiento_libre = request.POST.get("entrenamiento_libre") == "on"
-            rutina_id = request.POST.get("rutina_id")
-
-            # Get selected routine (or None for free training)
-            rutina = None
-            if not entrenamiento_libre:
-                if rutina_id:
-                    try:
-                        rutina = RutinaSemanal.objects.get(id=rutina_id, SocioID=socio)
-                    except RutinaSemanal.DoesNotExist:
-                        messages.error(request, "Rutina no encontrada.")
-                        return redirect("mi_rutina")
-                else:
-                    rutina = RutinaSemanal.objects.filter(
-                        SocioID=socio, EsPlantilla=False
-                    ).first()
-
-                if not rutina:
-                    messages.error(request, "No tienes una rutina asignada.")
-                    return redirect("mi_rutina")
+        socio = request.socio
+        if not socio:
+            messages.error(request, "Error al iniciar sesión.")
+            return redirect("mi_rutina")
 
-            # Verificar que no haya sesión activa
-            membresias = SocioMembresia.objects.filter(SocioID=socio)
-            sesion_activa = SesionEntrenamiento.objects.filter(
-                SocioMembresiaID__in=membresias, FechaFin__isnull=True
-            ).first()
+        # Check for free training mode
+        entrenamiento_libre = request.POST.get("entrenamiento_libre") == "on"
+        rutina_id = request.POST.get("rutina_id")
 
-            if sesion_activa:
-                messages.warning(request, "Ya tienes una sesión activa.")
-                return redirect("mi_rutina")
+        # Get selected routine (or None for free training)
+        rutina = None
+        if not entrenamiento_libre:
+            if rutina_id:
+                try:
+                    rutina = RutinaSemanal.objects.get(id=rutina_id, SocioID=socio)
+                except RutinaSemanal.DoesNotExist:
+                    messages.error(request, "Rutina no encontrada.")
+                    return redirect("mi_rutina")
+            else:
+                rutina = RutinaSemanal.objects.filter(
+                    SocioID=socio, EsPlantilla=False
+                ).first()
 
-            # Crear nueva sesión
-            membresia = membresias.first()
-            if not membresia:
-                messages.error(request, "No tienes una membresía activa.")
+            if not rutina:
+                messages.error(request, "No tienes una rutina asignada.")
                 return redirect("mi_rutina")
 
-            dia_semana = datetime.now().weekday()
-            sesion = SesionEntrenamiento.objects.create(
-                RutinaID=rutina,
-                SocioMembresiaID=membresia,
-                FechaInicio=timezone.now(),
-                DiaSemana=dia_semana,
-                EsEntrenamientoLibre=entrenamiento_libre,
-            )
-
-            # Crear registros de ejercicios solo si NO es entrenamiento libre
-            if not entrenamiento_libre and rutina:
-                ejercicios_dia = DiaRutinaEjercicio.objects.filter(
-                    RutinaID=rutina, DiaSemana=dia_semana
-                )
-
-                for ejercicio in ejercicios_dia:
-                    EjercicioSesionCompletado.objects.create(
-                        SesionID=sesion,
-                        DiaRutinaEjercicioID=ejercicio,
-                        Completado=False,
-                    )
+        # Verificar que no haya sesión activa
+        membresias = request.membresias
+        sesion_activa = SesionEntrenamiento.objects.filter(
+            SocioMembresiaID__in=membresias, FechaFin__isnull=True
+        ).first()
 
-            modo = "libre" if entrenamiento_libre else rutina.Nombre
-            messages.success(request, f"¡Sesión iniciada ({modo})! Buena suerte.")
+        if sesion_activa:
+            messages.warning(request, "Ya tienes una sesión activa.")
             return redirect("mi_rutina")
 
-        except (Usuario.DoesNotExist, Socio.DoesNotExist):
-            messages.error(request, "Error al iniciar sesión.")
+        # Crear nueva sesión
+        membresia = membresias.first()
+        if not membresia:
+            messages.error(request, "No tienes una membresía activa.")
             return redirect("mi_rutina")
 
+        # Registros de ejercicios solo si NO es entrenamiento libre
+        crear_sesion(
+            rutina,
+            membresia,
+            datetime.now().weekday(),
+            timezone.now(),
+            entrenamiento_libre=entrenamiento_libre,
+        )
+
+        modo = "libre" if entrenamiento_libre else rutina.Nombre
+        messages.success(request, f"¡Sesión iniciada ({modo})! Buena suerte.")
+        return redirect("mi_rutina")
+
     return redirect("mi_rutina")
 
 
@@ -711,62 +606,56 @@ def detalle_sesion_view(request, sesion_id):
     """View to show details of a completed session"""
     from apps.control_acceso.models import SesionEntrenamiento
 
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        socio = Socio.objects.get(Email=usuario.Email)
+    if not request.socio:
+        messages.error(request, "Error al cargar sesión.")
+        return redirect("mi_rutina")
 
-        # Get session and verify it belongs to this socio
-        membresias = SocioMembresia.objects.filter(SocioID=socio)
-        sesion = SesionEntrenamiento.objects.filter(
-            id=sesion_id, SocioMembresiaID__in=membresias
-        ).first()
+    # Get session and verify it belongs to this socio
+    membresias = request.membresias
+    sesion = SesionEntrenamiento.objects.filter(
+        id=sesion_id, SocioMembresiaID__in=membresias
+    ).first()
 
-        if not sesion:
-            messages.error(request, "Sesión no encontrada.")
-            return redirect("mi_rutina")
+    if not sesion:
+        messages.error(request, "Sesión no encontrada.")
+        return redirect("mi_rutina")
 
-        # Get exercises for this session
-        ejercicios = []
-        completados_count = 0
-        total_count = 0
-        pendientes_count = 0
+    # Get exercises for this session
+    ejercicios = []
+    completados_count = 0
+    total_count = 0
+    pendientes_count = 0
 
-        if not sesion.EsEntrenamientoLibre:
-            ejercicios = list(
-                sesion.ejercicios_completados.all().select_related(
-                    "DiaRutinaEjercicioID__EjercicioID"
-                )
+    if not sesion.EsEntrenamientoLibre:
+        ejercicios = list(
+            sesion.ejercicios_completados.all().select_related(
+                "DiaRutinaEjercicioID__EjercicioID"
             )
+        )
 
-            # Pre-calculate exercise names to avoid template formatting issues
-            for ej in ejercicios:
-                ej.nombre_ejercicio = ej.DiaRutinaEjercicioID.EjercicioID.Nombre
-                series = ej.DiaRutinaEjercicioID.Series or "-"
-                reps = ej.DiaRutinaEjercicioID.Repeticiones or "-"
-                detalle = f"{series} series × {reps} reps"
-                if ej.DiaRutinaEjercicioID.PesoObjetivo:
-                    detalle += f" | {ej.DiaRutinaEjercicioID.PesoObjetivo} kg"
-                ej.detalle_texto = detalle
-
-            total_count = len(ejercicios)
-            completados_count = sum(1 for ej in ejercicios if ej.Completado)
-            pendientes_count = total_count - completados_count
+        # Pre-calculate exercise names to avoid template formatting issues
+        for ej in ejercicios:
+            ej.nombre_ejercicio = ej.DiaRutinaEjercicioID.EjercicioID.Nombre
+            series = ej.DiaRutinaEjercicioID.Series or "-"
+            reps = ej.DiaRutinaEjercicioID.Repeticiones or "-"
+            detalle = f"{series} series × {reps} reps"
+            if ej.DiaRutinaEjercicioID.PesoObjetivo:
+                detalle += f" | {ej.DiaRutinaEjercicioID.PesoObjetivo} kg"
+            ej.detalle_texto = detalle
 
-        context = {
-            "sesion": sesion,
-            "ejercicios": ejercicios,
-            "total_count": total_count,
-            "completados_count": completados_count,
-            "pendientes_count": pendientes_count,
-        }
+        total_count = len(ejercicios)
+        completados_count = sum(1 for ej in ejercicios if ej.Completado)
+        pendientes_count = total_count - completados_count
 
-        return render(request, "socio/DetalleSesion.html", context)
+    context = {
+        "sesion": sesion,
+        "ejercicios": ejercicios,
+        "total_count": total_count,
+        "completados_count": completados_count,
+        "pendientes_count": pendientes_count,
+    }
 
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
-        messages.error(request, "Error al cargar sesión.")
-        return redirect("mi_rutina")
+    return render(request, "socio/DetalleSesion.html", context)
 
 
 @login_requerido
@@ -776,76 +665,65 @@ def terminar_sesion_view(request):
     from apps.control_acceso.models import SesionEntrenamiento
 
     if request.method == "POST":
-        usuario_id = request.session.get("usuario_id")
+        if not request.socio:
+            messages.error(request, "Error al terminar sesión.")
+            return redirect("mi_rutina")
 
-        try:
-            usuario = Usuario.objects.get(id=usuario_id)
-            socio = Socio.objects.get(Email=usuario.Email)
+        # Buscar sesión activa
+        membresias = request.membresias
+        sesion_activa = SesionEntrenamiento.objects.filter(
+            SocioMembresiaID__in=membresias, FechaFin__isnull=True
+        ).first()
 
-            # Buscar sesión activa
-            membresias = SocioMembresia.objects.filter(SocioID=socio)
-            sesion_activa = SesionEntrenamiento.objects.filter(
-                SocioMembresiaID__in=membresias, FechaFin__isnull=True
-            ).first()
+        if not sesion_activa:
+            messages.warning(request, "No tienes una sesión activa.")
+            return redirect("mi_rutina")
 
-            if not sesion_activa:
-                messages.warning(request, "No tienes una sesión activa.")
-                return redirect("mi_rutina")
+        # Terminar sesión (con las notas, si vienen); los contadores vuelven
+        # de la base de datos, no de lo leído al principio
+        notas = request.POST.get("notas", "").strip()
+        contadores = terminar_sesion(sesion_activa, timezone.now(), notas)
+        if contadores is None:
+            messages.warning(request, "No tienes una sesión activa.")
+            return redirect("mi_rutina")
+        duracion = sesion_activa.DuracionMinutos
+        registrar_dia_entrenamiento(request.socio.id, fecha_de_sesion(sesion_activa))
+
+        # Check for weekly completion (only for non-free training)
+        if not sesion_activa.EsEntrenamientoLibre and sesion_activa.RutinaID_id:
+            from apps.control_acceso.models import CompletionTracking
+
+            # Check if all exercises were completed
+            ejercicios_completados, total_ejercicios = contadores
+
+            if total_ejercicios > 0 and ejercicios_completados == total_ejercicios:
+                # Calculate current week (ISO week format: YYYY-WW)
+                now = timezone.now()
+                semana = now.strftime("%Y-%W")
+
+                # Create or update completion record
+                CompletionTracking.objects.update_or_create(
+                    SocioMembresiaID_id=sesion_activa.SocioMembresiaID_id,
+                    RutinaID_id=sesion_activa.RutinaID_id,
+                    DiaSemana=sesion_activa.DiaSemana,
+                    Semana=semana,
+                    defaults={"Completado": True},
+                )
 
-            # Save notes if provided
-            notas = request.POST.get("notas", "").strip()
-            if notas:
-                sesion_activa.NotasSesion = notas
-
-            # Terminar sesión
-            sesion_activa.FechaFin = timezone.now()
-            duracion = (
-                sesion_activa.FechaFin - sesion_activa.FechaInicio
-            ).total_seconds() / 60
-            sesion_activa.DuracionMinutos = int(duracion)
-            sesion_activa.save()
-
-            # Check for weekly completion (only for non-free training)
-            if not sesion_activa.EsEntrenamientoLibre and sesion_activa.RutinaID:
-                from apps.control_acceso.models import CompletionTracking
-
-                # Check if all exercises were completed
-                total_ejercicios = sesion_activa.ejercicios_completados.count()
-                ejercicios_completados = sesion_activa.ejercicios_completados.filter(
-                    Completado=True
-                ).count()
-
-                if total_ejercicios > 0 and ejercicios_completados == total_ejercicios:
-                    # Calculate current week (ISO week format: YYYY-WW)
-                    now = timezone.now()
-                    semana = now.strftime("%Y-%W")
-
-                    # Create or update completion record
-                    CompletionTracking.objects.update_or_create(
-                        SocioMembresiaID=sesion_activa.SocioMembresiaID,
-                        RutinaID=sesion_activa.RutinaID,
-                        DiaSemana=sesion_activa.DiaSemana,
-                        Semana=semana,
-                        defaults={"Completado": True},
-                    )
-
-                    messages.success(
-                        request,
-                        f"🎉 ¡Sesión completada! Todos los ejercicios de hoy finalizados. Duración: {int(duracion)} min.",
-                    )
-                else:
-                    messages.success(
-                        request, f"Sesión terminada. Duración: {int(duracion)} minutos."
-                    )
+                messages.success(
+                    request,
+                    "🎉 ¡Sesión completada! Todos los ejercicios de hoy finalizados. "
+                    f"Duración: {int(duracion)} min.",
+                )
             else:
                 messages.success(
                     request, f"Sesión terminada. Duración: {int(duracion)} minutos."
                 )
-            return redirect("mi_rutina")
-
-        except (Usuario.DoesNotExist, Socio.DoesNotExist):
-            messages.error(request, "Error al terminar sesión.")
-            return redirect("mi_rutina")
+        else:
+            messages.success(
+                request, f"Sesión terminada. Duración: {int(duracion)} minutos."
+            )
+        return redirect("mi_rutina")
 
     return redirect("mi_rutina")
 
@@ -856,22 +734,15 @@ def toggle_ejercicio_view(request):
 
     from django.http import JsonResponse
 
-    from apps.control_acceso.models import (
-        EjercicioSesionCompletado,
-        SesionEntrenamiento,
-    )
+    from apps.control_acceso.models import SesionEntrenamiento
 
     if request.method == "POST":
         try:
             data = json.loads(request.body)
             ejercicio_id = data.get("ejercicio_id")
 
-            usuario_id = request.session.get("usuario_id")
-            usuario = Usuario.objects.get(id=usuario_id)
-            socio = Socio.objects.get(Email=usuario.Email)
-
             # Buscar sesión activa
-            membresias = SocioMembresia.objects.filter(SocioID=socio)
+            membresias = request.membresias
             sesion_activa = SesionEntrenamiento.objects.filter(
                 SocioMembresiaID__in=membresias, FechaFin__isnull=True
             ).first()
@@ -879,43 +750,37 @@ def toggle_ejercicio_view(request):
             if not sesion_activa:
                 return JsonResponse({"error": "No hay sesión activa"}, status=400)
 
-            # Toggle ejercicio
-            ejercicio_sesion = EjercicioSesionCompletado.objects.get(
-                SesionID=sesion_activa, DiaRutinaEjercicioID_id=ejercicio_id
-            )
-
-            ejercicio_sesion.Completado = not ejercicio_sesion.Completado
-            ejercicio_sesion.save()
-
-            # Verificar si todos están completados
-            total = sesion_activa.ejercicios_completados.count()
-            completados = sesion_activa.ejercicios_completados.filter(
-                Completado=True
-            ).count()
+            # Toggle ejercicio (y contador de la sesión)
+            resultado = alternar_ejercicio(sesion_activa, ejercicio_id)
+            if resultado is None:
+                return JsonResponse({"error": "Ejercicio no encontrado en la sesión"}, status=400)
+            completado, completados, total = resultado
 
             respuesta = {
                 "success": True,
-                "completado": ejercicio_sesion.Completado,
+                "completado": completado,
                 "progreso": f"{completados}/{total}",
                 "todos_completados": completados == total,
             }
 
             # Terminar sesión automáticamente cuando todos los ejercicios se completan
+            contadores = None
             if completados == total and total > 0:
-                sesion_activa.FechaFin = timezone.now()
-                duracion = (
-                    sesion_activa.FechaFin - sesion_activa.FechaInicio
-                ).total_seconds() / 60
-                sesion_activa.DuracionMinutos = int(duracion)
-                sesion_activa.save()
-
-                if not sesion_activa.EsEntrenamientoLibre and sesion_activa.RutinaID:
+                contadores = terminar_sesion(sesion_activa, timezone.now())
+            # None también si otra petición la cerró entretanto
+            if contadores is not None:
+                completados, total = contadores
+                registrar_dia_entrenamiento(
+                    request.socio.id, fecha_de_sesion(sesion_activa)
+                )
+
+                if not sesion_activa.EsEntrenamientoLibre and sesion_activa.RutinaID_id:
                     total_ejercicios = total
                     if total_ejercicios == completados:
                         semana = timezone.now().strftime("%Y-%W")
                         CompletionTracking.objects.update_or_create(
-                            SocioMembresiaID=sesion_activa.SocioMembresiaID,
-                            RutinaID=sesion_activa.RutinaID,
+                            SocioMembresiaID_id=sesion_activa.SocioMembresiaID_id,
+                            RutinaID_id=sesion_activa.RutinaID_id,
                             DiaSemana=sesion_activa.DiaSemana,
                             Semana=semana,
                             defaults={"Completado": True},
@@ -933,16 +798,12 @@ def toggle_ejercicio_view(request):
 
 @login_requerido
 def historial_sesiones_view(request):
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        socio = Socio.objects.get(Email=usuario.Email)
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
+    socio = request.socio
+    if not socio:
         messages.error(request, "No se encontró el perfil de socio asociado.")
         return redirect("login")
 
-    membresias = SocioMembresia.objects.filter(SocioID=socio)
+    membresias = request.membresias
 
     historial_sesiones = (
         SesionEntrenamiento.objects.filter(
@@ -971,24 +832,19 @@ def mi_nutricion_view(request):
     """View for nutrition page with daily meal plan"""
     import json
 
-    from apps.control_acceso.models import (
-        Alimento,
-        ComidaAlimento,
-        DiaComida,
-        PlanNutricional,
-    )
+    from apps.control_acceso.models import PlanNutricional
 
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        socio = Socio.objects.get(Email=usuario.Email)
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
+    socio = request.socio
+    if not socio:
         messages.error(request, "No se encontró el perfil de socio asociado.")
         return redirect("login")
 
     # Get nutrition plan
-    plan_nutricional = PlanNutricional.objects.filter(SocioID=socio, EsPlantilla=False).first()
+    plan_nutricional = (
+        PlanNutricional.objects.filter(SocioID=socio, EsPlantilla=False)
+        .select_related("documento")
+        .first()
+    )
 
     if not plan_nutricional:
         context = {
@@ -1012,14 +868,9 @@ def mi_nutricion_view(request):
 
     fecha_actual = timezone.localdate()
 
-    # Get meals for today
-    comidas_hoy = list(
-        DiaComida.objects.filter(
-            PlanNutricionalID=plan_nutricional, DiaSemana=dia_actual
-        )
-        .prefetch_related("alimentos__AlimentoID")
-        .order_by("id")
-    )
+    # Today's meals, precompiled in the plan document
+    dia_documento = obtener_documento(plan_nutricional).Contenido["dias"][dia_actual]
+    comidas_hoy = [SimpleNamespace(**comida) for comida in dia_documento["comidas"]]
 
     registros_hoy = {
         registro.DiaComidaID_id: registro
@@ -1043,73 +894,10 @@ def mi_nutricion_view(request):
         },
     }
 
-    # Pre-calculate totals
-    calorias_total = 0
-    proteinas_total = 0
-    carbohidratos_total = 0
-    grasas_total = 0
-
     # Pre-calculate meal data to avoid formatter issues
     for comida in comidas_hoy:
-        comida.tipo_display = comida.TipoComida or "Comida"
-        comida.alimentos_list = []
-
-        for ca in comida.alimentos.all():
-            alimento = ca.AlimentoID
-
-            # Pre-calculate display name and quantity string
-            cantidad_str = ""
-            if ca.Porcion:
-                cantidad_str = f"{int(ca.Porcion)}g"  # Assuming porcion is in grams
-            elif ca.Cantidad:
-                cantidad_str = f"{ca.Cantidad} un."
-
-            ca.nombre_display = (
-                f"{alimento.Nombre} ({cantidad_str})"
-                if cantidad_str
-                else alimento.Nombre
-            )
-
-            # Parse macros from TextField
-            ca.calorias_valor = 0
-            ca.proteinas_valor = 0
-            ca.carbohidratos_valor = 0
-            ca.grasas_valor = 0
-
-            if alimento.Kcal:
-                ca.calorias_valor = float(alimento.Kcal)
-
-            if alimento.Macros:
-                try:
-                    macros_dict = {
-                        p.split(":")[0].strip().upper(): float(
-                            p.split(":")[1].replace("g", "").strip()
-                        )
-                        for p in alimento.Macros.split(",")
-                        if ":" in p
-                    }
-                    ca.proteinas_valor = macros_dict.get("P", 0)
-                    ca.carbohidratos_valor = macros_dict.get("C", 0)
-                    ca.grasas_valor = macros_dict.get("G", 0)
-                except (ValueError, IndexError):
-                    pass  # Ignore parsing errors
-
-            # Calculate totals based on portion
-            porcion_ratio = float(ca.Porcion or 100) / 100.0
-            ca.cal_total = int(ca.calorias_valor * porcion_ratio)
-            ca.prot_total = round(ca.proteinas_valor * porcion_ratio, 1)
-            ca.carb_total = round(ca.carbohidratos_valor * porcion_ratio, 1)
-            ca.gras_total = round(ca.grasas_valor * porcion_ratio, 1)
-
-            ca.macros_text = f"{ca.cal_total} kcal | P: {ca.prot_total}g, C: {ca.carb_total}g, G: {ca.gras_total}g"
-
-            comida.alimentos_list.append(ca)
-
-            # Sum totals
-            calorias_total += ca.cal_total
-            proteinas_total += ca.prot_total
-            carbohidratos_total += ca.carb_total
-            grasas_total += ca.gras_total
+        comida.tipo_display = comida.tipo
+        comida.alimentos_list = comida.alimentos
 
         registro = registros_hoy.get(comida.id)
         if registro:
@@ -1219,10 +1007,10 @@ def mi_nutricion_view(request):
         "plan_nombre": "Plan de Nutrición",
         "dia_actual_nombre": dia_actual_nombre,
         "comidas_hoy": comidas_hoy,
-        "calorias_total": int(calorias_total),
-        "proteinas_total": round(proteinas_total, 1),
-        "carbohidratos_total": round(carbohidratos_total, 1),
-        "grasas_total": round(grasas_total, 1),
+        "calorias_total": int(dia_documento["totales"]["kcal"]),
+        "proteinas_total": dia_documento["totales"]["proteina"],
+        "carbohidratos_total": dia_documento["totales"]["carbohidratos"],
+        "grasas_total": dia_documento["totales"]["grasa"],
         "calorias_objetivo": plan_nutricional.ObjetivoCaloricoDiario or 2000,
         "peso_actual": round(peso_actual, 1),
         "peso_inicial": round(peso_inicial, 1),
@@ -1238,12 +1026,8 @@ def mi_nutricion_view(request):
 
 @login_requerido
 def mi_perfil_view(request):
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        socio = Socio.objects.get(Email=usuario.Email)
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
+    socio = request.socio
+    if not socio:
         messages.error(request, "No se encontró el perfil de socio asociado.")
         return redirect("login")
 
@@ -1251,15 +1035,13 @@ def mi_perfil_view(request):
     peso_actual = ultima_medicion.PesoCorporal if ultima_medicion else None
 
     miembro_desde = (
-        SocioMembresia.objects.filter(SocioID=socio)
-        .order_by("FechaInicio")
+        request.membresias.order_by("FechaInicio")
         .values_list("FechaInicio", flat=True)
         .first()
     )
 
     membresia_actual = (
-        SocioMembresia.objects.filter(SocioID=socio)
-        .select_related("PlanID")
+        request.membresias.select_related("PlanID")
         .order_by("-FechaFin")
         .first()
     )
@@ -1334,12 +1116,8 @@ def toggle_comida_view(request):
     if request.method != "POST":
         return JsonResponse({"error": "Método no permitido"}, status=405)
 
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        socio = Socio.objects.get(Email=usuario.Email)
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
+    socio = request.socio
+    if not socio:
         return JsonResponse({"error": "Sesión inválida"}, status=401)
 
     try:
@@ -1396,123 +1174,72 @@ def toggle_comida_view(request):
 def historial_comidas_view(request):
     dias_consulta = request.GET.get("dias", "7")
     try:
-        dias_consulta = max(1, min(30, int(dias_consulta)))
+        dias_consulta = max(1, min(MAXIMO_DIAS, int(dias_consulta)))
     except ValueError:
         dias_consulta = 7
 
-    usuario_id = request.session.get("usuario_id")
-
-    try:
-        usuario = Usuario.objects.get(id=usuario_id)
-        socio = Socio.objects.get(Email=usuario.Email)
-    except (Usuario.DoesNotExist, Socio.DoesNotExist):
+    socio = request.socio
+    if not socio:
         messages.error(request, "No se encontró el perfil de socio asociado.")
         return redirect("login")
 
-    from apps.control_acceso.models import DiaComida, PlanNutricional
+    from apps.control_acceso.models import PlanNutricional
 
-    plan = PlanNutricional.objects.filter(SocioID=socio, EsPlantilla=False).first()
+    opciones_rango = [
+        {"valor": opcion, "selected": dias_consulta == opcion} for opcion in OPCIONES_RANGO
+    ]
+    plan = (
+        PlanNutricional.objects.filter(SocioID=socio, EsPlantilla=False)
+        .select_related("documento")
+        .first()
+    )
     if not plan:
-        opciones_rango = [7, 14, 21, 30]
         context = {
             "socio": socio,
             "tiene_plan": False,
             "historial_dias": [],
             "dias_consulta": dias_consulta,
-            "opciones_rango": [
-                {"valor": opcion, "selected": dias_consulta == opcion}
-                for opcion in opciones_rango
-            ],
+            "opciones_rango": opciones_rango,
         }
         return render(request, "socio/HistorialComidas.html", context)
 
-    dias_semana = [
-        "Lunes",
-        "Martes",
-        "Miércoles",
-        "Jueves",
-        "Viernes",
-        "Sábado",
-        "Domingo",
-    ]
-
-    dias_plan = (
-        DiaComida.objects.filter(PlanNutricionalID=plan)
-        .prefetch_related("alimentos__AlimentoID")
-        .order_by("DiaSemana", "id")
-    )
-    dias_por_semana = {}
-    for dia in dias_plan:
-        dias_por_semana.setdefault(dia.DiaSemana, []).append(dia)
+    dias_documento = obtener_documento(plan).Contenido["dias"]
+    por_dia_semana = [len(dia["comidas"]) for dia in dias_documento]
 
     fecha_hoy = timezone.localdate()
     fecha_inicio = fecha_hoy - timezone.timedelta(days=dias_consulta - 1)
-    registros = RegistroComidaDiaria.objects.filter(
-        SocioID=socio, Fecha__range=(fecha_inicio, fecha_hoy), Completado=True
-    ).select_related("DiaComidaID")
-    registros_map = {
-        (registro.Fecha, registro.DiaComidaID_id): registro for registro in registros
-    }
-
-    historial_dias = []
-    for offset in range(dias_consulta):
-        fecha_dia = fecha_hoy - timezone.timedelta(days=offset)
-        dia_semana_idx = fecha_dia.weekday()
-        comidas_plan_dia = dias_por_semana.get(dia_semana_idx, [])
-
-        if not comidas_plan_dia:
-            continue
-
-        comidas_render = []
-        completadas = 0
-
-        for comida in comidas_plan_dia:
-            registro = registros_map.get((fecha_dia, comida.id))
-            completado = registro.Completado if registro else False
-            if completado:
-                completadas += 1
-
-            alimentos_nombres = ", ".join(
-                ca.AlimentoID.Nombre for ca in comida.alimentos.all()
-            )
-            alimentos_texto = (
-                alimentos_nombres if alimentos_nombres else "Sin alimentos configurados"
-            )
-
-            comidas_render.append(
-                {
-                    "nombre": comida.TipoComida or "Comida",
-                    "completado": completado,
-                    "hora": timezone.localtime(registro.HoraCompletado).strftime(
-                        "%H:%M"
-                    )
-                    if registro and registro.HoraCompletado
-                    else "",
-                    "alimentos_texto": alimentos_texto,
-                }
-            )
-
-        if completadas > 0:
-            historial_dias.append(
-                {
-                    "fecha": fecha_dia,
-                    "fecha_display": fecha_dia.strftime("%d %b %Y"),
-                    "dia_semana": dias_semana[dia_semana_idx],
-                    "total": len(comidas_plan_dia),
-                    "completadas": completadas,
-                    "comidas": comidas_render,
-                }
-            )
+    agrupacion = "semana" if dias_consulta <= MAXIMO_DIAS_SEMANAL else "mes"
+    periodos = adherencia_por_periodo(
+        socio, plan, por_dia_semana, fecha_inicio, fecha_hoy, agrupacion
+    )
+    completadas = sum(periodo["completadas"] for periodo in periodos)
+    esperadas = sum(periodo["esperadas"] for periodo in periodos)
+
+    # El detalle por día solo se carga para el periodo desplegado en los
+    # rangos largos
+    periodo_abierto = None
+    if dias_consulta <= MAXIMO_DIAS_DETALLE:
+        desde, hasta = fecha_inicio, fecha_hoy
+    else:
+        clave = request.GET.get("periodo")
+        periodo_abierto = next((p for p in periodos if p["clave"] == clave), None)
+        desde = hasta = None
+        if periodo_abierto:
+            desde, hasta = periodo_abierto["inicio"], periodo_abierto["fin"]
+    historial_dias = (
+        detalle_por_dia(socio, plan, dias_documento, desde, hasta) if desde else []
+    )
 
-    opciones_rango = [7, 14, 21, 30]
     context = {
         "socio": socio,
         "tiene_plan": True,
         "historial_dias": historial_dias,
         "dias_consulta": dias_consulta,
-        "opciones_rango": [
-            {"valor": opcion, "selected": dias_consulta == opcion}
-            for opcion in opciones_rango
-        ],
+        "opciones_rango": opciones_rango,
+        "periodos": periodos,
+        "agrupacion": agrupacion,
+        "periodo_abierto": periodo_abierto,
+        "detalle_por_periodo": dias_consulta > MAXIMO_DIAS_DETALLE,
+        "adherencia_total": round(100 * completadas / esperadas) if esperadas else 0,
     }
     return render(request, "socio/HistorialComidas.html", context)